@@ -8,34 +8,33 @@ from fastapi import (
     Form,
 )
 from typing import Optional
+import asyncio
 import logging
 
 # Importe todos os serviços necessários
+from app.core.container import ServiceContainer, get_services, require
+from app.core import cpu_pool
+from app.core.cpu_pool import CPUPoolSaturated
+from app.core.uploads import spool_pdf_upload
 from app.services.audiobook_generator_service import AudiobookGeneratorService
-from app.services.pdf_segmenter import PDFSegmenterService
-from app.services.elevenlabs_service import ElevenLabsService
-from app.services.s3_service import S3Service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Path
+from fastapi import APIRouter, HTTPException, Depends, Path
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.crud import crud_document
-from app.services.audio_generation_service import AudioGenerationService
+from app.crud import crud_document, crud_audio_job, crud_job_queue
+from app.models.job_queue import JobKind
 
 from app.api.v1.schemas.document import Document as DocumentSchema
+from app.api.v1.schemas.audio_job import AudioJobProgress
 
 # --- Injeção de Dependências ---
-# Esta abordagem permite que o FastAPI gerencie o ciclo de vida dos serviços.
-def get_audiobook_service() -> AudiobookGeneratorService:
-    # Em uma aplicação real, você poderia ter lógicas mais complexas aqui.
-    return AudiobookGeneratorService(
-        pdf_segmenter=PDFSegmenterService(),
-        elevenlabs_service=ElevenLabsService(),
-        s3_service=S3Service(),
-    )
+# Os serviços são criados uma vez no lifespan da aplicação (ServiceContainer) e
+# partilhados por todos os pedidos.
+def get_audiobook_service(services: ServiceContainer = Depends(get_services)) -> AudiobookGeneratorService:
+    return require(services.audiobook_service, "de geração de audiobooks")
 
 @router.post("/pdf-to-audiobook")
 async def create_audiobook_from_pdf(
@@ -47,6 +46,7 @@ async def create_audiobook_from_pdf(
     ),
     book_title: Optional[str] = Form(None, description="Título do livro (opcional, usa o nome do arquivo se não for fornecido)."),
     service: AudiobookGeneratorService = Depends(get_audiobook_service),
+    services: ServiceContainer = Depends(get_services),
 ):
     """
     Endpoint completo para converter um PDF em um audiobook.
@@ -57,13 +57,21 @@ async def create_audiobook_from_pdf(
         raise HTTPException(status_code=400, detail="Formato de arquivo inválido. Apenas PDFs são aceitos.")
 
     try:
-        pdf_bytes = await file.read()
         title = book_title or file.filename.rsplit('.', 1)[0]
 
         logger.info(f"Iniciando trabalho de audiobook para '{title}' com modo '{segmentation_mode}'.")
         
         # O processo pode ser demorado. Em produção, isso deveria ser uma tarefa em background (Celery, ARQ).
-        results = service.generate(pdf_bytes, title, "page")
+        # A segmentação (CPU) corre no pool de processos, a partir do PDF guardado num
+        # ficheiro temporário, e a síntese e o upload (I/O) numa thread, para que o
+        # event loop continue a servir os outros pedidos.
+        async with spool_pdf_upload(file) as pdf_path:
+            units = await services.cpu_pool.run(cpu_pool.segment_units, pdf_path, "page")
+        if units:
+            results = await asyncio.to_thread(service.publish_units, units, title)
+        else:
+            logger.warning("Nenhuma unidade (página/capítulo) com conteúdo foi encontrada.")
+            results = []
         
         return {
             "message": "Processo de geração de audiobook concluído.",
@@ -72,6 +80,11 @@ async def create_audiobook_from_pdf(
             "results": results,
         }
 
+    except HTTPException:
+        raise
+    except CPUPoolSaturated as e:
+        logger.warning(f"Pool de CPU saturado; audiobook de {file.filename} recusado.")
+        raise cpu_pool.service_unavailable(e)
     except ValueError as ve:
         logger.error(f"Erro de valor durante o processamento de {file.filename}: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -79,33 +92,55 @@ async def create_audiobook_from_pdf(
         logger.error(f"Erro inesperado ao processar {file.filename}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ocorreu um erro interno no servidor.")
     
-def get_audio_generation_service():
-    return AudioGenerationService(
-        elevenlabs_service=ElevenLabsService(),
-        s3_service=S3Service()
-    )
-
 @router.post("/generate-audio/{document_id}", response_model=DocumentSchema)
 async def generate_audio_for_document_endpoint(
-    background_tasks: BackgroundTasks,
     document_id: int = Path(..., description="O ID do documento para o qual gerar áudio."),
     db: Session = Depends(get_db),
-    service: AudioGenerationService = Depends(get_audio_generation_service)
 ):
     """
-    Inicia a geração de áudio em segundo plano para um documento existente.
+    Coloca a geração de áudio de um documento existente na fila de trabalhos,
+    executada pelo processo worker (app/worker.py). O progresso pode ser consultado
+    em /generate-audio/{document_id}/progress.
     """
     db_document = crud_document.get_document(db, document_id)
     if not db_document:
         raise HTTPException(status_code=404, detail="Documento não encontrado.")
 
-    background_tasks.add_task(
-        service.generate_audio_for_document,
-        db=db,
-        document_id=document_id
+    job = crud_job_queue.enqueue(
+        db,
+        JobKind.GENERATE_AUDIO.value,
+        {"document_id": document_id},
+        dedupe_key=str(document_id),
     )
 
-    logger.info(f"Tarefa de geração de áudio agendada para o documento ID: {document_id}.")
-    
+    logger.info(f"Geração de áudio do documento ID {document_id} na fila (trabalho {job.id}).")
+
     # Retorna o estado atual do documento
     return db_document
+
+
+@router.get("/generate-audio/{document_id}/progress", response_model=AudioJobProgress)
+async def get_audio_generation_progress(
+    document_id: int = Path(..., description="O ID do documento."),
+    db: Session = Depends(get_db),
+):
+    """
+    Progresso do trabalho de geração de áudio mais recente do documento: segmentos
+    concluídos / total, bytes produzidos e tempo restante estimado.
+    """
+    job = crud_audio_job.get_latest_job_for_document(db, document_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Nenhum trabalho de geração de áudio para este documento.")
+    return crud_audio_job.get_job_progress(db, job)
+
+
+@router.get("/jobs/{job_id}", response_model=AudioJobProgress)
+async def get_audio_job(
+    job_id: int = Path(..., description="O ID do trabalho de geração de áudio."),
+    db: Session = Depends(get_db),
+):
+    """Progresso de um trabalho de geração de áudio pelo seu ID."""
+    job = crud_audio_job.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabalho não encontrado.")
+    return crud_audio_job.get_job_progress(db, job)
@@ -1,21 +1,23 @@
 from fastapi import (
-    APIRouter, File, Path, UploadFile, HTTPException, Depends, Form, BackgroundTasks
+    APIRouter, File, Path, Query, UploadFile, HTTPException, Depends, Form, BackgroundTasks
 )
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.api.v1.schemas.document import DocumentCreate, Document as DocumentSchema
-from app.crud import crud_document
+from app.crud import crud_document, crud_job_queue
+from app.models.job_queue import JobKind
 from app.services.s3_service import S3Service
 from app.services.text_extraction_service import TextExtractionService
-from app.services.pdf_segmenter import PDFSegmenterService
-from app.services.text_preprocessor_service import TextPreprocessorService
+from app.core.container import ServiceContainer, get_services
+from app.services.text_preprocessor_service import SENTENCE_SPLITTERS
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-def get_text_extraction_service():
-    return TextExtractionService(pdf_segmenter=PDFSegmenterService(),preprocessor=TextPreprocessorService())
+def get_text_extraction_service(services: ServiceContainer = Depends(get_services)):
+    return services.text_extraction_service
 
 # @router.post("/extract-text")
 # async def extract_text_from_pdf(
@@ -47,49 +49,44 @@ def get_text_extraction_service():
 #     return db_document
 
 
-def get_text_extraction_service():
-    return TextExtractionService(pdf_segmenter=PDFSegmenterService(),preprocessor=TextPreprocessorService())
+def get_text_extraction_service(services: ServiceContainer = Depends(get_services)):
+    return services.text_extraction_service
 
 @router.post("/documents/{document_id}/extract-text", response_model=DocumentSchema)
 async def extract_text_from_existing_document(
-    background_tasks: BackgroundTasks,
     document_id: int = Path(..., description="O ID do livro que já existe no banco de dados."),
+    sentence_splitter: Optional[str] = Query(
+        None, description="Divisor de sentenças: 'spacy' ou 'rule' (por omissão, o configurado)."
+    ),
     db: Session = Depends(get_db),
-    service: TextExtractionService = Depends(get_text_extraction_service)
 ):
     """
-    Recebe um ID de um livro existente e um PDF, e inicia a extração de texto 
-    para esse livro em segundo plano.
+    Recebe um ID de um livro existente e coloca a extração de texto desse livro na
+    fila de trabalhos, executada pelo processo worker (app/worker.py).
     """
+    if sentence_splitter is not None and sentence_splitter not in SENTENCE_SPLITTERS:
+        raise HTTPException(status_code=400, detail=f"Divisor de sentenças inválido. Use um de {list(SENTENCE_SPLITTERS)}.")
     # 1. Busca o livro no banco de dados usando o ID fornecido.
     db_document = crud_document.get_document(db=db, document_id=document_id)
     if not db_document:
         raise HTTPException(status_code=404, detail="Livro não encontrado com o ID fornecido.")
     if not db_document.pdf_file_key:
         raise HTTPException(status_code=400, detail="Documento não possui uma chave de ficheiro PDF associada para a extração.")
-    # 2. Adiciona a tarefa de extração para ser executada em segundo plano.
-    background_tasks.add_task(
-        service.extract_and_save_text,
-        db=db,
-        pdf_file_key=db_document.pdf_file_key,  # Mantido como bytes vazios conforme o código original
-        document_id=db_document.id,
-        segmentation_mode="page" # Mantido conforme o código original
-    )
-    
-    logger.info(f"Tarefa de extração de texto agendada para o livro '{db_document.title}' (ID: {db_document.id}).")
-    
+    # 2. Coloca a extração na fila; o pedido não espera pelo worker.
+    job = _enqueue_extraction(db, db_document, sentence_splitter)
+
+    logger.info(f"Extração de texto do livro '{db_document.title}' (ID: {db_document.id}) na fila (trabalho {job.id}).")
+
     # 3. Retorna os dados do livro que foi encontrado e para o qual a tarefa foi agendada.
     return db_document
 @router.post("/documents/{document_id}/generate-audio")
 async def extract_text_from_existing_document(
-    background_tasks: BackgroundTasks,
     document_id: int = Path(..., description="O ID do livro que já existe no banco de dados."),
     db: Session = Depends(get_db),
-    service: TextExtractionService = Depends(get_text_extraction_service)
 ):
     """
-    Recebe um ID de um livro existente e um PDF, e inicia a extração de texto 
-    para esse livro em segundo plano.
+    Recebe um ID de um livro existente e coloca a extração de texto desse livro na
+    fila de trabalhos, executada pelo processo worker (app/worker.py).
     """
     # 1. Busca o livro no banco de dados usando o ID fornecido.
     db_document = crud_document.get_document(db=db, document_id=document_id)
@@ -97,16 +94,35 @@ async def extract_text_from_existing_document(
         raise HTTPException(status_code=404, detail="Livro não encontrado com o ID fornecido.")
     if not db_document.pdf_file_key:
         raise HTTPException(status_code=400, detail="Documento não possui uma chave de ficheiro PDF associada para a extração.")
-    # 2. Adiciona a tarefa de extração para ser executada em segundo plano.
-    background_tasks.add_task(
-        service.extract_and_save_text,
-        db=db,
-        pdf_file_key=db_document.pdf_file_key,  # Mantido como bytes vazios conforme o código original
-        document_id=db_document.id,
-        segmentation_mode="page" # Mantido conforme o código original
-    )
-    
-    logger.info(f"Tarefa de extração de texto agendada para o livro '{db_document.title}' (ID: {db_document.id}).")
-    
+    # 2. Coloca a extração na fila; o pedido não espera pelo worker.
+    job = _enqueue_extraction(db, db_document)
+
+    logger.info(f"Extração de texto do livro '{db_document.title}' (ID: {db_document.id}) na fila (trabalho {job.id}).")
+
     # 3. Retorna os dados do livro que foi encontrado e para o qual a tarefa foi agendada.
-    return db_document
\ No newline at end of file
+    return db_document
+
+
+def _enqueue_extraction(db: Session, db_document, sentence_splitter: Optional[str] = None):
+    """
+    Coloca a extração de texto do documento na fila (um único trabalho ativo por documento).
+    Se já houver uma extração ativa com outras opções (por exemplo, outro divisor de
+    sentenças), responde 409 em vez de ignorar as opções pedidas.
+    """
+    try:
+        return crud_job_queue.enqueue(
+            db,
+            JobKind.EXTRACT_TEXT.value,
+            {
+                "document_id": db_document.id,
+                "pdf_file_key": db_document.pdf_file_key,
+                "segmentation_mode": "page",  # Mantido conforme o código original
+                "sentence_splitter": sentence_splitter,
+            },
+            dedupe_key=str(db_document.id),
+        )
+    except crud_job_queue.ActiveJobConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Já existe uma extração em curso para este documento (trabalho {e.job.id}) com outras opções.",
+        )
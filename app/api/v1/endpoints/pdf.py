@@ -1,9 +1,20 @@
 # app/api/v1/endpoints/pdf.py
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from app.services.pdf_segmenter import PDFSegmenterService
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import AsyncExitStack
+from app.core.container import ServiceContainer, get_services
+from app.core import cpu_pool
+from app.core.cpu_pool import CPUPool, CPUPoolSaturated
+from app.core.uploads import spool_pdf_upload
+from app.services.extraction_cache import extraction_cache
 from app.api.v1.schemas.pdf import SegmentationResponse
+import asyncio
+import functools
+import json
 import logging
+import queue
+import time
+from typing import Literal
 
 # Configuração do logger para este módulo
 logger = logging.getLogger(__name__)
@@ -12,17 +23,19 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # Função de dependência para injetar o serviço
-def get_segmenter_service():
-    """Cria e retorna uma instância do serviço de segmentação."""
-    return PDFSegmenterService()
+def get_cpu_pool(services: ServiceContainer = Depends(get_services)) -> CPUPool:
+    """Retorna o pool de processos partilhado onde corre a segmentação."""
+    return services.cpu_pool
 
 @router.post("/segment", response_model=SegmentationResponse)
 async def segment_pdf_endpoint(
     file: UploadFile = File(..., description="Arquivo PDF para ser segmentado."),
-    service: PDFSegmenterService = Depends(get_segmenter_service)
+    pool: CPUPool = Depends(get_cpu_pool)
 ):
     """
     Recebe um arquivo PDF, o segmenta em capítulos e retorna o resultado.
+    A segmentação corre no pool de processos, fora do event loop; com o pool
+    saturado o pedido recebe 503 com Retry-After.
     """
     if not file.filename.lower().endswith(".pdf"):
         logger.warning(f"Tentativa de upload de arquivo não-PDF: {file.filename}")
@@ -30,21 +43,161 @@ async def segment_pdf_endpoint(
     
     try:
         logger.info(f"Iniciando segmentação do arquivo: {file.filename}")
-        pdf_bytes = await file.read()
-        
-        if not pdf_bytes:
-            logger.warning(f"Arquivo PDF vazio recebido: {file.filename}")
-            raise HTTPException(status_code=400, detail="O arquivo PDF não pode estar vazio.")
-
-        # Chama o serviço para processar o PDF
-        result = service.segment_pdf(pdf_bytes)
+        # O PDF é copiado em blocos para um ficheiro temporário (validado e com tamanho
+        # limitado) e processado num processo do pool, sem bloquear os restantes pedidos
+        async with spool_pdf_upload(file) as pdf_path:
+            result = await pool.run(cpu_pool.segment_pdf, pdf_path)
         
         logger.info(f"Segmentação concluída com sucesso para o arquivo: {file.filename}")
         return JSONResponse(content=result, status_code=200)
 
+    except HTTPException:
+        raise
+    except CPUPoolSaturated as e:
+        logger.warning(f"Pool de CPU saturado; pedido de segmentação de {file.filename} recusado.")
+        raise cpu_pool.service_unavailable(e)
     except ValueError as ve:
         logger.error(f"Erro de valor durante o processamento de {file.filename}: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Erro inesperado ao processar {file.filename}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ocorreu um erro interno no servidor.")
+
+
+# Capítulos que o pool pode ter à espera de envio: com um cliente lento, a análise
+# pára (em vez de acumular o livro todo) até o cliente ler o que já foi enviado
+_STREAM_QUEUE_CHAPTERS = 4
+# Espera máxima de cada leitura da fila, antes de verificar se o trabalho terminou sem
+# fechar o stream (erro no processo do pool)
+_STREAM_GET_TIMEOUT_SECONDS = 0.5
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def _format_record(line: str, record_type: str, stream_format: str) -> str:
+    """Formata um registo JSON (uma linha, sem quebra final) como NDJSON ou como evento SSE."""
+    if stream_format == "sse":
+        return f"event: {record_type}\ndata: {line}\n\n"
+    return line + "\n"
+
+
+@router.post("/segment/stream")
+async def segment_pdf_stream_endpoint(
+    file: UploadFile = File(..., description="Arquivo PDF para ser segmentado."),
+    format: Literal["ndjson", "sse"] = Query("ndjson", description="Formato do stream: 'ndjson' ou 'sse'."),
+    pool: CPUPool = Depends(get_cpu_pool)
+):
+    """
+    Variante em stream de /segment: cada capítulo é enviado como um registo
+    {"type": "chapter", ...} assim que o PDFSegmenterService o fecha, seguido de um
+    registo {"type": "summary", ...} (ou {"type": "error", ...} se a análise falhar
+    depois de o stream começar).
+
+    O servidor não monta a resposta completa: os capítulos passam do pool de processos
+    para o cliente por uma fila limitada. Se o cliente se desligar, o trabalho no pool
+    é avisado e pára no capítulo seguinte.
+    """
+    if not file.filename.lower().endswith(".pdf"):
+        logger.warning(f"Tentativa de upload de arquivo não-PDF: {file.filename}")
+        raise HTTPException(status_code=400, detail="Formato de arquivo inválido. Apenas PDFs são aceitos.")
+    # `format` já foi validado pelo FastAPI (422 para outros valores)
+    media_type = STREAM_MEDIA_TYPES[format]
+    loop = asyncio.get_running_loop()
+
+    # O PDF temporário tem de viver até ao fim do stream, depois do retorno do handler
+    stack = AsyncExitStack()
+    try:
+        pdf_path = await stack.enter_async_context(spool_pdf_upload(file))
+        # Os objetos do gestor são criados por IPC (e o gestor arranca no primeiro uso)
+        manager = await loop.run_in_executor(None, pool.manager)
+        chapters_queue = await loop.run_in_executor(None, manager.Queue, _STREAM_QUEUE_CHAPTERS)
+        cancelled = await loop.run_in_executor(None, manager.Event)
+        started = time.perf_counter()
+        future = pool.submit(cpu_pool.write_chapters, pdf_path, chapters_queue, cancelled)
+    except CPUPoolSaturated as e:
+        await stack.aclose()
+        logger.warning(f"Pool de CPU saturado; pedido de segmentação de {file.filename} recusado.")
+        raise cpu_pool.service_unavailable(e)
+    except BaseException:
+        await stack.aclose()
+        raise
+    logger.info(f"Iniciando segmentação em stream ({format}) do arquivo: {file.filename}")
+
+    async def records():
+        try:
+            chapters = 0
+            first_chapter_seconds = None
+            while True:
+                # O estado é lido antes da fila: se o trabalho já tinha terminado e a
+                # fila está vazia, não há mais capítulos a caminho.
+                finished = future.done()
+                try:
+                    chapter = await loop.run_in_executor(
+                        None, functools.partial(chapters_queue.get, timeout=_STREAM_GET_TIMEOUT_SECONDS)
+                    )
+                except queue.Empty:
+                    if finished:
+                        break  # terminou sem fechar o stream: falhou
+                    continue
+                if chapter is None:
+                    break
+                if first_chapter_seconds is None:
+                    first_chapter_seconds = round(time.perf_counter() - started, 3)
+                chapters += 1
+                yield _format_record(json.dumps(chapter, ensure_ascii=False), "chapter", format)
+
+            try:
+                await future
+                error = None
+            except Exception as e:
+                error = e
+            if error is not None:
+                # A resposta já começou: o erro segue como o último registo do stream.
+                if isinstance(error, ValueError):
+                    logger.error(f"Erro de valor durante o processamento de {file.filename}: {error}")
+                    detail = str(error)
+                else:
+                    logger.error(f"Erro inesperado ao processar {file.filename}: {error}", exc_info=error)
+                    detail = "Ocorreu um erro interno no servidor."
+                record = {"type": "error", "status": "error", "detail": detail, "chapters": chapters}
+            else:
+                logger.info(f"Segmentação em stream concluída para o arquivo: {file.filename} ({chapters} capítulos)")
+                record = {
+                    "type": "summary",
+                    "status": "success",
+                    "message": f"PDF processado com sucesso. {chapters} capítulo(s) enviado(s).",
+                    "chapters": chapters,
+                    "first_chapter_seconds": first_chapter_seconds,
+                    "total_seconds": round(time.perf_counter() - started, 3),
+                }
+            yield _format_record(json.dumps(record, ensure_ascii=False), record["type"], format)
+        finally:
+            # Com o cliente desligado a meio, o trabalho no pool pára no capítulo seguinte.
+            # Sem awaits antes de fechar o stack: depois do disconnect, o Starlette cancela
+            # qualquer espera aqui e o PDF temporário ficaria por apagar.
+            if not future.done():
+                logger.info(f"Stream de {file.filename} interrompido; a cancelar a segmentação.")
+            cancelled.set()
+            await stack.aclose()
+
+    try:
+        return StreamingResponse(
+            records(),
+            media_type=media_type,
+            # Impede que proxies (ex.: nginx) acumulem o stream antes de o enviar
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except BaseException:
+        # records() não chegou a correr: o trabalho é cancelado e o PDF apagado aqui
+        cancelled.set()
+        await stack.aclose()
+        raise
+
+
+@router.get("/cache/stats")
+async def extraction_cache_stats():
+    """
+    Retorna os contadores de acertos/falhas e a ocupação do cache de extração,
+    para ajudar a dimensioná-lo.
+    """
+    return extraction_cache.stats()
@@ -1,39 +1,68 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Depends
 from fastapi.responses import StreamingResponse
+from app.core.container import ServiceContainer, get_services, require
+from app.services.audio_cache import audio_cache
 from app.services.elevenlabs_service import ElevenLabsService
 import logging
-import io
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Instanciar o serviço fora da função do endpoint para reutilização
-try:
-    elevenlabs_service = ElevenLabsService()
-except ValueError as e:
-    logger.error(f"Não foi possível inicializar o ElevenLabsService: {e}")
-    elevenlabs_service = None
+# O serviço é criado uma vez no lifespan da aplicação (ServiceContainer) e reutilizado.
+def get_elevenlabs_service(services: ServiceContainer = Depends(get_services)) -> ElevenLabsService:
+    return require(services.elevenlabs_service, "de TTS")
 
 @router.post("/generate-audio", response_class=StreamingResponse)
-async def generate_audio_endpoint(text: str = Body(..., embed=True, description="O texto a ser convertido em áudio.")):
+async def generate_audio_endpoint(
+    text: str = Body(..., embed=True, description="O texto a ser convertido em áudio."),
+    elevenlabs_service: ElevenLabsService = Depends(get_elevenlabs_service),
+):
     """
     Converte o texto fornecido em áudio usando a API da ElevenLabs e devolve-o como um stream.
     """
-    if not elevenlabs_service:
-        raise HTTPException(
-            status_code=503, 
-            detail="O serviço de TTS não está disponível devido a um erro de configuração."
-        )
-
     if not text or not text.strip():
         raise HTTPException(status_code=400, detail="O texto não pode estar vazio.")
 
+    # Cliente assíncrono: a síntese não bloqueia o event loop e cada pedaço é enviado
+    # ao cliente assim que fica pronto, enquanto os seguintes ainda estão a ser sintetizados.
+    audio_stream = elevenlabs_service.aiter_audio(text)
     try:
-        audio_bytes = elevenlabs_service.generate_audio(text)
-        
-        # Devolve os bytes do áudio como um stream de resposta
-        return StreamingResponse(io.BytesIO(audio_bytes), media_type="audio/mpeg")
-
+        # O primeiro pedaço é obtido antes de responder, para que uma falha inicial ainda
+        # possa ser devolvida como erro HTTP.
+        first_chunk = await audio_stream.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
     except Exception as e:
+        await audio_stream.aclose()
         logger.error(f"Erro ao gerar áudio: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        try:
+            yield first_chunk
+            async for chunk in audio_stream:
+                yield chunk
+        except Exception as e:
+            # A resposta já começou: resta interromper o stream.
+            logger.error(f"Erro ao gerar áudio durante o stream: {e}")
+            raise
+        finally:
+            await audio_stream.aclose()
+
+    return StreamingResponse(body(), media_type="audio/mpeg")
+
+
+@router.get("/metrics")
+async def tts_stream_metrics(elevenlabs_service: ElevenLabsService = Depends(get_elevenlabs_service)):
+    """
+    Latência até ao primeiro pedaço de áudio e latência total das últimas sínteses em stream.
+    """
+    return elevenlabs_service.stream_stats.summary()
+
+
+@router.get("/cache/stats")
+async def audio_cache_stats():
+    """
+    Estatísticas do cache de áudio: taxa de acertos e bytes que não foram pedidos à API.
+    """
+    return audio_cache.stats()
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional
+
+from app.models.audio_job import JobStatus
+
+
+class AudioJobProgress(BaseModel):
+    """Progresso de um trabalho de geração de áudio."""
+    job_id: int
+    document_id: int
+    status: JobStatus
+    segments_done: int
+    segments_total: int
+    percent: float
+    chunks_done: int
+    bytes_produced: int
+    attempts: int
+    elapsed_seconds: Optional[float] = None
+    # Estimativa pelo ritmo da execução atual (None enquanto nenhum segmento terminou)
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
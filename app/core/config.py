@@ -1,6 +1,10 @@
 import os
-from typing import List
+from typing import List, Optional
 from dotenv import load_dotenv
+# Raiz privada dos caches em disco (no diretório do utilizador, não no /tmp partilhado)
+_CACHE_ROOT = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "api_pdf")
+
+
 class Settings:
     """
     Classe para centralizar as configurações da aplicação.
@@ -44,8 +48,103 @@ class Settings:
     S3_BUCKET_NAME: str = os.getenv("S3_BUCKET_NAME")
     S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL")
     REGION: str = os.getenv("AWS_REGION", "us-east-1")
+    # Uploads multipart para o S3: tamanho a partir do qual o multipart é usado,
+    # tamanho de cada parte (mínimo de 5 MiB imposto pelo S3) e partes enviadas em paralelo.
+    S3_MULTIPART_THRESHOLD_BYTES: int = int(os.getenv("S3_MULTIPART_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+    S3_MULTIPART_CHUNK_BYTES: int = int(os.getenv("S3_MULTIPART_CHUNK_BYTES", str(8 * 1024 * 1024)))
+    S3_MAX_CONCURRENCY: int = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+    # Downloads para ficheiro temporário: tamanho de cada bloco lido do S3 e diretório
+    # onde os ficheiros são criados (vazio = diretório temporário do sistema).
+    S3_DOWNLOAD_CHUNK_BYTES: int = int(os.getenv("S3_DOWNLOAD_CHUNK_BYTES", str(1024 * 1024)))
+    DOWNLOAD_TEMP_DIR: Optional[str] = os.getenv("DOWNLOAD_TEMP_DIR") or None
+    # PDFs enviados aos endpoints: tamanho máximo, blocos copiados para o ficheiro
+    # temporário e diretório onde este é criado (por omissão, o dos downloads).
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(256 * 1024 * 1024)))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+    UPLOAD_TEMP_DIR: Optional[str] = os.getenv("UPLOAD_TEMP_DIR") or DOWNLOAD_TEMP_DIR
+    # Downloads por intervalos (Range) em paralelo: objetos a partir deste tamanho são
+    # obtidos em partes de S3_DOWNLOAD_PART_BYTES, até S3_MAX_CONCURRENCY em simultâneo.
+    S3_RANGED_DOWNLOAD_THRESHOLD_BYTES: int = int(os.getenv("S3_RANGED_DOWNLOAD_THRESHOLD_BYTES", str(16 * 1024 * 1024)))
+    S3_DOWNLOAD_PART_BYTES: int = int(os.getenv("S3_DOWNLOAD_PART_BYTES", str(8 * 1024 * 1024)))
+    # Publicação em lote (S3Service.publish_many): objetos enviados em simultâneo e novas
+    # tentativas por objeto. S3_PUBLIC_BASE_URL substitui "<endpoint>/<bucket>" nas URLs
+    # públicas (por exemplo, um CDN à frente do bucket).
+    S3_PUBLISH_CONCURRENCY: int = int(os.getenv("S3_PUBLISH_CONCURRENCY", "4"))
+    S3_PUBLISH_RETRIES: int = int(os.getenv("S3_PUBLISH_RETRIES", "2"))
+    S3_PUBLIC_BASE_URL: Optional[str] = os.getenv("S3_PUBLIC_BASE_URL") or None
     ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY")
     ELEVENLABS_VOICE_ID: str = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+    # Síntese por pedaços: tamanho máximo de cada pedaço (limite de caracteres por pedido)
+    # e número máximo de pedidos simultâneos à ElevenLabs.
+    ELEVENLABS_MAX_CHUNK_CHARS: int = int(os.getenv("ELEVENLABS_MAX_CHUNK_CHARS", "2500"))
+    ELEVENLABS_MAX_CONCURRENCY: int = int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "4"))
+    # Segmentos de um documento gerados em simultâneo pelo AudioGenerationService
+    # (os pedidos à API continuam limitados por ELEVENLABS_MAX_CONCURRENCY).
+    AUDIO_GENERATION_WORKERS: int = int(os.getenv("AUDIO_GENERATION_WORKERS", "4"))
+
+    # Fila de trabalhos em Postgres e processo worker (python -m app.worker)
+    # WORKER_CONCURRENCY: trabalhos executados em simultâneo por processo worker.
+    # JOB_VISIBILITY_TIMEOUT_SECONDS: prazo de reserva de um trabalho, prolongado enquanto
+    #   corre; se o worker morrer, o trabalho volta à fila quando expira.
+    # JOB_MAX_ATTEMPTS / JOB_RETRY_BACKOFF_SECONDS: tentativas por trabalho e espera
+    #   antes da nova tentativa (duplica a cada falha).
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "2"))
+    WORKER_POLL_INTERVAL_SECONDS: float = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "2"))
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))
+    # Ligações HTTP à ElevenLabs: um pool de ligações keep-alive por processo.
+    # ELEVENLABS_BASE_URL permite apontar para outro servidor (por exemplo, um stub local).
+    ELEVENLABS_BASE_URL: Optional[str] = os.getenv("ELEVENLABS_BASE_URL") or None
+    ELEVENLABS_TIMEOUT_SECONDS: float = float(os.getenv("ELEVENLABS_TIMEOUT_SECONDS", "240"))
+    ELEVENLABS_MAX_CONNECTIONS: int = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", "16"))
+    ELEVENLABS_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("ELEVENLABS_MAX_KEEPALIVE_CONNECTIONS", "16"))
+    ELEVENLABS_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("ELEVENLABS_KEEPALIVE_EXPIRY_SECONDS", "60"))
+
+    # Pool de processos dos endpoints de segmentação (ver app/core/cpu_pool.py)
+    # CPU_POOL_WORKERS: processos do pool. CPU_POOL_QUEUE_SIZE: trabalhos que podem
+    # esperar por um processo livre; acima disso o pedido recebe 503 com Retry-After
+    # de CPU_POOL_RETRY_AFTER_SECONDS.
+    CPU_POOL_WORKERS: int = int(os.getenv("CPU_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+    CPU_POOL_QUEUE_SIZE: int = int(os.getenv("CPU_POOL_QUEUE_SIZE", "4"))
+    CPU_POOL_RETRY_AFTER_SECONDS: int = int(os.getenv("CPU_POOL_RETRY_AFTER_SECONDS", "10"))
+
+    # Extração de características em paralelo: número de processos e
+    # tamanho mínimo (em páginas) a partir do qual o modo paralelo é usado.
+    FEATURE_EXTRACTION_WORKERS: int = int(os.getenv("FEATURE_EXTRACTION_WORKERS", "1"))
+    FEATURE_EXTRACTION_MIN_PAGES: int = int(os.getenv("FEATURE_EXTRACTION_MIN_PAGES", "100"))
+
+    # Cache em disco dos resultados de extração (texto por página, características, capítulos).
+    # Os diretórios dos caches são criados só com acesso para o próprio utilizador (0700).
+    EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_DIR: str = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(_CACHE_ROOT, "extraction_cache"))
+    EXTRACTION_CACHE_MAX_BYTES: int = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+    # Cache do áudio sintetizado (texto, voz, modelo, configurações e formato)
+    # AUDIO_CACHE_MAX_AGE_SECONDS: idade máxima de uma entrada sem uso (0 = sem limite).
+    # AUDIO_CACHE_S3_PREFIX: se definido, as entradas são também guardadas no bucket sob este prefixo.
+    AUDIO_CACHE_ENABLED: bool = os.getenv("AUDIO_CACHE_ENABLED", "true").lower() == "true"
+    AUDIO_CACHE_DIR: str = os.getenv("AUDIO_CACHE_DIR", os.path.join(_CACHE_ROOT, "audio_cache"))
+    AUDIO_CACHE_MAX_BYTES: int = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+    AUDIO_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("AUDIO_CACHE_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+    AUDIO_CACHE_S3_PREFIX: Optional[str] = os.getenv("AUDIO_CACHE_S3_PREFIX") or None
+    # Áudio de um segmento acima deste tamanho passa da memória para um ficheiro temporário
+    AUDIO_SINK_SPOOL_BYTES: int = int(os.getenv("AUDIO_SINK_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+    # Modelo spaCy usado apenas para fronteiras de sentenças.
+    # SPACY_SENTENCE_COMPONENT: "parser" (mesmas fronteiras de sempre) ou "senter" (mais leve).
+    # SPACY_EAGER_LOAD: carrega o modelo no arranque da aplicação em vez de no primeiro uso.
+    SPACY_MODEL: str = os.getenv("SPACY_MODEL", "pt_core_news_sm")
+    SPACY_SENTENCE_COMPONENT: str = os.getenv("SPACY_SENTENCE_COMPONENT", "parser")
+    SPACY_EAGER_LOAD: bool = os.getenv("SPACY_EAGER_LOAD", "false").lower() == "true"
+    # Reconstrução de sentenças em lote (nlp.pipe)
+    # SPACY_BATCH_SIZE: número de textos processados por lote.
+    # SPACY_N_PROCESS: processos usados pelo spaCy (1 = no próprio processo).
+    SPACY_BATCH_SIZE: int = int(os.getenv("SPACY_BATCH_SIZE", "32"))
+    SPACY_N_PROCESS: int = int(os.getenv("SPACY_N_PROCESS", "1"))
+    # Divisor de sentenças do pré-processador: "spacy" (modelo estatístico) ou
+    # "rule" (regras e lista de abreviaturas pt-BR, sem carregar o modelo).
+    SENTENCE_SPLITTER: str = os.getenv("SENTENCE_SPLITTER", "spacy")
 
 # Instância única das configurações para ser importada em outros módulos
 settings = Settings()
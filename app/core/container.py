@@ -0,0 +1,91 @@
+# app/core/container.py
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app.core.cpu_pool import CPUPool
+from app.services.audio_generation_service import AudioGenerationService
+from app.services.audiobook_generator_service import AudiobookGeneratorService
+from app.services.elevenlabs_service import ElevenLabsService, close_http_clients
+from app.services.pdf_segmenter import PDFSegmenterService
+from app.services.s3_service import S3Service
+from app.services.text_extraction_service import TextExtractionService
+from app.services.text_preprocessor_service import TextPreprocessorService
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Serviços partilhados pela aplicação, criados uma única vez no arranque (lifespan)
+    em vez de a cada pedido.
+
+    Todos os serviços aqui guardados podem ser usados em simultâneo por vários pedidos
+    e threads: os clientes boto3 e httpx são thread-safe e os restantes serviços não
+    guardam estado por pedido.
+
+    O S3 e a ElevenLabs dependem de configuração externa; se esta faltar, o respetivo
+    serviço fica indisponível (None) e os endpoints que precisam dele respondem 503,
+    sem impedir o arranque da aplicação.
+    """
+
+    def __init__(self):
+        self.pdf_segmenter = PDFSegmenterService()
+        # Processos para a segmentação pedida pelos endpoints (criados no primeiro uso)
+        self.cpu_pool = CPUPool()
+        self.preprocessor = TextPreprocessorService()
+        self.s3_service: Optional[S3Service] = self._build("S3Service", S3Service)
+        self.elevenlabs_service: Optional[ElevenLabsService] = self._build("ElevenLabsService", ElevenLabsService)
+
+        self.text_extraction_service = TextExtractionService(
+            pdf_segmenter=self.pdf_segmenter,
+            preprocessor=self.preprocessor,
+            s3_service=self.s3_service,
+        )
+        self.audiobook_service: Optional[AudiobookGeneratorService] = None
+        self.audio_generation_service: Optional[AudioGenerationService] = None
+        if self.s3_service and self.elevenlabs_service:
+            self.audiobook_service = AudiobookGeneratorService(
+                pdf_segmenter=self.pdf_segmenter,
+                elevenlabs_service=self.elevenlabs_service,
+                s3_service=self.s3_service,
+            )
+            self.audio_generation_service = AudioGenerationService(
+                elevenlabs_service=self.elevenlabs_service,
+                s3_service=self.s3_service,
+            )
+
+    @staticmethod
+    def _build(name: str, factory):
+        try:
+            return factory()
+        except Exception as e:
+            logger.error(f"Não foi possível inicializar o {name}: {e}")
+            return None
+
+    async def aclose(self) -> None:
+        """Liberta threads, pools de ligações e clientes dos serviços."""
+        if self.elevenlabs_service is not None:
+            self.elevenlabs_service.close()
+        if self.s3_service is not None:
+            self.s3_service.close()
+        await asyncio.to_thread(self.cpu_pool.shutdown)
+        await close_http_clients()
+        logger.info("Serviços da aplicação encerrados.")
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """Dependência do FastAPI: devolve o contentor criado no lifespan da aplicação."""
+    return request.app.state.services
+
+
+def require(service, name: str):
+    """Devolve o serviço ou responde 503 se não estiver disponível por falta de configuração."""
+    if service is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"O serviço {name} não está disponível devido a um erro de configuração."
+        )
+    return service
@@ -0,0 +1,225 @@
+# app/core/cpu_pool.py
+"""
+Pool de processos para o trabalho de CPU dos endpoints (segmentação de PDFs).
+
+Os handlers são `async def`: chamar o PDFSegmenterService diretamente bloqueia o
+event loop, e com ele todos os outros pedidos do worker (incluindo /health). Com
+CPUPool.run, a segmentação corre noutro processo e o handler apenas aguarda o
+resultado.
+
+A fila de submissão é limitada: com CPU_POOL_WORKERS processos ocupados e
+CPU_POOL_QUEUE_SIZE trabalhos à espera, um novo pedido é recusado de imediato
+(CPUPoolSaturated, respondido com 503 e Retry-After) em vez de se acumular.
+"""
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.managers import SyncManager
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.extraction_cache import PDFSource
+
+logger = logging.getLogger(__name__)
+
+
+# ===== LADO DOS PROCESSOS DO POOL =====
+# Um PDFSegmenterService por processo, criado no arranque do processo. Dentro do
+# pool a extração de características é sempre serial (FeatureExtractor com um
+# processo): o paralelismo vem do próprio pool, sem pools dentro de pools.
+_worker_segmenter = None
+
+
+def _init_cpu_worker() -> None:
+    global _worker_segmenter
+    from app.services.feature_extractor import FeatureExtractor
+    from app.services.pdf_segmenter import PDFSegmenterService
+    _worker_segmenter = PDFSegmenterService(feature_extractor=FeatureExtractor(max_workers=1))
+
+
+def segment_pdf(pdf_source: PDFSource) -> Dict[str, Any]:
+    """PDFSegmenterService.segment_pdf no processo do pool."""
+    return _worker_segmenter.segment_pdf(pdf_source)
+
+
+# Espera máxima de cada tentativa de entregar um capítulo numa fila cheia, antes de
+# voltar a verificar se o pedido foi cancelado
+_PUT_TIMEOUT_SECONDS = 0.5
+
+
+def _put_unless_cancelled(chapters: "queue.Queue", item: Any, cancelled: "threading.Event") -> bool:
+    """Coloca item na fila, esperando por espaço; False se o pedido for cancelado entretanto."""
+    while not cancelled.is_set():
+        try:
+            chapters.put(item, timeout=_PUT_TIMEOUT_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def write_chapters(pdf_source: PDFSource, chapters: "queue.Queue", cancelled: "threading.Event") -> Dict[str, Any]:
+    """
+    PDFSegmenterService.iter_chapters no processo do pool: cada capítulo é colocado na
+    fila `chapters` (limitada, partilhada através do CPUPool.manager()) assim que fica
+    fechado, para que a aplicação o possa enviar ao cliente enquanto o resto do livro
+    é analisado; no fim é colocado None. Entre capítulos é verificado `cancelled`
+    (ativado quando o cliente se desliga): nesse caso a análise pára e o lugar no pool
+    é libertado.
+
+    Returns:
+        O número de capítulos entregues e se o pedido foi cancelado.
+    """
+    count = 0
+    chapter_iter = _worker_segmenter.iter_chapters(pdf_source)
+    try:
+        for chapter in chapter_iter:
+            if not _put_unless_cancelled(chapters, {"type": "chapter", "index": count, **chapter}, cancelled):
+                return {"chapters": count, "cancelled": True}
+            count += 1
+            if cancelled.is_set():
+                return {"chapters": count, "cancelled": True}
+    finally:
+        chapter_iter.close()
+    _put_unless_cancelled(chapters, None, cancelled)
+    return {"chapters": count, "cancelled": False}
+
+
+def segment_units(pdf_source: PDFSource, segmentation_mode: str) -> List[Dict[str, Any]]:
+    """AudiobookGeneratorService.segment (unidades por página ou capítulo) no processo do pool."""
+    from app.services.audiobook_generator_service import AudiobookGeneratorService
+    # A segmentação só usa o pdf_segmenter; a síntese e o S3 ficam no processo da aplicação.
+    service = AudiobookGeneratorService(pdf_segmenter=_worker_segmenter, elevenlabs_service=None, s3_service=None)
+    return service.segment(pdf_source, segmentation_mode)
+
+
+# ===== LADO DA APLICAÇÃO =====
+class CPUPoolSaturated(RuntimeError):
+    """Todos os processos estão ocupados e a fila de submissão está cheia."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("O pool de processamento de documentos está saturado.")
+        self.retry_after = retry_after
+
+
+class CPUPool:
+    """
+    ProcessPoolExecutor com um limite de trabalhos em curso (em execução + à espera).
+
+    Os processos são criados com "spawn" (a aplicação já tem threads e clientes
+    HTTP abertos, que não devem ser herdados por fork) e só quando o primeiro
+    trabalho é submetido. Se um processo morrer (por exemplo, sem memória), o pool
+    é recriado no pedido seguinte.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.max_workers = max(1, max_workers or settings.CPU_POOL_WORKERS)
+        self.queue_size = max(0, queue_size if queue_size is not None else settings.CPU_POOL_QUEUE_SIZE)
+        self.capacity = self.max_workers + self.queue_size
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager: Optional[SyncManager] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_cpu_worker,
+                )
+            return self._executor
+
+    def manager(self) -> SyncManager:
+        """
+        Devolve o gestor de objetos partilhados (filas, eventos) com os processos do
+        pool, arrancando-o no primeiro uso.
+        """
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            return self._manager
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise CPUPoolSaturated(settings.CPU_POOL_RETRY_AFTER_SECONDS)
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Trabalhos em curso e capacidade do pool."""
+        return {"in_flight": self._in_flight, "capacity": self.capacity, "workers": self.max_workers}
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Executa fn(*args) num processo do pool e aguarda o resultado sem bloquear o
+        event loop. fn e os argumentos têm de ser serializáveis (funções de módulo).
+
+        Raises:
+            CPUPoolSaturated: Se o pool não aceitar mais trabalhos.
+        """
+        return await self.submit(fn, *args)
+
+    def submit(self, fn: Callable[..., Any], *args) -> asyncio.Future:
+        """
+        Como run, mas devolve o future sem o aguardar. O lugar no pool só é libertado
+        quando o trabalho termina no processo, mesmo que ninguém chegue a aguardar o
+        resultado ou que o future devolvido seja cancelado (o cancelamento só retira
+        da fila um trabalho que ainda não começou).
+
+        Raises:
+            CPUPoolSaturated: Se o pool não aceitar mais trabalhos.
+        """
+        self._acquire()
+        try:
+            executor = self._get_executor()
+            # O lugar fica preso ao future do concurrent.futures, que só termina quando
+            # o processo acaba; o future asyncio devolvido é apenas uma vista sobre ele.
+            process_future = executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        process_future.add_done_callback(lambda f: self._on_done(executor, f))
+        return asyncio.wrap_future(process_future)
+
+    def _on_done(self, executor: ProcessPoolExecutor, future: Future) -> None:
+        self._release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            logger.error("Um processo do pool de CPU terminou inesperadamente; o pool vai ser recriado.")
+            self._reset_executor(executor)
+
+    def shutdown(self) -> None:
+        """Termina os processos do pool e o gestor de objetos partilhados."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+
+def service_unavailable(error: CPUPoolSaturated) -> HTTPException:
+    """Resposta 503 para um pool saturado, com o tempo de espera sugerido em Retry-After."""
+    return HTTPException(
+        status_code=503,
+        detail="O servidor está ocupado a processar outros documentos. Tente novamente mais tarde.",
+        headers={"Retry-After": str(error.retry_after)},
+    )
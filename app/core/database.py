@@ -40,3 +40,19 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+
+def create_job_tables() -> None:
+    """
+    Cria, se ainda não existirem, as tabelas que pertencem a esta API (fila de
+    trabalhos, trabalhos de geração de áudio e respetivos checkpoints). As restantes
+    tabelas são geridas pela aplicação TypeScript e não são tocadas.
+    """
+    from app.models.audio_job import JOB_TABLES
+    from app.models.base import Base
+    from app.models.job_queue import QueuedJob
+
+    Base.metadata.create_all(bind=engine, tables=[QueuedJob.__table__, *JOB_TABLES], checkfirst=True)
+    # create_all não acrescenta índices a tabelas que já existiam (por exemplo, o
+    # índice único dos trabalhos ativos, posterior à tabela job_queue).
+    for index in QueuedJob.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,74 @@
+# app/core/uploads.py
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Assinatura de um PDF. A especificação tolera lixo antes do cabeçalho, desde que
+# este apareça no primeiro KiB do ficheiro (como aceitam os leitores de PDF).
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+
+@asynccontextmanager
+async def spool_pdf_upload(file: UploadFile, max_bytes: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Copia o PDF recebido, em blocos, para um ficheiro temporário e devolve o seu
+    caminho; o ficheiro é apagado à saída do bloco `async with`.
+
+    O conteúdo nunca fica inteiro em memória: cada bloco é escrito e descartado, e o
+    PDF é depois aberto pelo caminho (no próprio processo ou no pool de CPU). O
+    primeiro bloco é validado pela assinatura %PDF e o tamanho é limitado a
+    MAX_UPLOAD_BYTES.
+
+    Raises:
+        HTTPException: 400 se o ficheiro estiver vazio ou não for um PDF, 413 se
+            exceder o tamanho máximo.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"O arquivo excede o tamanho máximo permitido de {max_bytes // (1024 * 1024)} MiB."
+    )
+    # O Starlette já conhece o tamanho quando o corpo multipart foi lido por inteiro
+    if file.size is not None and file.size > max_bytes:
+        logger.warning(f"Upload de {file.filename} recusado: {file.size} bytes.")
+        raise too_large
+
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf", dir=settings.UPLOAD_TEMP_DIR)
+    try:
+        try:
+            size = 0
+            while True:
+                block = await file.read(settings.UPLOAD_CHUNK_BYTES)
+                if not block:
+                    break
+                if size == 0 and PDF_MAGIC not in block[:PDF_MAGIC_WINDOW]:
+                    logger.warning(f"Upload de {file.filename} recusado: não tem a assinatura de um PDF.")
+                    raise HTTPException(status_code=400, detail="O arquivo enviado não é um PDF válido.")
+                size += len(block)
+                if size > max_bytes:
+                    logger.warning(f"Upload de {file.filename} recusado: mais de {max_bytes} bytes.")
+                    raise too_large
+                os.write(fd, block)
+        finally:
+            os.close(fd)
+
+        if size == 0:
+            logger.warning(f"Arquivo PDF vazio recebido: {file.filename}")
+            raise HTTPException(status_code=400, detail="O arquivo PDF não pode estar vazio.")
+
+        logger.info(f"Upload de {file.filename} guardado em '{path}' ({size} bytes).")
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
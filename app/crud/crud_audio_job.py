@@ -0,0 +1,192 @@
+# app/crud/crud_audio_job.py
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.models.audio_job import AudioGenerationJob, AudioJobSegment, AudioJobChunk, JobStatus
+
+
+def _utcnow() -> datetime:
+    # As colunas DateTime não guardam fuso horário; os instantes são sempre em UTC.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def get_job(db: Session, job_id: int) -> Optional[AudioGenerationJob]:
+    """Obtém um trabalho de geração de áudio pelo seu ID."""
+    return db.query(AudioGenerationJob).filter(AudioGenerationJob.id == job_id).first()
+
+
+def get_latest_job_for_document(db: Session, document_id: int) -> Optional[AudioGenerationJob]:
+    """Obtém o trabalho mais recente de um documento."""
+    return (
+        db.query(AudioGenerationJob)
+        .filter(AudioGenerationJob.book_id == document_id)
+        .order_by(AudioGenerationJob.id.desc())
+        .first()
+    )
+
+
+def start_job(db: Session, document_id: int) -> AudioGenerationJob:
+    """
+    Inicia (ou retoma) o trabalho de geração de áudio de um documento.
+
+    Se o trabalho mais recente não terminou com sucesso, é reutilizado, com os seus
+    checkpoints; caso contrário é criado um novo.
+    """
+    job = get_latest_job_for_document(db, document_id)
+    if job is None or job.status == JobStatus.COMPLETED:
+        job = AudioGenerationJob(book_id=document_id, attempts=0)
+        db.add(job)
+    job.status = JobStatus.RUNNING
+    job.attempts = (job.attempts or 0) + 1
+    job.started_at = _utcnow()
+    job.finished_at = None
+    job.error = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def sync_job_segments(db: Session, job: AudioGenerationJob, segments: Iterable[dict]) -> Dict[int, AudioJobSegment]:
+    """
+    Cria ou atualiza os checkpoints dos segmentos do trabalho.
+
+    Args:
+        segments: Um dicionário por segmento com "id", "segment_index", "content_hash"
+            e, se o segmento já tem áudio, "audio_file_key" e "audio_file_size".
+
+    Returns:
+        Os checkpoints, indexados pelo ID do segmento.
+    """
+    existing = {js.segment_id: js for js in job.segments}
+    by_segment: Dict[int, AudioJobSegment] = {}
+    for segment in segments:
+        job_segment = existing.get(segment["id"])
+        if job_segment is None:
+            job_segment = AudioJobSegment(
+                segment_id=segment["id"],
+                segment_index=segment["segment_index"],
+                content_hash=segment["content_hash"],
+                status=JobStatus.PENDING,
+            )
+            job.segments.append(job_segment)
+        elif job_segment.content_hash != segment["content_hash"]:
+            # O texto (ou a voz) mudou: os pedaços guardados já não correspondem.
+            job_segment.content_hash = segment["content_hash"]
+            job_segment.status = JobStatus.PENDING
+            job_segment.chunks.clear()
+
+        if segment.get("audio_file_key"):
+            job_segment.status = JobStatus.COMPLETED
+            job_segment.storage_key = segment["audio_file_key"]
+            job_segment.size_bytes = int(segment.get("audio_file_size") or 0)
+        elif job_segment.status == JobStatus.COMPLETED:
+            # Checkpoint sem áudio registado no segmento: gera de novo.
+            job_segment.status = JobStatus.PENDING
+        by_segment[segment["id"]] = job_segment
+
+    completed = [js for js in by_segment.values() if js.status == JobStatus.COMPLETED]
+    job.total_segments = len(by_segment)
+    job.done_segments = len(completed)
+    job.resumed_segments = len(completed)
+    job.bytes_produced = sum(js.size_bytes or 0 for js in completed)
+    db.commit()
+    return by_segment
+
+
+def record_chunks(db: Session, chunks: List[Tuple[AudioJobSegment, int, int, str, Optional[str], int]]) -> None:
+    """
+    Regista os pedaços de TTS já sintetizados, num único commit.
+
+    Args:
+        chunks: Tuplos (checkpoint do segmento, índice do pedaço, total de pedaços,
+            hash do conteúdo, local de armazenamento, tamanho em bytes).
+    """
+    if not chunks:
+        return
+    for job_segment, chunk_index, chunks_total, content_hash, storage_key, size_bytes in chunks:
+        job_segment.chunks_total = chunks_total
+        job_segment.status = JobStatus.RUNNING
+        chunk = next((c for c in job_segment.chunks if c.chunk_index == chunk_index), None)
+        if chunk is None:
+            chunk = AudioJobChunk(chunk_index=chunk_index)
+            job_segment.chunks.append(chunk)
+        chunk.content_hash = content_hash
+        chunk.storage_key = storage_key
+        chunk.size_bytes = size_bytes
+        chunk.status = JobStatus.COMPLETED
+    db.commit()
+
+
+def complete_segment(
+    db: Session,
+    job: AudioGenerationJob,
+    job_segment: AudioJobSegment,
+    storage_key: str,
+    size_bytes: int,
+    seconds: float
+) -> None:
+    """Marca o segmento como concluído e atualiza o progresso do trabalho."""
+    job_segment.status = JobStatus.COMPLETED
+    job_segment.storage_key = storage_key
+    job_segment.size_bytes = size_bytes
+    job_segment.seconds = seconds
+    job_segment.error = None
+    job.done_segments = (job.done_segments or 0) + 1
+    job.bytes_produced = (job.bytes_produced or 0) + size_bytes
+    db.commit()
+
+
+def fail_segment(db: Session, job_segment: AudioJobSegment, error: str) -> None:
+    """Marca o segmento como falhado; os pedaços já registados continuam válidos."""
+    job_segment.status = JobStatus.FAILED
+    job_segment.error = error
+    db.commit()
+
+
+def finish_job(db: Session, job: AudioGenerationJob, error: Optional[str] = None) -> None:
+    """Termina o trabalho, com sucesso ou com o erro indicado."""
+    job.status = JobStatus.FAILED if error else JobStatus.COMPLETED
+    job.error = error
+    job.finished_at = _utcnow()
+    db.commit()
+
+
+def get_job_progress(db: Session, job: AudioGenerationJob) -> dict:
+    """
+    Progresso do trabalho: segmentos concluídos / total, bytes produzidos e tempo
+    restante estimado pelo ritmo dos segmentos concluídos na execução atual.
+    """
+    chunks_done = (
+        db.query(func.count(AudioJobChunk.id))
+        .join(AudioJobSegment, AudioJobChunk.job_segment_id == AudioJobSegment.id)
+        .filter(AudioJobSegment.job_id == job.id)
+        .scalar()
+    )
+    total = job.total_segments or 0
+    done = job.done_segments or 0
+
+    elapsed = None
+    eta = None
+    if job.started_at:
+        elapsed = ((job.finished_at or _utcnow()) - job.started_at).total_seconds()
+        done_this_run = done - (job.resumed_segments or 0)
+        if job.status == JobStatus.RUNNING:
+            eta = elapsed / done_this_run * (total - done) if done_this_run > 0 else None
+        elif job.status == JobStatus.COMPLETED:
+            eta = 0.0
+
+    return {
+        "job_id": job.id,
+        "document_id": job.book_id,
+        "status": job.status,
+        "segments_done": done,
+        "segments_total": total,
+        "percent": round(100.0 * done / total, 1) if total else 0.0,
+        "chunks_done": chunks_done,
+        "bytes_produced": job.bytes_produced or 0,
+        "attempts": job.attempts or 0,
+        "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "error": job.error,
+    }
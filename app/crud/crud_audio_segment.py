@@ -55,3 +55,21 @@ def update_segment_audio_url(
         db.commit()
         db.refresh(db_segment)
     return db_segment
+
+
+def update_segment_audio(
+    db: Session,
+    segment_id: int,
+    audio_file_key: str,
+    audio_file_size: int
+) -> AudioSegment | None:
+    """
+    Regista o áudio gerado para um segmento (chave no S3 e tamanho em bytes) e faz
+    commit de imediato, para que o progresso sobreviva a uma falha do processo.
+    """
+    db_segment = db.query(AudioSegment).filter(AudioSegment.id == segment_id).first()
+    if db_segment:
+        db_segment.audio_file_key = audio_file_key
+        db_segment.audio_file_size = audio_file_size
+        db.commit()
+    return db_segment
@@ -0,0 +1,223 @@
+# app/crud/crud_job_queue.py
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from typing import Optional
+from app.core.config import settings
+from app.crud import crud_document
+from app.models.document import ProcessingStatus
+from app.models.job_queue import ACTIVE_JOB_STATUSES, QueuedJob, QueuedJobStatus
+
+
+class ActiveJobConflict(RuntimeError):
+    """Já existe um trabalho ativo com o mesmo tipo e dedupe_key, mas com outros argumentos."""
+
+    def __init__(self, job: QueuedJob):
+        super().__init__(
+            f"Já existe um trabalho '{job.kind}' ativo (ID {job.id}) para '{job.dedupe_key}' com outros argumentos."
+        )
+        self.job = job
+
+
+def _utcnow() -> datetime:
+    # As colunas DateTime não guardam fuso horário; os instantes são sempre em UTC.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def get_job(db: Session, job_id: int) -> Optional[QueuedJob]:
+    """Obtém um trabalho da fila pelo seu ID."""
+    return db.query(QueuedJob).filter(QueuedJob.id == job_id).first()
+
+
+def _get_active(db: Session, kind: str, dedupe_key: str) -> Optional[QueuedJob]:
+    return (
+        db.query(QueuedJob)
+        .filter(
+            QueuedJob.kind == kind,
+            QueuedJob.dedupe_key == dedupe_key,
+            QueuedJob.status.in_(ACTIVE_JOB_STATUSES),
+        )
+        .first()
+    )
+
+
+def _same_job(active: QueuedJob, payload: dict) -> QueuedJob:
+    if (active.payload or {}) != payload:
+        raise ActiveJobConflict(active)
+    return active
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict,
+    dedupe_key: Optional[str] = None,
+    max_attempts: Optional[int] = None
+) -> QueuedJob:
+    """
+    Coloca um trabalho na fila e devolve-o.
+
+    Com dedupe_key, se já existir um trabalho do mesmo tipo e chave à espera ou em
+    execução, é esse que é devolvido, em vez de criar outro. O índice único parcial
+    sobre (kind, dedupe_key) dos trabalhos ativos garante-o mesmo com pedidos
+    simultâneos: quem perde a corrida na inserção recebe o trabalho do outro.
+
+    Raises:
+        ActiveJobConflict: Se o trabalho ativo com a mesma chave tiver outro payload
+            (por exemplo, outro divisor de sentenças), que seria ignorado.
+    """
+    while True:
+        if dedupe_key is not None:
+            active = _get_active(db, kind, dedupe_key)
+            if active:
+                return _same_job(active, payload)
+
+        job = QueuedJob(
+            kind=kind,
+            payload=payload,
+            dedupe_key=dedupe_key,
+            status=QueuedJobStatus.QUEUED,
+            attempts=0,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            run_after=_utcnow(),
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Outro pedido inseriu o mesmo trabalho entre a consulta e a inserção;
+            # volta a consultar (se entretanto já terminou, tenta inserir de novo).
+            db.rollback()
+            if dedupe_key is None:
+                raise
+            continue
+        db.refresh(job)
+        return job
+
+
+def claim(db: Session, worker_id: str, visibility_timeout: float) -> Optional[QueuedJob]:
+    """
+    Reserva o próximo trabalho disponível para este worker.
+
+    Disponível é um trabalho à espera cujo run_after já passou, ou um trabalho em
+    execução cuja reserva expirou (o worker que o tinha morreu). A linha é
+    bloqueada com FOR UPDATE SKIP LOCKED, pelo que vários workers podem reservar em
+    simultâneo sem esperarem uns pelos outros nem ficarem com o mesmo trabalho.
+    """
+    while True:
+        now = _utcnow()
+        job = (
+            db.query(QueuedJob)
+            .filter(or_(
+                and_(QueuedJob.status == QueuedJobStatus.QUEUED, QueuedJob.run_after <= now),
+                and_(QueuedJob.status == QueuedJobStatus.RUNNING, QueuedJob.locked_until < now),
+            ))
+            .order_by(QueuedJob.run_after, QueuedJob.id)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+            .first()
+        )
+        if job is None:
+            db.commit()
+            return None
+
+        if job.status == QueuedJobStatus.RUNNING and job.attempts >= job.max_attempts:
+            # A reserva expirou na última tentativa: o trabalho não volta a correr.
+            job.status = QueuedJobStatus.FAILED
+            job.last_error = job.last_error or f"Reserva expirada (worker {job.locked_by} sem resposta)."
+            job.locked_by = None
+            job.locked_until = None
+            job.finished_at = now
+            # O handler que registaria a falha no documento já não vai correr.
+            document_id = (job.payload or {}).get("document_id")
+            if document_id is not None:
+                crud_document.update_document_status(db, document_id, ProcessingStatus.FAILED)
+            db.commit()
+            continue
+
+        job.status = QueuedJobStatus.RUNNING
+        job.attempts = (job.attempts or 0) + 1
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=visibility_timeout)
+        db.commit()
+        db.refresh(job)
+        return job
+
+
+def extend_lease(db: Session, job_id: int, worker_id: str, visibility_timeout: float) -> bool:
+    """Prolonga a reserva de um trabalho em execução; False se já não pertence a este worker."""
+    updated = (
+        db.query(QueuedJob)
+        .filter(
+            QueuedJob.id == job_id,
+            QueuedJob.locked_by == worker_id,
+            QueuedJob.status == QueuedJobStatus.RUNNING,
+        )
+        .update(
+            {QueuedJob.locked_until: _utcnow() + timedelta(seconds=visibility_timeout)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return updated == 1
+
+
+def _update_if_owned(db: Session, job: QueuedJob, worker_id: str, values: dict) -> bool:
+    """Atualiza o trabalho só se ainda estiver em execução e reservado por este worker."""
+    updated = (
+        db.query(QueuedJob)
+        .filter(
+            QueuedJob.id == job.id,
+            QueuedJob.locked_by == worker_id,
+            QueuedJob.status == QueuedJobStatus.RUNNING,
+        )
+        .update(values, synchronize_session=False)
+    )
+    db.commit()
+    return updated == 1
+
+
+def complete(db: Session, job: QueuedJob, worker_id: str) -> bool:
+    """
+    Marca o trabalho como concluído.
+
+    Returns:
+        False se a reserva já não pertence a este worker (expirou e o trabalho foi
+        reservado por outro); nesse caso o trabalho não é alterado.
+    """
+    return _update_if_owned(db, job, worker_id, {
+        QueuedJob.status: QueuedJobStatus.DONE,
+        QueuedJob.locked_by: None,
+        QueuedJob.locked_until: None,
+        QueuedJob.last_error: None,
+        QueuedJob.finished_at: _utcnow(),
+    })
+
+
+def fail(db: Session, job: QueuedJob, error: str, worker_id: str) -> Optional[bool]:
+    """
+    Regista a falha de uma tentativa. O trabalho volta à fila, com espera crescente
+    (JOB_RETRY_BACKOFF_SECONDS, a duplicar), até max_attempts; depois fica FAILED.
+
+    Returns:
+        True se o trabalho vai ser tentado de novo, False se ficou FAILED, ou None se
+        a reserva já não pertence a este worker (o trabalho não é alterado).
+    """
+    values = {
+        QueuedJob.last_error: error,
+        QueuedJob.locked_by: None,
+        QueuedJob.locked_until: None,
+    }
+    retry = job.attempts < job.max_attempts
+    if retry:
+        values[QueuedJob.status] = QueuedJobStatus.QUEUED
+        values[QueuedJob.run_after] = _utcnow() + timedelta(
+            seconds=settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** max(0, job.attempts - 1)
+        )
+    else:
+        values[QueuedJob.status] = QueuedJobStatus.FAILED
+        values[QueuedJob.finished_at] = _utcnow()
+    if not _update_if_owned(db, job, worker_id, values):
+        return None
+    return retry
@@ -1,4 +1,6 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.endpoints.pdf import router as pdf_router
@@ -6,6 +8,10 @@ from app.api.v1.endpoints.tts import router as tts_router
 from app.api.v1.endpoints.audiobook import router as audiobook_router
 from app.api.v1.endpoints.extractText import router as extracttext_router
 from app.api.v1.endpoints.document import router as document_router  # NOVO
+from app.core.config import settings
+from app.core.container import ServiceContainer
+from app.core.database import create_job_tables
+from app.services.text_preprocessor_service import warm_up_nlp
 import logging
 
 # Configurar logging
@@ -15,11 +21,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Recursos partilhados pela aplicação durante o seu ciclo de vida."""
+    # Por omissão o modelo spaCy é carregado no primeiro uso; com SPACY_EAGER_LOAD
+    # o custo é pago no arranque, antes de o worker aceitar pedidos.
+    if settings.SPACY_EAGER_LOAD:
+        logger.info(f"Modelo spaCy pré-carregado: {warm_up_nlp()}")
+    # Tabelas dos trabalhos de geração de áudio (checkpoints), próprias desta API.
+    try:
+        await asyncio.to_thread(create_job_tables)
+    except Exception as e:
+        logger.error(f"Não foi possível criar as tabelas dos trabalhos de áudio: {e}")
+    # Serviços criados uma vez e partilhados por todos os pedidos (ver get_services).
+    app.state.services = ServiceContainer()
+    yield
+    # Termina threads e fecha os clientes e pools de ligações (S3, ElevenLabs).
+    await app.state.services.aclose()
+
+
 # Cria a instância da aplicação FastAPI
 app = FastAPI(
     title="PDF to Audiobook API",
     description="API completa para conversão de PDFs em audiobooks com segmentação inteligente.",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
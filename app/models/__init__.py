@@ -1,3 +1,6 @@
 from .base import Base
 from .user import User
-from .document import Document
\ No newline at end of file
+from .document import Document
+from .audio_segment import AudioSegment
+from .audio_job import AudioGenerationJob, AudioJobSegment, AudioJobChunk
+from .job_queue import QueuedJob
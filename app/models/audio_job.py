@@ -0,0 +1,134 @@
+import enum
+from sqlalchemy import String, Integer, ForeignKey, Text, BigInteger, DateTime, Float, UniqueConstraint, Enum as SQLAlchemyEnum
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
+from typing import List
+from datetime import datetime
+from .base import Base
+
+
+class JobStatus(str, enum.Enum):
+    """Estados de um trabalho de geração de áudio e dos seus checkpoints."""
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
+# Um único tipo enum no PostgreSQL, partilhado pelas três tabelas
+JOB_STATUS_ENUM = SQLAlchemyEnum(JobStatus, name="audio_job_status_enum")
+
+
+class AudioGenerationJob(Base):
+    """
+    Trabalho de geração do áudio de um documento, com o progresso guardado por
+    segmento (AudioJobSegment) e por pedaço de TTS (AudioJobChunk).
+
+    Estas tabelas pertencem a esta API (não à entity TypeScript) e são criadas no
+    arranque da aplicação (ver create_job_tables).
+    """
+    __tablename__ = "audio_generation_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    book_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("books.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    status: Mapped[JobStatus] = mapped_column(
+        JOB_STATUS_ENUM,
+        nullable=False,
+        default=JobStatus.PENDING
+    )
+
+    # ===== PROGRESSO =====
+    total_segments: Mapped[int] = mapped_column(Integer, default=0)
+    done_segments: Mapped[int] = mapped_column(Integer, default=0)
+    # Segmentos já concluídos quando a execução atual começou (para a estimativa de tempo)
+    resumed_segments: Mapped[int] = mapped_column(Integer, default=0)
+    bytes_produced: Mapped[int] = mapped_column(BigInteger, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # ===== TIMESTAMPS =====
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    segments: Mapped[List["AudioJobSegment"]] = relationship(
+        back_populates="job",
+        cascade="all, delete-orphan"
+    )
+
+
+class AudioJobSegment(Base):
+    """Checkpoint de um segmento dentro de um trabalho."""
+    __tablename__ = "audio_job_segments"
+    __table_args__ = (UniqueConstraint("job_id", "segment_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("audio_generation_jobs.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    job: Mapped["AudioGenerationJob"] = relationship(back_populates="segments")
+    segment_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("audio_segments.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    segment_index: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # Hash do pedido de síntese do segmento (texto, voz, modelo, configurações e formato):
+    # se o texto mudar, o checkpoint deixa de valer.
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[JobStatus] = mapped_column(
+        JOB_STATUS_ENUM,
+        nullable=False,
+        default=JobStatus.PENDING
+    )
+    storage_key: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    chunks_total: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    chunks: Mapped[List["AudioJobChunk"]] = relationship(
+        back_populates="job_segment",
+        cascade="all, delete-orphan"
+    )
+
+
+class AudioJobChunk(Base):
+    """
+    Checkpoint de um pedaço de TTS já sintetizado (e pago). content_hash é a chave do
+    pedaço no cache de áudio e storage_key o local onde esse áudio está guardado.
+    """
+    __tablename__ = "audio_job_chunks"
+    __table_args__ = (UniqueConstraint("job_segment_id", "chunk_index"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_segment_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("audio_job_segments.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    job_segment: Mapped["AudioJobSegment"] = relationship(back_populates="chunks")
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    storage_key: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    status: Mapped[JobStatus] = mapped_column(
+        JOB_STATUS_ENUM,
+        nullable=False,
+        default=JobStatus.COMPLETED
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+# Tabelas criadas por create_job_tables no arranque
+JOB_TABLES = [AudioGenerationJob.__table__, AudioJobSegment.__table__, AudioJobChunk.__table__]
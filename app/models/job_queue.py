@@ -0,0 +1,73 @@
+import enum
+from sqlalchemy import String, Integer, Text, DateTime, Index, JSON, Enum as SQLAlchemyEnum, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from datetime import datetime
+from .base import Base
+
+
+class QueuedJobStatus(str, enum.Enum):
+    """Estados de um trabalho na fila."""
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+# Estados de um trabalho que ainda vai correr ou está a correr
+ACTIVE_JOB_STATUSES = (QueuedJobStatus.QUEUED, QueuedJobStatus.RUNNING)
+
+
+class JobKind(str, enum.Enum):
+    """Tipos de trabalho conhecidos pelo worker (guardados como texto, sem enum na base de dados)."""
+    EXTRACT_TEXT = "extract_text"
+    GENERATE_AUDIO = "generate_audio"
+
+
+class QueuedJob(Base):
+    """
+    Trabalho na fila persistente (tabela 'job_queue'), executado pelo processo worker
+    (app/worker.py).
+
+    Os workers reservam trabalhos com SELECT ... FOR UPDATE SKIP LOCKED e ficam com
+    eles até locked_until (o tempo de visibilidade), prolongado enquanto o trabalho
+    corre; se o worker morrer, o trabalho volta a ficar disponível quando esse prazo
+    expira.
+    """
+    __tablename__ = "job_queue"
+    __table_args__ = (
+        Index("ix_job_queue_status_run_after", "status", "run_after"),
+        # No máximo um trabalho ativo por (kind, dedupe_key), mesmo com pedidos simultâneos
+        Index(
+            "uq_job_queue_active_dedupe", "kind", "dedupe_key",
+            unique=True,
+            postgresql_where=text("status IN ('QUEUED', 'RUNNING')"),
+            sqlite_where=text("status IN ('QUEUED', 'RUNNING')"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Tipo do trabalho (ver app/worker.py) e argumentos, em JSON
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    # Evita trabalhos repetidos: no máximo um trabalho ativo por (kind, dedupe_key)
+    dedupe_key: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
+
+    status: Mapped[QueuedJobStatus] = mapped_column(
+        SQLAlchemyEnum(QueuedJobStatus, name="job_queue_status_enum"),
+        nullable=False,
+        default=QueuedJobStatus.QUEUED
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # ===== AGENDAMENTO E RESERVA =====
+    run_after: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    locked_by: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    # ===== TIMESTAMPS =====
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
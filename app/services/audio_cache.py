@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.disk_cache import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RUN = re.compile(r'\s+')
+
+
+def normalize_tts_text(text: str) -> str:
+    """Normalização usada na chave do cache: NFC e espaços reduzidos a um só."""
+    return _WHITESPACE_RUN.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class AudioCache:
+    """
+    Cache do áudio sintetizado, endereçado pelo conteúdo do pedido de TTS: texto
+    normalizado, voz, modelo, configurações de voz e formato de saída.
+
+    O primeiro nível é um cache em disco local com expulsão por tamanho e idade
+    (DiskLRUCache). Opcionalmente, com AUDIO_CACHE_S3_PREFIX definido, as entradas são
+    também guardadas no bucket, partilhadas entre máquinas; a idade dessas entradas
+    deve ser controlada por uma regra de ciclo de vida do bucket sobre o prefixo.
+    """
+
+    def __init__(self, cache: DiskLRUCache = None, s3_service=None, enabled: bool = None):
+        self.enabled = settings.AUDIO_CACHE_ENABLED if enabled is None else enabled
+        self._cache = cache
+        if self.enabled and self._cache is None:
+            self._cache = DiskLRUCache(
+                directory=settings.AUDIO_CACHE_DIR,
+                max_bytes=settings.AUDIO_CACHE_MAX_BYTES,
+                max_age_seconds=settings.AUDIO_CACHE_MAX_AGE_SECONDS or None,
+            )
+        self.s3_prefix = settings.AUDIO_CACHE_S3_PREFIX
+        self._s3_service = s3_service
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._s3_hits = 0
+        self._bytes_saved = 0
+
+    @staticmethod
+    def key(text: str, voice_id: str, model_id: str, voice_settings: Dict[str, Any], output_format: str) -> str:
+        """Calcula a chave (SHA-256) de um pedido de síntese."""
+        payload = json.dumps(
+            {
+                "text": normalize_tts_text(text),
+                "voice_id": voice_id,
+                "model_id": model_id,
+                "voice_settings": voice_settings,
+                "output_format": output_format,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _s3(self):
+        """Serviço S3 do segundo nível, criado no primeiro uso (None se não configurado)."""
+        if not self.s3_prefix:
+            return None
+        if self._s3_service is None:
+            try:
+                from app.services.s3_service import S3Service
+                self._s3_service = S3Service()
+            except Exception as e:
+                logger.warning(f"Cache de áudio no S3 desativado: {e}")
+                self.s3_prefix = None
+                return None
+        return self._s3_service
+
+    def _s3_key(self, key: str) -> str:
+        return f"{self.s3_prefix.rstrip('/')}/{key}.audio"
+
+    def location(self, key: str) -> Optional[str]:
+        """Onde a entrada fica guardada: a chave no bucket, se houver segundo nível, ou o ficheiro local."""
+        if not self.enabled:
+            return None
+        if self._s3() is not None:
+            return self._s3_key(key)
+        return self._cache.path(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Devolve o áudio guardado para a chave, ou None."""
+        if not self.enabled:
+            return None
+
+        audio = self._cache.get(key, label="audio")
+        from_s3 = False
+        if audio is None and self._s3() is not None:
+            try:
+                audio = self._s3().get_object_bytes(self._s3_key(key))
+            except Exception as e:
+                logger.warning(f"Falha ao ler a entrada '{key}' do cache de áudio no S3: {e}")
+                audio = None
+            if audio is not None:
+                from_s3 = True
+                # Traz a entrada para o disco local para os próximos acessos.
+                self._cache.put(key, audio)
+
+        with self._lock:
+            if audio is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._s3_hits += from_s3
+                self._bytes_saved += len(audio)
+        return audio
+
+    def put(self, key: str, audio: bytes) -> None:
+        """Guarda o áudio no disco local e, se configurado, no bucket."""
+        if not self.enabled or not audio:
+            return
+        self._cache.put(key, audio)
+        if self._s3() is not None:
+            try:
+                self._s3().put_object_bytes(self._s3_key(key), audio, content_type="audio/mpeg")
+            except Exception as e:
+                logger.warning(f"Não foi possível guardar '{key}' no cache de áudio no S3: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Taxa de acertos e bytes de áudio que deixaram de ser pedidos à API."""
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            s3_hits, bytes_saved = self._s3_hits, self._bytes_saved
+        lookups = hits + misses
+        return {
+            "enabled": True,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+            "s3_hits": s3_hits,
+            "bytes_saved": bytes_saved,
+            "s3_prefix": self.s3_prefix,
+            "disk": self._cache.stats(),
+        }
+
+
+# Instância partilhada pelos serviços de TTS
+audio_cache = AudioCache()
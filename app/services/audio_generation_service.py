@@ -1,15 +1,33 @@
 import logging
+import queue
 import re
-from elevenlabs import ElevenLabs
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional, Tuple
 from sqlalchemy.orm import Session
 from app.core.config import Settings
-from app.services.elevenlabs_service import ElevenLabsService
+from app.services.audio_cache import AudioCache
+from app.services.elevenlabs_service import ElevenLabsService, MODEL_ID, OUTPUT_FORMAT
 from app.services.s3_service import S3Service
-from app.crud import crud_document, crud_audio_segment  # ✅ Adicionar import
+from app.crud import crud_document, crud_audio_segment, crud_audio_job  # ✅ Adicionar import
+from app.models.audio_job import AudioGenerationJob
 from app.models.document import ProcessingStatus, Document
 
 logger = logging.getLogger(__name__)
 
+# Configurações de voz da geração de áudio dos documentos
+VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75,
+    "style": 0.0,
+    "use_speaker_boost": True,
+    "speed": 1.1,
+}
+
+# Intervalo máximo entre gravações dos checkpoints dos pedaços de TTS
+CHECKPOINT_INTERVAL_SECONDS = 1.0
+
 
 class AudioGenerationService:
     def __init__(self, elevenlabs_service: ElevenLabsService, s3_service: S3Service):
@@ -21,8 +39,21 @@ class AudioGenerationService:
         text = text.replace(" ", "_").lower()
         return text[:100]
 
-    def generate_audio_for_document(self, db: Session, document_id: int):
-        """Gera áudio para todos os segmentos de texto de um documento."""
+    def generate_audio_for_document(
+        self, db: Session, document_id: int, cancel_event: Optional[threading.Event] = None
+    ):
+        """
+        Gera áudio para todos os segmentos de texto de um documento.
+
+        O progresso fica registado num trabalho (AudioGenerationJob), por segmento e por
+        pedaço de TTS; se a geração falhar ou o processo for reiniciado, uma nova
+        chamada retoma o mesmo trabalho a partir do ponto em que parou.
+
+        Se cancel_event for ativado (por exemplo, o worker perdeu a reserva do trabalho
+        da fila e outro worker já o retomou), deixam de ser lançados segmentos e a
+        geração é interrompida sem alterar o estado do documento nem do trabalho.
+        """
+        job = None
         try:
             document = crud_document.get_document(db, document_id)
             if not document:
@@ -35,55 +66,149 @@ class AudioGenerationService:
                 )
 
             crud_document.update_document_status(db, document_id, ProcessingStatus.PROCESSING)
-            logger.info(f"Iniciando geração de áudio para Documento ID {document_id}.")
-            
-            self._process_segments(db, document)
+            job = crud_audio_job.start_job(db, document_id)
+            logger.info(
+                f"Iniciando geração de áudio para Documento ID {document_id} "
+                f"(trabalho {job.id}, tentativa {job.attempts})."
+            )
+
+            self._process_segments(db, document, job, cancel_event)
 
+            crud_audio_job.finish_job(db, job)
             crud_document.update_document_status(db, document_id, ProcessingStatus.COMPLETED)
             logger.info(f"Geração de áudio para Documento ID {document_id} concluída.")
 
         except Exception as e:
+            db.rollback()
+            if cancel_event is not None and cancel_event.is_set():
+                logger.warning(f"Geração de áudio para Documento ID {document_id} interrompida: {e}")
+                return
             logger.error(f"Falha na geração de áudio para Documento ID {document_id}: {e}", exc_info=True)
+            if job is not None:
+                crud_audio_job.finish_job(db, job, error=str(e))
             crud_document.update_document_status(db, document_id, ProcessingStatus.FAILED)
 
-    def _process_segments(self, db: Session, document: Document):
+    def _process_segments(
+        self,
+        db: Session,
+        document: Document,
+        job: AudioGenerationJob,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        """
+        Gera o áudio dos segmentos ainda sem áudio, vários em simultâneo.
+
+        Até AUDIO_GENERATION_WORKERS segmentos são sintetizados e enviados para o S3 em
+        paralelo. Cada segmento é registado (audio_file_key e audio_file_size) e
+        confirmado na base de dados assim que termina, na thread do pedido, que é a
+        única a usar a sessão; a ordem de conclusão não importa: cada segmento mantém
+        o seu segment_index e a chave do ficheiro inclui-o.
+
+        Os checkpoints do trabalho são gravados pela mesma thread: o de cada segmento
+        quando termina e os dos pedaços de TTS, entregues pelas threads de trabalho numa
+        fila, a cada CHECKPOINT_INTERVAL_SECONDS. Ao retomar, os segmentos concluídos
+        são saltados e os pedaços já pagos de um segmento a meio vêm do cache de áudio
+        (pelo hash registado), pelo que não são sintetizados de novo.
+        """
         safe_book_title = self._sanitize_filename(document.title)
-        
-        # ✅ CORRIGIDO: Usar audio_file_key em vez de s3_url
-        segments_to_process = [seg for seg in document.segments if not seg.audio_file_key]
+        voice_id = Settings.ELEVENLABS_VOICE_ID
+
+        # Os dados são copiados da sessão antes de irem para as threads de trabalho,
+        # que não tocam nos objetos do SQLAlchemy.
+        segments = [
+            {
+                "id": seg.id,
+                "segment_index": seg.segment_index,
+                "text": seg.text_content,
+                "audio_file_key": seg.audio_file_key,
+                "audio_file_size": seg.audio_file_size,
+                "content_hash": AudioCache.key(seg.text_content, voice_id, MODEL_ID, VOICE_SETTINGS, OUTPUT_FORMAT),
+                "filename": f"{safe_book_title}/{document.id}_{seg.segment_index:04d}_{self._sanitize_filename(seg.title)}.mp3",
+            }
+            for seg in sorted(document.segments, key=lambda seg: seg.segment_index)
+            if seg.text_content
+        ]
+        job_segments = crud_audio_job.sync_job_segments(db, job, segments)
 
+        # ✅ CORRIGIDO: Usar audio_file_key em vez de s3_url
+        segments_to_process = [seg for seg in segments if not seg["audio_file_key"]]
         if not segments_to_process:
             logger.info(f"Não há segmentos para processar para Documento ID {document.id}.")
             return
-        cont = 0
-        save_path = "audio/audio"
-        voice_settings = {
-            "stability": 0.5,
-            "similarity_boost": 0.75,
-            "style": 0.0,
-            "use_speaker_boost": True,
-            "speed": 1.1,
-        }
-        target_voice_id =  Settings.ELEVENLABS_VOICE_ID
-        for segment in segments_to_process:
-            logger.info(f"Processando segmento {segment.segment_index} do Documento ID {document.id}...")
-            
-            client = ElevenLabs(api_key="sk_1d42f52eab44685f31c192cf9cade0f3ae25181bdd0a1c6c")
-            audio_bytes =client.text_to_speech.convert(
-                    voice_id="v3a2WxCpk7965Lwrexlc",
-                    text=segment.text_content,
-                    model_id="eleven_multilingual_v2",
-                    voice_settings=voice_settings
-                )
-            safe_unit_title = self._sanitize_filename(segment.title)
-            filename = f"{safe_book_title}/{document.id}_{segment.segment_index:04d}_{safe_unit_title}_{cont}.mp3"
-            with open(filename, "wb") as f:
-                for chunk in audio_bytes:
-                    if chunk:
-                        f.write(chunk)
-            
-            # audio_url = self.s3_service.upload_audio(audio_bytes, filename)
-            
-            # ✅ CORRIGIDO: Usar update_segment_audio_url (que agora salva em audio_file_key)
-            # crud_audio_segment.update_segment_audio_url(db, segment_id=segment.id, audio_url=audio_url)
-            # logger.info(f"Segmento {segment.segment_index} salvo. URL: {audio_url}")
+        if not self.elevenlabs_service.cache.enabled:
+            logger.warning("Cache de áudio desativado: ao retomar, os pedaços de um segmento a meio são sintetizados de novo.")
+
+        workers = max(1, min(Settings.AUDIO_GENERATION_WORKERS, len(segments_to_process)))
+        logger.info(
+            f"A gerar {len(segments_to_process)} de {len(segments)} segmento(s) do Documento ID {document.id} "
+            f"com {workers} em simultâneo..."
+        )
+        chunk_events: "queue.Queue[tuple]" = queue.Queue()
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-segment") as executor:
+            futures = {
+                executor.submit(self._generate_segment_audio, segment, chunk_events): segment
+                for segment in segments_to_process
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=CHECKPOINT_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+                if cancel_event is not None and cancel_event.is_set():
+                    # Os segmentos ainda não iniciados são cancelados; os que estão a
+                    # meio terminam (à saída do executor), mas não são registados.
+                    for future in pending:
+                        future.cancel()
+                    raise RuntimeError("Geração cancelada: o trabalho deixou de pertencer a este worker.")
+                self._checkpoint_chunks(db, job_segments, chunk_events)
+                for future in done:
+                    segment = futures[future]
+                    job_segment = job_segments[segment["id"]]
+                    try:
+                        audio_file_key, audio_file_size, seconds = future.result()
+                    except Exception as e:
+                        logger.error(f"Falha no segmento {segment['segment_index']} do Documento ID {document.id}: {e}")
+                        crud_audio_job.fail_segment(db, job_segment, str(e))
+                        failed.append(segment["segment_index"])
+                        continue
+                    crud_audio_segment.update_segment_audio(
+                        db, segment_id=segment["id"], audio_file_key=audio_file_key, audio_file_size=audio_file_size
+                    )
+                    crud_audio_job.complete_segment(db, job, job_segment, audio_file_key, audio_file_size, seconds)
+                    logger.info(
+                        f"Segmento {segment['segment_index']} salvo ({job.done_segments}/{job.total_segments}). "
+                        f"Chave: {audio_file_key} ({audio_file_size} bytes)"
+                    )
+
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} de {len(segments_to_process)} segmento(s) falharam: {sorted(failed)}. "
+                f"Os restantes foram guardados e não serão gerados de novo."
+            )
+
+    def _checkpoint_chunks(self, db: Session, job_segments: dict, chunk_events: queue.Queue) -> None:
+        """Grava os checkpoints dos pedaços de TTS entregues, desde a última chamada, pelas threads de trabalho."""
+        chunks = []
+        while True:
+            try:
+                segment_id, chunk_index, chunks_total, content_hash, size_bytes = chunk_events.get_nowait()
+            except queue.Empty:
+                break
+            storage_key = self.elevenlabs_service.cache.location(content_hash)
+            chunks.append((job_segments[segment_id], chunk_index, chunks_total, content_hash, storage_key, size_bytes))
+        crud_audio_job.record_chunks(db, chunks)
+
+    def _generate_segment_audio(self, segment: dict, chunk_events: queue.Queue) -> Tuple[str, int, float]:
+        """Sintetiza e envia para o S3 o áudio de um segmento; executado nas threads de trabalho."""
+        logger.info(f"Processando segmento {segment['segment_index']}...")
+        started = time.perf_counter()
+
+        def on_chunk(index: int, total: int, content_hash: str, size_bytes: int) -> None:
+            chunk_events.put((segment["id"], index, total, content_hash, size_bytes))
+
+        # O ElevenLabsService reutiliza o pool de ligações e consulta o cache de áudio,
+        # pelo que repetir a geração de um documento não volta a pagar texto já sintetizado.
+        with self.elevenlabs_service.generate_audio_to_sink(
+            segment["text"], voice_id=Settings.ELEVENLABS_VOICE_ID, voice_settings=VOICE_SETTINGS, on_chunk=on_chunk
+        ) as sink:
+            audio_file_key, _ = self.s3_service.upload_audio(sink.fileobj(), segment["filename"])
+            return audio_file_key, sink.size, time.perf_counter() - started
@@ -0,0 +1,59 @@
+import logging
+import tempfile
+from typing import BinaryIO, Iterable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AudioSink:
+    """
+    Destino do áudio sintetizado, pedaço a pedaço, sem concatenar bytes em memória.
+
+    Os pedaços são escritos num SpooledTemporaryFile: enquanto o total cabe em
+    AUDIO_SINK_SPOOL_BYTES fica em memória; acima disso passa para um ficheiro
+    temporário em disco. A memória usada por segmento fica assim limitada,
+    independentemente do tamanho do capítulo, e o resultado é entregue como um
+    objeto de ficheiro (por exemplo, ao S3Service.upload_audio) sem cópias extra.
+    """
+
+    def __init__(self, spool_bytes: Optional[int] = None):
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=settings.AUDIO_SINK_SPOOL_BYTES if spool_bytes is None else spool_bytes,
+            prefix="audio-",
+            suffix=".mp3",
+        )
+        self.size = 0
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[bytes], spool_bytes: Optional[int] = None) -> "AudioSink":
+        """Cria um destino e escreve nele todos os pedaços, pela ordem recebida."""
+        sink = cls(spool_bytes)
+        try:
+            for chunk in chunks:
+                sink.write(chunk)
+        except BaseException:
+            sink.close()
+            raise
+        return sink
+
+    def write(self, chunk: bytes) -> None:
+        if chunk:
+            self._file.write(chunk)
+            self.size += len(chunk)
+
+    def fileobj(self) -> BinaryIO:
+        """Devolve o ficheiro com o áudio, posicionado no início, pronto a ser lido."""
+        self._file.seek(0)
+        return self._file
+
+    def close(self) -> None:
+        """Liberta a memória ou o ficheiro temporário."""
+        self._file.close()
+
+    def __enter__(self) -> "AudioSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
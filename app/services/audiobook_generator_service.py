@@ -1,11 +1,12 @@
 # app/services/audiobook_generator_service.py
-import fitz  # PyMuPDF
 import re
 import logging
+from functools import partial
 from typing import List, Dict, Any
 
 # Importe os serviços que você já criou
 from app.services.pdf_segmenter import PDFSegmenterService
+from app.services.extraction_cache import PDFSource
 from app.services.elevenlabs_service import ElevenLabsService
 from app.services.s3_service import S3Service
 
@@ -41,81 +42,81 @@ class AudiobookGeneratorService:
         """
         Executa o fluxo completo de geração do audiobook.
         """
-        if segmentation_mode not in ["page", "chapter"]:
-            raise ValueError("O modo de segmentação deve ser 'page' ou 'chapter'.")
-
         logger.info(f"Iniciando geração de audiobook para '{book_title}' com modo '{segmentation_mode}'.")
-        
-        if segmentation_mode == "chapter":
-            units = self._segment_by_chapter(pdf_bytes)
-        else: # Padrão é 'page'
-            units = self._segment_by_page(pdf_bytes)
+        units = self.segment(pdf_bytes, segmentation_mode)
 
         if not units:
             logger.warning("Nenhuma unidade (página/capítulo) com conteúdo foi encontrada.")
             return []
 
-        return self._process_units(units, book_title)
+        return self.publish_units(units, book_title)
+
+    def segment(self, pdf_source: PDFSource, segmentation_mode: str = "page") -> List[Dict[str, Any]]:
+        """
+        Divide o PDF (bytes ou caminho) em unidades (páginas ou capítulos) com conteúdo.
+        É a parte do fluxo que ocupa a CPU e só usa o pdf_segmenter; pode correr noutro
+        processo (ver CPUPool).
+        """
+        if segmentation_mode not in ["page", "chapter"]:
+            raise ValueError("O modo de segmentação deve ser 'page' ou 'chapter'.")
+
+        if segmentation_mode == "chapter":
+            return self._segment_by_chapter(pdf_source)
+        return self._segment_by_page(pdf_source) # Padrão é 'page'
 
-    def _segment_by_chapter(self, pdf_bytes: bytes) -> List[Dict[str, Any]]:
+    def _segment_by_chapter(self, pdf_source: PDFSource) -> List[Dict[str, Any]]:
         """Usa o PDFSegmenterService para dividir o texto em capítulos."""
         logger.info("Segmentando por capítulos...")
-        result = self.pdf_segmenter.segment_pdf(pdf_bytes)
+        result = self.pdf_segmenter.segment_pdf(pdf_source)
         # Adaptar a estrutura para o processador genérico
         return [{"id": i + 1, "title": chap["title"], "text": chap["content"]} for i, chap in enumerate(result.get("chapters", []))]
 
-    def _segment_by_page(self, pdf_bytes: bytes) -> List[Dict[str, Any]]:
-        """Usa o PyMuPDF para dividir o texto por página."""
+    def _segment_by_page(self, pdf_source: PDFSource) -> List[Dict[str, Any]]:
+        """Usa o PyMuPDF (através do cache de extração) para dividir o texto por página."""
         logger.info("Segmentando por páginas...")
         units = []
         try:
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-            for page_num, page in enumerate(pdf_document):
-                text = page.get_text("text").strip()
+            for page_num, raw_text in enumerate(self.pdf_segmenter.extract_page_texts(pdf_source)):
+                text = raw_text.strip()
                 if text:
                     units.append({"id": page_num + 1, "title": f"Página {page_num + 1}", "text": text})
-            pdf_document.close()
         except Exception as e:
             logger.error(f"Falha ao extrair texto por página: {e}")
             raise
         return units
 
-    def _process_units(self, units: List[Dict[str, Any]], book_title: str) -> List[Dict[str, Any]]:
-        """Itera sobre as unidades (páginas/capítulos), gera áudio e faz upload."""
-        processed_results = []
+    def publish_units(self, units: List[Dict[str, Any]], book_title: str) -> List[Dict[str, Any]]:
+        """
+        Gera o áudio de cada unidade (página/capítulo) e publica-o no S3.
+
+        As unidades são publicadas em lote com S3Service.publish_many: várias em
+        simultâneo, cada uma enviada em partes à medida que a síntese a produz, e com
+        novas tentativas por unidade, de modo que uma falha isolada não compromete o
+        livro inteiro.
+        """
         safe_book_title = self._sanitize_filename(book_title)
 
+        items = []
         for unit in units:
-            unit_id = unit["id"]
-            unit_title = unit["title"]
-            unit_text = unit["text"]
-            
-            logger.info(f"Processando Unidade {unit_id}: '{unit_title}'...")
-
-            try:
-                # O ElevenLabsService já usa o TextPreprocessor internamente
-                audio_bytes = self.elevenlabs_service.generate_audio(unit_text)
-
-                safe_unit_title = self._sanitize_filename(unit_title)
-                filename = f"{safe_book_title}/{unit_id:04d}_{safe_unit_title}.mp3"
-
-                audio_url = self.s3_service.upload_audio(audio_bytes, filename)
-                
-                processed_results.append({
-                    "unit_id": unit_id,
-                    "title": unit_title,
-                    "audio_url": audio_url,
-                    "status": "success",
-                })
-                logger.info(f"Unidade {unit_id} processada com sucesso. URL: {audio_url}")
-
-            except Exception as e:
-                logger.error(f"Falha ao processar unidade {unit_id} ('{unit_title}'): {e}")
-                processed_results.append({
-                    "unit_id": unit_id,
-                    "title": unit_title,
-                    "status": "failed",
-                    "error": str(e),
-                })
-        
-        return processed_results
\ No newline at end of file
+            safe_unit_title = self._sanitize_filename(unit["title"])
+            filename = f"{safe_book_title}/{unit['id']:04d}_{safe_unit_title}.mp3"
+            # O ElevenLabsService já usa o TextPreprocessor internamente. A síntese é
+            # iniciada de novo a cada tentativa (os pedaços já gerados vêm do cache).
+            items.append((filename, partial(self.elevenlabs_service.iter_audio, unit["text"])))
+
+        logger.info(f"A publicar {len(items)} unidades de '{book_title}'...")
+        manifest = self.s3_service.publish_many(items)
+
+        processed_results = []
+        for unit, entry in zip(units, manifest["items"]):
+            result = {"unit_id": unit["id"], "title": unit["title"], "status": entry["status"]}
+            if entry["status"] == "success":
+                result["audio_url"] = entry["url"]
+                logger.info(f"Unidade {unit['id']} processada com sucesso. URL: {entry['url']}")
+            else:
+                result["error"] = entry["error"]
+                logger.error(f"Falha ao processar unidade {unit['id']} ('{unit['title']}'): {entry['error']}")
+            result.update(size_bytes=entry.get("size_bytes"), attempts=entry["attempts"], seconds=entry["seconds"])
+            processed_results.append(result)
+
+        return processed_results
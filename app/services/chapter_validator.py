@@ -1,5 +1,5 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 from statistics import mean
 
 class ChapterValidator:
@@ -31,6 +31,41 @@ class ChapterValidator:
         # Se a média de palavras por linha for inferior a 10, é muito provável que seja um poema.
         return avg_words_per_line < 10
 
+    def _materialize(self, chapter: Dict[str, Any], content_parts: List[str]) -> Dict[str, Any]:
+        """Junta as partes de conteúdo acumuladas num único texto, uma só vez por capítulo."""
+        if len(content_parts) > 1:
+            chapter['content'] = "".join(content_parts)
+        return chapter
+
+    def iter_validated(self, chapters: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Versão em fluxo de validate_and_merge: consome os capítulos brutos à medida que
+        chegam e gera cada capítulo final assim que o seguinte (não subtítulo) o fecha.
+        """
+        previous_chapter = None
+        content_parts: List[str] = []
+
+        for current_chapter in chapters:
+            if previous_chapter is None:
+                previous_chapter = current_chapter
+                content_parts = [current_chapter['content']]
+            # 1. Se o título atual for um subtítulo, funde-o com o capítulo anterior.
+            elif self._is_sub_chapter_title(current_chapter['title']):
+                content_parts.extend(("\n\n", current_chapter['title'], "\n", current_chapter['content']))
+            else:
+                chapter = self._materialize(previous_chapter, content_parts)
+                # 2. Validação: O capítulo deve ter conteúdo. Para documentos gerais, a verificação da estrutura do poema é removida.
+                # A heurística _content_has_poem_structure pode ser reativada se o foco for apenas poesia.
+                if chapter.get("content", "").strip():
+                    yield chapter
+                previous_chapter = current_chapter
+                content_parts = [current_chapter['content']]
+
+        if previous_chapter is not None:
+            chapter = self._materialize(previous_chapter, content_parts)
+            if chapter.get("content", "").strip():
+                yield chapter
+
     def validate_and_merge(self, chapters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Método principal que orquestra a validação, fusão e filtragem de capítulos.
@@ -38,28 +73,4 @@ class ChapterValidator:
         if not chapters:
             return []
 
-        # 1. Primeira Passagem: Fundir sub-capítulos
-        merged_chapters = []
-        if chapters:
-            previous_chapter = chapters[0]
-            for i in range(1, len(chapters)):
-                current_chapter = chapters[i]
-                # Se o título atual for um subtítulo, funde-o com o capítulo anterior.
-                if self._is_sub_chapter_title(current_chapter['title']):
-                    previous_chapter['content'] += f"\n\n{current_chapter['title']}\n{current_chapter['content']}"
-                else:
-                    merged_chapters.append(previous_chapter)
-                    previous_chapter = current_chapter
-            merged_chapters.append(previous_chapter)
-
-        # 2. Segunda Passagem: Filtrar e Validar os capítulos já fundidos
-        final_chapters = []
-        for chapter in merged_chapters:
-            content = chapter.get("content", "").strip()
-            # Validação: O capítulo deve ter conteúdo. Para documentos gerais, a verificação da estrutura do poema é removida.
-            # A heurística _content_has_poem_structure pode ser reativada se o foco for apenas poesia.
-            if content:
-                final_chapters.append(chapter)
-
-        return final_chapters
-
+        return list(self.iter_validated(chapters))
@@ -0,0 +1,230 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Contadores de acertos/falhas, partilhados por todos os processos que usam o diretório.
+# Começa por "." para ficar fora das entradas (tal como os ficheiros temporários e o
+# diário do SQLite).
+_STATS_DB_NAME = ".stats.sqlite3"
+
+
+class DiskLRUCache:
+    """
+    Cache em disco local, endereçado por conteúdo, com limite de tamanho e expulsão LRU.
+
+    Cada entrada é um ficheiro cujo nome é a chave; a data de modificação do ficheiro
+    é atualizada a cada leitura e serve de relógio para a política LRU. Como o estado
+    vive no sistema de ficheiros, vários processos (workers do uvicorn, processos do
+    pool de CPU) podem partilhar o mesmo diretório; os contadores de acertos/falhas
+    ficam numa pequena base SQLite no mesmo diretório, somados entre processos.
+
+    O diretório só é percorrido no arranque, quando o total de bytes mantido pelo
+    processo passa de max_bytes, e (com max_age_seconds) no máximo uma vez por
+    max_age_seconds para remover entradas expiradas. Cada varrimento acerta o total
+    com o que está em disco, incluindo o que outros processos escreveram entretanto.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_age_seconds: Optional[float] = None):
+        """
+        Args:
+            directory: Diretório onde as entradas são guardadas.
+            max_bytes: Tamanho máximo total do cache; as entradas menos usadas são removidas acima dele.
+            max_age_seconds: Idade máxima de uma entrada sem uso (None = sem limite).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._make_private_directory()
+        self._stats_path = os.path.join(directory, _STATS_DB_NAME)
+        self._init_stats_db()
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+        self._last_sweep = time.time()
+
+    def _make_private_directory(self) -> None:
+        """
+        Cria o diretório só com acesso para o utilizador do processo (0700). Se já
+        existir com permissões mais abertas e pertencer a este utilizador, são
+        restringidas; se pertencer a outro, fica um aviso (as entradas de outros
+        utilizadores não devem ser confiadas).
+        """
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        stat = os.stat(self.directory)
+        if stat.st_uid != os.getuid():
+            logger.warning(f"O diretório do cache '{self.directory}' pertence a outro utilizador.")
+        elif stat.st_mode & 0o077:
+            os.chmod(self.directory, 0o700)
+
+    def path(self, key: str) -> str:
+        """Caminho do ficheiro de uma entrada (exista ou não)."""
+        # Subdiretórios pelos dois primeiros caracteres evitam diretórios enormes.
+        return os.path.join(self.directory, key[:2], key)
+
+    def _connect_stats(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._stats_path, timeout=5)
+
+    def _init_stats_db(self) -> None:
+        try:
+            with self._connect_stats() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS counters ("
+                    "label TEXT NOT NULL, hit INTEGER NOT NULL, count INTEGER NOT NULL, "
+                    "PRIMARY KEY (label, hit))"
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Não foi possível criar os contadores do cache em '{self._stats_path}': {e}")
+
+    def _record(self, hit: bool, label: str) -> None:
+        """Soma um acerto ou uma falha nos contadores partilhados (falhas de escrita só ficam no log)."""
+        try:
+            with self._connect_stats() as conn:
+                conn.execute(
+                    "INSERT INTO counters (label, hit, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT (label, hit) DO UPDATE SET count = count + 1",
+                    (label, int(hit)),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Falha ao atualizar os contadores do cache em disco: {e}")
+
+    def _read_counters(self) -> tuple:
+        """Devolve (acertos, falhas) por etiqueta, somados entre todos os processos."""
+        hits: Dict[str, int] = {}
+        misses: Dict[str, int] = {}
+        try:
+            with self._connect_stats() as conn:
+                for label, hit, count in conn.execute("SELECT label, hit, count FROM counters"):
+                    (hits if hit else misses)[label] = count
+        except sqlite3.Error as e:
+            logger.warning(f"Falha ao ler os contadores do cache em disco: {e}")
+        return hits, misses
+
+    def get(self, key: str, label: str = "default") -> Optional[bytes]:
+        """Devolve o conteúdo guardado para a chave, ou None se não existir ou tiver expirado."""
+        path = self.path(key)
+        try:
+            if self.max_age_seconds is not None:
+                stat = os.stat(path)
+                if time.time() - stat.st_mtime > self.max_age_seconds:
+                    self._remove(path, stat.st_size)
+                    raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            # Marca a entrada como usada recentemente.
+            os.utime(path)
+        except FileNotFoundError:
+            self._record(False, label)
+            return None
+        except OSError as e:
+            logger.warning(f"Falha ao ler a entrada '{key}' do cache em disco: {e}")
+            self._record(False, label)
+            return None
+
+        self._record(True, label)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Guarda o conteúdo de forma atómica e aplica a política de expulsão."""
+        if len(data) > self.max_bytes:
+            logger.info(f"Entrada '{key}' ({len(data)} bytes) excede o tamanho do cache; não será guardada.")
+            return
+
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Falha ao escrever a entrada '{key}' no cache em disco: {e}")
+            return
+
+        with self._lock:
+            self._total_bytes += len(data) - replaced
+            over_size = self._total_bytes > self.max_bytes
+            sweep_due = (self.max_age_seconds is not None
+                         and time.time() - self._last_sweep > self.max_age_seconds)
+        if over_size or sweep_due:
+            self._evict()
+
+    def _entries(self):
+        """Lista (mtime, tamanho, caminho) de todas as entradas em disco."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith("."):
+                    continue  # ficheiros temporários e contadores
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        """
+        Percorre o diretório: acerta o total de bytes, remove as entradas expiradas e,
+        depois, as menos usadas até caber no limite.
+        """
+        with self._lock:
+            entries = self._entries()
+            now = time.time()
+            self._last_sweep = now
+            if self.max_age_seconds is not None:
+                expired = [e for e in entries if now - e[0] > self.max_age_seconds]
+                for _, _, path in expired:
+                    self._unlink(path)
+                entries = [e for e in entries if now - e[0] <= self.max_age_seconds]
+
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                for _, size, path in sorted(entries):
+                    if total <= self.max_bytes:
+                        break
+                    self._unlink(path)
+                    total -= size
+            self._total_bytes = total
+
+    def _unlink(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _remove(self, path: str, size: int) -> None:
+        """Remove uma entrada fora de um varrimento, descontando-a do total."""
+        if self._unlink(path):
+            with self._lock:
+                self._total_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores de acertos/falhas (por etiqueta, somados entre todos os processos que
+        usam o diretório) e ocupação atual do cache.
+        """
+        hits, misses = self._read_counters()
+        entries = self._entries()
+        total_hits = sum(hits.values())
+        total_lookups = total_hits + sum(misses.values())
+        return {
+            "hits": total_hits,
+            "misses": total_lookups - total_hits,
+            "hit_rate": (total_hits / total_lookups) if total_lookups else 0.0,
+            "hits_by_kind": hits,
+            "misses_by_kind": misses,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
@@ -1,31 +1,205 @@
+import asyncio
 import logging
-from typing import Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional, Tuple
 
+import httpx
 # ✅ PASSO 1: Importar o cliente oficial da ElevenLabs
-from elevenlabs.client import ElevenLabs
+from elevenlabs.client import AsyncElevenLabs, ElevenLabs
 
 from app.core.config import settings
+from app.services.audio_cache import AudioCache, audio_cache
+from app.services.audio_sink import AudioSink
+from app.services.sentence_splitter import pack_sentences
 from app.services.text_preprocessor_service import TextPreprocessorService
 
 logger = logging.getLogger(__name__)
 
+MODEL_ID = "eleven_multilingual_v2"
+# Formato de saída pedido à API (o mesmo que o SDK usa por omissão); faz parte da chave do cache de áudio.
+OUTPUT_FORMAT = "mp3_44100_128"
+
+# Configurações de voz usadas na síntese
+VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75,
+    "style": 0.0,
+    "use_speaker_boost": True,
+    "speed": 1.3,
+}
+
+# on_chunk(índice, total de pedaços, chave no cache de áudio, tamanho em bytes)
+ChunkCallback = Callable[[int, int, str, int], None]
+
+# Pools de ligações HTTP partilhados por todos os clientes ElevenLabs do processo,
+# para que o TLS e o estabelecimento de ligações sejam feitos uma vez e reaproveitados.
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_http_lock = threading.Lock()
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.ELEVENLABS_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.ELEVENLABS_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.ELEVENLABS_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Devolve o pool de ligações síncrono do processo, criando-o no primeiro uso."""
+    global _http_client
+    with _http_lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.Client(
+                limits=_http_limits(),
+                timeout=settings.ELEVENLABS_TIMEOUT_SECONDS,
+                follow_redirects=True,
+            )
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Devolve o pool de ligações assíncrono do processo, criando-o no primeiro uso."""
+    global _async_http_client
+    with _http_lock:
+        if _async_http_client is None or _async_http_client.is_closed:
+            _async_http_client = httpx.AsyncClient(
+                limits=_http_limits(),
+                timeout=settings.ELEVENLABS_TIMEOUT_SECONDS,
+                follow_redirects=True,
+            )
+        return _async_http_client
+
+
+async def close_http_clients() -> None:
+    """Fecha os pools de ligações (chamado no encerramento da aplicação)."""
+    global _http_client, _async_http_client
+    with _http_lock:
+        http_client, async_http_client = _http_client, _async_http_client
+        _http_client = _async_http_client = None
+    if http_client is not None:
+        http_client.close()
+    if async_http_client is not None:
+        try:
+            await async_http_client.aclose()
+        except RuntimeError as e:
+            # Ligações abertas noutro event loop, entretanto fechado, já não podem ser encerradas.
+            logger.warning(f"Não foi possível fechar o pool de ligações assíncrono: {e}")
+
+
+class StreamLatencyStats:
+    """
+    Latências das últimas sínteses em stream: tempo até ao primeiro pedaço de áudio
+    (o que o cliente espera antes de começar a ouvir) e tempo total.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self._samples: Deque[Tuple[float, float, int, int]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, first_byte_seconds: float, total_seconds: float, chunks: int, total_bytes: int) -> None:
+        with self._lock:
+            self._samples.append((first_byte_seconds, total_seconds, chunks, total_bytes))
+        logger.info(
+            f"Síntese em stream: primeiro pedaço em {first_byte_seconds:.3f}s, "
+            f"total {total_seconds:.3f}s ({chunks} pedaço(s), {total_bytes} bytes)."
+        )
+
+    @staticmethod
+    def _percentiles(values) -> Dict[str, float]:
+        ordered = sorted(values)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {
+            "avg": round(sum(ordered) / len(ordered), 3),
+            "p50": round(pick(0.50), 3),
+            "p95": round(pick(0.95), 3),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return {"requests": 0}
+        return {
+            "requests": len(samples),
+            "first_byte_seconds": self._percentiles(s[0] for s in samples),
+            "total_seconds": self._percentiles(s[1] for s in samples),
+        }
+
+
 class ElevenLabsService:
     """
     Serviço para interagir com a API de Text-to-Speech da ElevenLabs usando o SDK oficial.
     """
-    def __init__(self):
+    def __init__(self, cache: AudioCache = None):
         if not settings.ELEVENLABS_API_KEY:
             raise ValueError("A chave da API da ElevenLabs (ELEVENLABS_API_KEY) não foi definida.")
         
         self.api_key = settings.ELEVENLABS_API_KEY
         
-        # ✅ PASSO 2: Instanciar o cliente da ElevenLabs com sua chave de API
-        self.client = ElevenLabs(api_key=self.api_key)
+        # ✅ PASSO 2: Instanciar os clientes da ElevenLabs com sua chave de API, sobre os
+        # pools de ligações keep-alive do processo (síncrono e assíncrono).
+        self.client = ElevenLabs(
+            api_key=self.api_key,
+            base_url=settings.ELEVENLABS_BASE_URL,
+            httpx_client=get_http_client(),
+        )
+        self.async_client = AsyncElevenLabs(
+            api_key=self.api_key,
+            base_url=settings.ELEVENLABS_BASE_URL,
+            httpx_client=get_async_http_client(),
+        )
         self.preprocessor = TextPreprocessorService()
+        # Cache do áudio já sintetizado, consultado antes de cada pedido à API
+        self.cache = cache if cache is not None else audio_cache
+        # Latência até ao primeiro pedaço e latência total das sínteses em stream
+        self.stream_stats = StreamLatencyStats()
+
+        # Pedidos simultâneos limitados: o executor é partilhado por todas as chamadas
+        # a generate_audio desta instância, pelo que o limite vale para o serviço inteiro.
+        self.max_chunk_chars = settings.ELEVENLABS_MAX_CHUNK_CHARS
+        self.max_concurrency = max(1, settings.ELEVENLABS_MAX_CONCURRENCY)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="elevenlabs"
+        )
+        # Pedaços em curso ou prontos à frente do que já foi entregue ao consumidor
+        self.lookahead_chunks = 2 * self.max_concurrency
+        # O equivalente assíncrono do executor: um semáforo partilhado por todas as
+        # chamadas a aiter_audio desta instância (criado no event loop que o usa).
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+        self._async_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def generate_audio(
+        self, text: str, voice_id: Optional[str] = None, voice_settings: Optional[dict] = None
+    ) -> bytes:
+        """
+        Gera áudio a partir do texto, dividindo-o em pedaços de sentenças inteiras para
+        evitar limites da API e sintetizando os pedaços em paralelo. Os pedaços já
+        sintetizados com a mesma voz e configurações vêm do cache de áudio.
+        """
+        audio_bytes = b"".join(self.iter_audio(text, voice_id=voice_id, voice_settings=voice_settings))
+        logger.info("Todos os pedaços de áudio foram gerados e combinados com sucesso.")
+        return audio_bytes
 
-    def generate_audio(self, text: str, voice_id: Optional[str] = None) -> bytes:
+    def iter_audio(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        voice_settings: Optional[dict] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+    ) -> Iterator[bytes]:
         """
-        Gera áudio a partir do texto, dividindo-o em pedaços para evitar limites da API.
+        Sintetiza o texto e devolve o áudio de cada pedaço pela ordem do texto, assim que
+        esse pedaço e os anteriores estiverem prontos; os seguintes continuam a ser
+        sintetizados em paralelo.
+
+        Se indicado, on_chunk(índice, total de pedaços, chave no cache de áudio, bytes)
+        é chamado, na thread do consumidor, por cada pedaço entregue; serve para
+        registar o progresso (checkpoints) de trabalhos longos.
         """
         target_voice_id = voice_id or settings.ELEVENLABS_VOICE_ID
 
@@ -33,20 +207,7 @@ class ElevenLabsService:
         # A linha abaixo estava comentada, descomentei para garantir que o pré-processamento seja usado.
         # text = self.preprocessor.clean_text_for_tts(text)
         
-        # ✅ PASSO 3: A lógica de dividir o texto continua sendo essencial para evitar erros.
-        # CHUNK_SIZE = 2500
-        # text_chunks = [text[i:i+CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
-        
-        all_audio_bytes = b""
-
-        # Definir as configurações de voz em um dicionário
-        voice_settings = {
-            "stability": 0.5,
-            "similarity_boost": 0.75,
-            "style": 0.0,
-            "use_speaker_boost": True,
-            "speed": 1.3,
-        }
+        voice_settings = voice_settings or VOICE_SETTINGS
 
         # audio_bytes = self.client.text_to_speech.convert(
         #         voice_id=target_voice_id,
@@ -56,32 +217,185 @@ class ElevenLabsService:
         #     )
         # all_audio_bytes.join(audio_bytes)
 
-        CHUNK_SIZE = 2500
-        text_chunks = [text[i:i+CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
-        
-        all_audio_bytes = b""
-        for i, chunk in enumerate(text_chunks):
-            logger.info(f"A processar o pedaço {i+1}/{len(text_chunks)}...")
-            print(f"A processar o pedaço {i+1}/{len(text_chunks)}...")
-            try:
-                logger.info(f"A enviar {len(chunk)} caracteres para a ElevenLabs para a voz {target_voice_id}...")
-                
-                # ✅ PASSO 4: Usar o método do SDK em vez de `requests.post`
-                # O método `convert` é síncrono e retorna os bytes de áudio diretamente.
-                audio_chunk = self.client.text_to_speech.convert(
-                    voice_id=target_voice_id,
+        # ✅ PASSO 3: Dividir o texto em pedaços de sentenças inteiras, até ao limite
+        # de caracteres por pedido, continua a ser essencial para evitar erros.
+        text_chunks = pack_sentences(text, self.max_chunk_chars)
+        logger.info(
+            f"A sintetizar {len(text_chunks)} pedaço(s) para a voz {target_voice_id} "
+            f"(até {self.max_concurrency} em simultâneo)..."
+        )
+
+        # Os pedidos correm em paralelo (limitados pelo executor); o áudio é entregue
+        # pela ordem original dos pedaços. Só uma janela de pedaços à frente do que já
+        # foi entregue é submetida, para que o áudio pronto à espera de ser consumido
+        # (e, portanto, a memória) não cresça com o tamanho do capítulo.
+        pending: Deque[Future] = deque()
+        next_index = 0
+        try:
+            while next_index < len(text_chunks) or pending:
+                while next_index < len(text_chunks) and len(pending) < self.lookahead_chunks:
+                    pending.append(self._executor.submit(
+                        self._synthesize_chunk, next_index, text_chunks[next_index], target_voice_id, voice_settings
+                    ))
+                    next_index += 1
+                index = next_index - len(pending)
+                audio_chunk = pending.popleft().result()
+                if on_chunk is not None:
+                    on_chunk(
+                        index,
+                        len(text_chunks),
+                        AudioCache.key(text_chunks[index], target_voice_id, MODEL_ID, voice_settings, OUTPUT_FORMAT),
+                        len(audio_chunk),
+                    )
+                yield audio_chunk
+        finally:
+            # Em caso de erro ou de o consumidor desistir, os pedaços pendentes são cancelados.
+            for future in pending:
+                future.cancel()
+
+    def generate_audio_to_sink(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        voice_settings: Optional[dict] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+    ) -> AudioSink:
+        """
+        Como generate_audio, mas escreve o áudio num AudioSink em vez de o juntar em
+        bytes, com memória limitada independentemente do tamanho do texto.
+        O chamador é responsável por fechar o destino devolvido.
+        """
+        sink = AudioSink.from_chunks(
+            self.iter_audio(text, voice_id=voice_id, voice_settings=voice_settings, on_chunk=on_chunk)
+        )
+        logger.info(f"Todos os pedaços de áudio foram gerados ({sink.size} bytes).")
+        return sink
+
+    def _synthesize_chunk(self, index: int, chunk: str, voice_id: str, voice_settings: dict) -> bytes:
+        """Sintetiza um pedaço de texto; executado nas threads do executor."""
+        cache_key = AudioCache.key(chunk, voice_id, MODEL_ID, voice_settings, OUTPUT_FORMAT)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Áudio para o pedaço {index+1} obtido do cache.")
+            return cached
+        try:
+            logger.info(f"A enviar o pedaço {index+1} ({len(chunk)} caracteres) para a ElevenLabs...")
+            # O método `convert` devolve um iterador de bytes; é consumido aqui, dentro
+            # da thread, para que a transferência também corra em paralelo.
+            audio_chunk = b"".join(self.client.text_to_speech.convert(
+                voice_id=voice_id,
+                text=chunk,
+                model_id=MODEL_ID,
+                output_format=OUTPUT_FORMAT,
+                voice_settings=voice_settings
+            ))
+            logger.info(f"Áudio para o pedaço {index+1} recebido com sucesso.")
+        except Exception as e:
+            logger.error(f"Erro ao gerar áudio para o pedaço {index+1} com o SDK da ElevenLabs: {e}", exc_info=True)
+            raise Exception(f"Falha ao gerar áudio para o pedaço {index+1}: {e}")
+
+        self.cache.put(cache_key, audio_chunk)
+        return audio_chunk
+
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """Semáforo dos pedidos assíncronos, partilhado pela instância no event loop atual."""
+        loop = asyncio.get_running_loop()
+        if self._async_semaphore is None or self._async_semaphore_loop is not loop:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_semaphore_loop = loop
+        return self._async_semaphore
+
+    async def agenerate_audio(
+        self, text: str, voice_id: Optional[str] = None, voice_settings: Optional[dict] = None
+    ) -> bytes:
+        """
+        Versão assíncrona de generate_audio, para uso direto nos handlers do FastAPI sem
+        bloquear o event loop. Usa o cliente AsyncElevenLabs e o mesmo limite de pedidos
+        simultâneos.
+        """
+        audio_parts = [
+            part async for part in self.aiter_audio(text, voice_id=voice_id, voice_settings=voice_settings)
+        ]
+        logger.info("Todos os pedaços de áudio foram gerados e combinados com sucesso.")
+        return b"".join(audio_parts)
+
+    async def aiter_audio(
+        self, text: str, voice_id: Optional[str] = None, voice_settings: Optional[dict] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Versão assíncrona de iter_audio: entrega o áudio de cada pedaço, pela ordem do
+        texto, enquanto os seguintes continuam a ser sintetizados. Com as mesmas
+        configurações de voz, produz o mesmo áudio (e as mesmas chaves do cache).
+
+        Os pedidos simultâneos à API são limitados por instância, como em iter_audio:
+        várias chamadas em paralelo partilham o mesmo limite.
+
+        Regista em stream_stats a latência até ao primeiro pedaço e a latência total.
+        """
+        started = time.perf_counter()
+        target_voice_id = voice_id or settings.ELEVENLABS_VOICE_ID
+        text_chunks = pack_sentences(text, self.max_chunk_chars)
+        voice_settings = voice_settings or VOICE_SETTINGS
+        semaphore = self._get_async_semaphore()
+
+        async def synthesize(index: int, chunk: str) -> bytes:
+            async with semaphore:
+                return await self._asynthesize_chunk(index, chunk, target_voice_id, voice_settings)
+
+        # Tal como em iter_audio, só uma janela de pedaços à frente é iniciada.
+        pending: Deque[asyncio.Task] = deque()
+        next_index = 0
+        first_byte_seconds = None
+        total_bytes = 0
+        completed = False
+        try:
+            while next_index < len(text_chunks) or pending:
+                while next_index < len(text_chunks) and len(pending) < self.lookahead_chunks:
+                    pending.append(asyncio.create_task(synthesize(next_index, text_chunks[next_index])))
+                    next_index += 1
+                part = await pending.popleft()
+                if first_byte_seconds is None:
+                    first_byte_seconds = time.perf_counter() - started
+                total_bytes += len(part)
+                yield part
+            completed = True
+        finally:
+            # Em caso de erro ou de o cliente desligar, os pedaços pendentes são cancelados.
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if completed:
+                self.stream_stats.record(
+                    first_byte_seconds or 0.0, time.perf_counter() - started, len(text_chunks), total_bytes
+                )
+
+    async def _asynthesize_chunk(self, index: int, chunk: str, voice_id: str, voice_settings: dict) -> bytes:
+        """Sintetiza um pedaço de texto com o cliente assíncrono."""
+        # O cache usa disco (e, opcionalmente, S3): as leituras e escritas correm fora do event loop.
+        cache_key = AudioCache.key(chunk, voice_id, MODEL_ID, voice_settings, OUTPUT_FORMAT)
+        cached = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"Áudio para o pedaço {index+1} obtido do cache.")
+            return cached
+        try:
+            logger.info(f"A enviar o pedaço {index+1} ({len(chunk)} caracteres) para a ElevenLabs...")
+            audio_chunk = b"".join([
+                part async for part in self.async_client.text_to_speech.convert(
+                    voice_id=voice_id,
                     text=chunk,
-                    model_id="eleven_multilingual_v2",
+                    model_id=MODEL_ID,
+                    output_format=OUTPUT_FORMAT,
                     voice_settings=voice_settings
                 )
-                
-                # Juntar os bytes de áudio de cada resposta
-                all_audio_bytes += audio_chunk
-                logger.info(f"Áudio para o pedaço {i+1} recebido com sucesso.")
+            ])
+            logger.info(f"Áudio para o pedaço {index+1} recebido com sucesso.")
+        except Exception as e:
+            logger.error(f"Erro ao gerar áudio para o pedaço {index+1} com o SDK da ElevenLabs: {e}", exc_info=True)
+            raise Exception(f"Falha ao gerar áudio para o pedaço {index+1}: {e}")
 
-            except Exception as e:
-                logger.error(f"Erro ao gerar áudio para o pedaço {i+1} com o SDK da ElevenLabs: {e}", exc_info=True)
-                raise Exception(f"Falha ao gerar áudio para o pedaço {i+1}: {e}")
+        await asyncio.to_thread(self.cache.put, cache_key, audio_chunk)
+        return audio_chunk
 
-        logger.info("Todos os pedaços de áudio foram gerados e combinados com sucesso.")
-        return all_audio_bytes
\ No newline at end of file
+    def close(self) -> None:
+        """Termina as threads de síntese (os pools de ligações são do processo)."""
+        self._executor.shutdown(wait=True)
\ No newline at end of file
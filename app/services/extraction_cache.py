@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, TypeVar, Union
+
+from app.core.config import settings
+from app.services.disk_cache import DiskLRUCache
+from app.services.feature_extractor import BlockFeatures
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Um PDF pode chegar em memória (bytes) ou como caminho de um ficheiro local.
+PDFSource = Union[bytes, str, os.PathLike]
+
+# Tamanho dos blocos lidos ao calcular o SHA-256 de um ficheiro
+_DIGEST_BLOCK_SIZE = 1024 * 1024
+
+# Versão das heurísticas de extração/segmentação. Deve ser incrementada sempre que
+# FeatureExtractor, PDFSegmenterService ou ChapterValidator mudarem o resultado,
+# para que as entradas antigas deixem de ser usadas.
+EXTRACTION_HEURISTICS_VERSION = 2
+
+
+# Formato de cada tipo de resultado em disco. Nenhum usa pickle: uma entrada
+# adulterada no diretório do cache pode, no máximo, falhar a leitura (e ser
+# recalculada), nunca executar código.
+_CODECS: Dict[str, tuple] = {
+    "pages": (
+        lambda pages: json.dumps(pages, ensure_ascii=False).encode("utf-8"),
+        lambda data: json.loads(data.decode("utf-8")),
+    ),
+    "chapters": (
+        lambda result: json.dumps(result, ensure_ascii=False).encode("utf-8"),
+        lambda data: json.loads(data.decode("utf-8")),
+    ),
+    "features": (BlockFeatures.to_bytes, BlockFeatures.from_bytes),
+}
+
+
+class ExtractionCache:
+    """
+    Cache dos resultados de extração de um PDF, endereçado pelo SHA-256 dos bytes do
+    ficheiro e pela versão das heurísticas.
+
+    Guarda, por PDF, o texto de cada página ("pages"), as características dos blocos
+    ("features") e o resultado da segmentação por capítulos ("chapters").
+    """
+
+    def __init__(self, cache: DiskLRUCache = None, enabled: bool = None):
+        self.enabled = settings.EXTRACTION_CACHE_ENABLED if enabled is None else enabled
+        self._cache = cache
+        if self.enabled and self._cache is None:
+            self._cache = DiskLRUCache(
+                directory=settings.EXTRACTION_CACHE_DIR,
+                max_bytes=settings.EXTRACTION_CACHE_MAX_BYTES,
+            )
+
+    @staticmethod
+    def digest(pdf_source: PDFSource) -> str:
+        """
+        Calcula a impressão digital (SHA-256) do PDF. Para um caminho, o ficheiro é
+        lido em blocos, sem ser carregado inteiro em memória.
+        """
+        if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+            return hashlib.sha256(pdf_source).hexdigest()
+        sha = hashlib.sha256()
+        with open(pdf_source, "rb") as f:
+            for block in iter(lambda: f.read(_DIGEST_BLOCK_SIZE), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def _key(self, digest: str, kind: str) -> str:
+        return f"{digest}-v{EXTRACTION_HEURISTICS_VERSION}-{kind}"
+
+    def get_or_compute(self, digest: str, kind: str, compute: Callable[[], T]) -> T:
+        """
+        Devolve o resultado guardado para (PDF, tipo) ou calcula-o e guarda-o.
+
+        Args:
+            digest: SHA-256 do PDF (ver ExtractionCache.digest).
+            kind: Tipo de resultado ("pages", "features" ou "chapters").
+            compute: Função que produz o resultado em caso de falha no cache.
+        """
+        if not self.enabled:
+            return compute()
+
+        encode, decode = _CODECS[kind]
+        key = self._key(digest, kind)
+        data = self._cache.get(key, label=kind)
+        if data is not None:
+            try:
+                return decode(data)
+            except Exception as e:
+                logger.warning(f"Entrada '{key}' do cache de extração ilegível, a recalcular: {e}")
+
+        result = compute()
+        try:
+            self._cache.put(key, encode(result))
+        except Exception as e:
+            logger.warning(f"Não foi possível guardar '{key}' no cache de extração: {e}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores de acertos/falhas e ocupação, para dimensionar o cache.
+
+        Ambos vêm do diretório do cache: incluem os acessos feitos nos processos do
+        pool de CPU e nos outros workers, não só neste processo.
+        """
+        if not self.enabled:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "version": EXTRACTION_HEURISTICS_VERSION,
+            **self._cache.stats(),
+        }
+
+
+# Instância partilhada pelos serviços de extração
+extraction_cache = ExtractionCache()
@@ -1,15 +1,193 @@
 import fitz  # PyMuPDF
-import pandas as pd
+import numpy as np
+import io
+import json
+import logging
+import math
+import os
 import re
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 from statistics import mean, StatisticsError
 
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Códigos usados na coluna de alinhamento (índices em ALIGNMENTS).
+ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT = 0, 1, 2
+ALIGNMENTS = ("left", "center", "right")
+
+# Documento aberto por cada processo do pool (um handle por processo).
+_worker_document: Optional[fitz.Document] = None
+
+
+def _init_shard_worker(pdf_source: Union[str, bytes]) -> None:
+    """Abre o documento uma única vez em cada processo do pool."""
+    global _worker_document
+    if isinstance(pdf_source, str):
+        _worker_document = fitz.open(pdf_source)
+    else:
+        _worker_document = fitz.open(stream=pdf_source, filetype="pdf")
+
+
+def _extract_shard(page_range: Tuple[int, int]) -> "BlockFeatures":
+    """Extrai as características de um fragmento [start, end) de páginas no processo atual."""
+    start, end = page_range
+    return FeatureExtractor()._extract_page_range(_worker_document, start, end)
+
+
+class BlockFeatures:
+    """
+    Armazenamento colunar das características dos blocos de texto.
+
+    Cada coluna numérica é um array NumPy tipado (bool para os flags, int32 para
+    contagens e páginas, int8 para o alinhamento) e o texto fica numa única lista.
+    Tamanhos de fonte, coordenadas e as colunas derivadas (espaçamento e fonte
+    relativa) ficam em float64, a precisão dos valores devolvidos pelo PyMuPDF:
+    arredondá-los para float32 podia mudar o lado do limiar em que um bloco cai
+    (por exemplo, uma fonte exatamente 1.2x a mediana).
+    """
+
+    NUMERIC_COLUMNS = (
+        "word_count", "char_count", "avg_font_size", "max_font_size", "is_bold",
+        "is_all_caps", "bbox", "normalized_y0", "alignment", "page_num",
+        "vertical_spacing_after", "relative_font_size",
+    )
+
+    def __init__(
+        self,
+        text: List[str],
+        word_count: np.ndarray,
+        char_count: np.ndarray,
+        avg_font_size: np.ndarray,
+        max_font_size: np.ndarray,
+        is_bold: np.ndarray,
+        is_all_caps: np.ndarray,
+        bbox: np.ndarray,
+        normalized_y0: np.ndarray,
+        alignment: np.ndarray,
+        page_num: np.ndarray,
+        vertical_spacing_after: Optional[np.ndarray] = None,
+        relative_font_size: Optional[np.ndarray] = None,
+    ):
+        self.text = text
+        self.word_count = word_count
+        self.char_count = char_count
+        self.avg_font_size = avg_font_size
+        self.max_font_size = max_font_size
+        self.is_bold = is_bold
+        self.is_all_caps = is_all_caps
+        self.bbox = bbox
+        self.normalized_y0 = normalized_y0
+        self.alignment = alignment
+        self.page_num = page_num
+        n = len(text)
+        self.vertical_spacing_after = (
+            vertical_spacing_after if vertical_spacing_after is not None else np.zeros(n, dtype=np.float64)
+        )
+        self.relative_font_size = (
+            relative_font_size if relative_font_size is not None else np.ones(n, dtype=np.float64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.text) == 0
+
+    @classmethod
+    def empty_store(cls) -> "BlockFeatures":
+        """Cria um armazenamento sem blocos, com as colunas já tipadas."""
+        return cls(
+            text=[],
+            word_count=np.zeros(0, dtype=np.int32),
+            char_count=np.zeros(0, dtype=np.int32),
+            avg_font_size=np.zeros(0, dtype=np.float64),
+            max_font_size=np.zeros(0, dtype=np.float64),
+            is_bold=np.zeros(0, dtype=bool),
+            is_all_caps=np.zeros(0, dtype=bool),
+            bbox=np.zeros((0, 4), dtype=np.float64),
+            normalized_y0=np.zeros(0, dtype=np.float64),
+            alignment=np.zeros(0, dtype=np.int8),
+            page_num=np.zeros(0, dtype=np.int32),
+        )
+
+    def filter(self, mask: np.ndarray) -> "BlockFeatures":
+        """Devolve um novo armazenamento apenas com os blocos onde a máscara é verdadeira."""
+        columns = {name: getattr(self, name)[mask] for name in self.NUMERIC_COLUMNS}
+        text = [t for t, keep in zip(self.text, mask) if keep]
+        return BlockFeatures(text=text, **columns)
+
+    @classmethod
+    def concatenate(cls, parts: Sequence["BlockFeatures"]) -> "BlockFeatures":
+        """Junta vários armazenamentos (por exemplo, fragmentos de páginas) pela ordem dada."""
+        if not parts:
+            return cls.empty_store()
+        columns = {name: np.concatenate([getattr(p, name) for p in parts]) for name in cls.NUMERIC_COLUMNS}
+        text = [t for p in parts for t in p.text]
+        return cls(text=text, **columns)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializa em formato .npz (sem pickle): as colunas numéricas como arrays e o
+        texto como JSON em UTF-8. Carregar o resultado nunca executa código.
+        """
+        buffer = io.BytesIO()
+        text = np.frombuffer(json.dumps(self.text, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+        np.savez(buffer, text=text, **{name: getattr(self, name) for name in self.NUMERIC_COLUMNS})
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BlockFeatures":
+        """Reconstrói um armazenamento serializado com to_bytes."""
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            columns = {name: arrays[name] for name in cls.NUMERIC_COLUMNS}
+            text = json.loads(arrays["text"].tobytes().decode("utf-8"))
+        return cls(text=text, **columns)
+
+    def to_dataframe(self):
+        """Converte para um DataFrame do pandas (apenas para inspeção/compatibilidade)."""
+        import pandas as pd  # Importação tardia: o pandas não faz parte do caminho principal.
+
+        if self.empty:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            "text": self.text,
+            "word_count": self.word_count,
+            "char_count": self.char_count,
+            "avg_font_size": self.avg_font_size,
+            "max_font_size": self.max_font_size,
+            "is_bold": self.is_bold,
+            "is_all_caps": self.is_all_caps,
+            "bbox": [tuple(b) for b in self.bbox.tolist()],
+            "normalized_y0": self.normalized_y0,
+            "alignment": [ALIGNMENTS[a] for a in self.alignment.tolist()],
+            "page_num": self.page_num,
+            "vertical_spacing_after": self.vertical_spacing_after,
+            "relative_font_size": self.relative_font_size,
+        })
+
+
 class FeatureExtractor:
     """
     Implementa a extração e validação granular de características de um documento PDF,
     conforme detalhado na Secção 1 do relatório, com uma camada adicional de limpeza.
     """
 
+    def __init__(self, max_workers: Optional[int] = None, min_pages_for_parallel: Optional[int] = None):
+        """
+        Args:
+            max_workers: Número de processos usados na extração. 1 desativa o modo paralelo.
+            min_pages_for_parallel: Abaixo deste número de páginas a extração é sempre serial.
+        """
+        self.max_workers = max_workers if max_workers is not None else settings.FEATURE_EXTRACTION_WORKERS
+        self.min_pages_for_parallel = (
+            min_pages_for_parallel if min_pages_for_parallel is not None
+            else settings.FEATURE_EXTRACTION_MIN_PAGES
+        )
+
     def _get_page_blocks(self, page: fitz.Page) -> List[Dict[str, Any]]:
         """Extrai todos os blocos de texto de uma página com as suas propriedades."""
         return page.get_text("dict", flags=fitz.TEXTFLAGS_SEARCH).get("blocks", [])
@@ -23,27 +201,32 @@ class FeatureExtractor:
             "is_monospace": bool(flags & 2**3),
         }
 
-    def _is_potential_junk(self, block_features: Dict[str, Any]) -> bool:
+    def _junk_mask(
+        self, text: List[str], word_count: np.ndarray, normalized_y0: np.ndarray
+    ) -> np.ndarray:
         """
-        Valida se um bloco de texto é provavelmente ruído (cabeçalho, rodapé, número de página).
+        Valida, para todos os blocos de uma vez, quais são provavelmente ruído
+        (cabeçalho, rodapé, número de página).
         Esta é a camada de validação que remove textos inúteis.
         """
+        is_digit = np.fromiter((t.isdigit() for t in text), dtype=bool, count=len(text))
+        mentions_page = np.fromiter(
+            (("página" in lower or "page" in lower) for lower in (t.lower() for t in text)),
+            dtype=bool,
+            count=len(text),
+        )
+
         # Regra 1: Posição na página (muito no topo ou muito no fundo)
-        if block_features["normalized_y0"] < 0.08 or block_features["normalized_y0"] > 0.92:
-            # Regra 2: Conteúdo curto e/ou numérico
-            if block_features["word_count"] < 5 or block_features["text"].isdigit():
-                return True
-        
+        at_edge = (normalized_y0 < 0.08) | (normalized_y0 > 0.92)
+        # Regra 2: Conteúdo curto e/ou numérico
+        short_or_numeric = (word_count < 5) | is_digit
         # Regra 3: Linhas que contêm "página" ou "page" (comum em rodapés)
-        text_lower = block_features["text"].lower()
-        if "página" in text_lower or "page" in text_lower:
-            return True
-            
-        return False
+        return (at_edge & short_or_numeric) | mentions_page
 
-    def _aggregate_block_features(self, block: Dict[str, Any], page_height: float, page_width: float) -> Dict[str, Any]:
+    def _aggregate_block_features(self, block: Dict[str, Any]) -> Optional[Tuple[str, int, float, float, bool]]:
         """
         Agrega as características dos spans a nível de bloco.
+        Devolve (texto, nº de palavras, fonte média, fonte máxima, negrito) ou None.
         """
         if block.get("type") != 0 or not block.get("lines"):
             return None
@@ -71,71 +254,148 @@ class FeatureExtractor:
             max_font_size = 0
 
         is_bold = any(self._decode_flags(s["flags"])["is_bold"] for s in all_spans)
-        
-        bbox = block["bbox"]
-        normalized_y0 = bbox[1] / page_height
-        
-        block_center = (bbox[0] + bbox[2]) / 2
+
+        return cleaned_text, word_count, avg_font_size, max_font_size, is_bold
+
+    def _extract_page_range(self, pdf_document: fitz.Document, start: int, end: int) -> BlockFeatures:
+        """Extrai e valida as características dos blocos das páginas [start, end)."""
+        text: List[str] = []
+        word_count: List[int] = []
+        avg_font_size: List[float] = []
+        max_font_size: List[float] = []
+        is_bold: List[bool] = []
+        bbox: List[Tuple[float, float, float, float]] = []
+        page_num: List[int] = []
+        page_size: List[Tuple[float, float]] = []
+
+        for page_index in range(start, end):
+            page = pdf_document[page_index]
+            page_blocks = self._get_page_blocks(page)
+            size = (page.rect.width, page.rect.height)
+
+            for block in page_blocks:
+                aggregated = self._aggregate_block_features(block)
+                if aggregated:
+                    block_text, words, avg_size, max_size, bold = aggregated
+                    text.append(block_text)
+                    word_count.append(words)
+                    avg_font_size.append(avg_size)
+                    max_font_size.append(max_size)
+                    is_bold.append(bold)
+                    bbox.append(block["bbox"])
+                    page_num.append(page_index + 1)
+                    page_size.append(size)
+
+        if not text:
+            return BlockFeatures.empty_store()
+
+        bbox_arr = np.asarray(bbox, dtype=np.float64)
+        page_width, page_height = np.asarray(page_size, dtype=np.float64).T
+        word_count_arr = np.asarray(word_count, dtype=np.int32)
+        normalized_y0 = bbox_arr[:, 1] / page_height
+
+        block_center = (bbox_arr[:, 0] + bbox_arr[:, 2]) / 2
         page_center = page_width / 2
         alignment_threshold = 0.1 * page_width
-        if abs(block_center - page_center) < alignment_threshold:
-            alignment = "center"
-        elif block_center < page_center:
-            alignment = "left"
-        else:
-            alignment = "right"
+        alignment = np.where(
+            np.abs(block_center - page_center) < alignment_threshold,
+            ALIGN_CENTER,
+            np.where(block_center < page_center, ALIGN_LEFT, ALIGN_RIGHT),
+        ).astype(np.int8)
 
-        return {
-            "text": cleaned_text,
-            "word_count": word_count,
-            "char_count": len(cleaned_text),
-            "avg_font_size": avg_font_size,
-            "max_font_size": max_font_size,
-            "is_bold": is_bold,
-            "is_all_caps": cleaned_text.isupper() and word_count > 0,
-            "bbox": bbox,
-            "normalized_y0": normalized_y0,
-            "alignment": alignment,
-        }
+        features = BlockFeatures(
+            text=text,
+            word_count=word_count_arr,
+            char_count=np.fromiter((len(t) for t in text), dtype=np.int32, count=len(text)),
+            avg_font_size=np.asarray(avg_font_size, dtype=np.float64),
+            max_font_size=np.asarray(max_font_size, dtype=np.float64),
+            is_bold=np.asarray(is_bold, dtype=bool),
+            is_all_caps=np.fromiter(
+                (t.isupper() and w > 0 for t, w in zip(text, word_count)), dtype=bool, count=len(text)
+            ),
+            bbox=bbox_arr,
+            normalized_y0=normalized_y0,
+            alignment=alignment,
+            page_num=np.asarray(page_num, dtype=np.int32),
+        )
+
+        # Aplica a validação para filtrar ruído
+        junk = self._junk_mask(text, word_count_arr, normalized_y0)
+        return features.filter(~junk) if junk.any() else features
 
-    def extract_features_as_dataframe(self, pdf_document: fitz.Document) -> pd.DataFrame:
+    def _document_source(self, pdf_document: fitz.Document) -> Union[str, bytes]:
+        """Devolve o caminho ou os bytes a partir dos quais cada processo reabre o documento."""
+        if pdf_document.name and os.path.isfile(pdf_document.name):
+            return pdf_document.name
+        stream = getattr(pdf_document, "stream", None)
+        if stream is not None:
+            return bytes(stream)
+        return pdf_document.tobytes()
+
+    def _extract_parallel(self, pdf_document: fitz.Document, workers: int) -> BlockFeatures:
         """
-        Processa o documento, extrai características, valida-as e retorna um DataFrame limpo.
+        Divide as páginas em fragmentos contíguos, extrai cada um num processo separado
+        e junta os resultados pela ordem das páginas.
         """
-        all_blocks_features = []
-        for page_num, page in enumerate(pdf_document):
-            page_blocks = self._get_page_blocks(page)
-            page_height = page.rect.height
-            page_width = page.rect.width
-            
-            for block in page_blocks:
-                features = self._aggregate_block_features(block, page_height, page_width)
-                if features:
-                    # Aplica a validação para filtrar ruído
-                    if not self._is_potential_junk(features):
-                        features["page_num"] = page_num + 1
-                        all_blocks_features.append(features)
-
-        if not all_blocks_features:
-            return pd.DataFrame()
+        page_count = pdf_document.page_count
+        # Alguns fragmentos por processo equilibram páginas mais pesadas que outras.
+        shard_size = max(1, math.ceil(page_count / (workers * 4)))
+        shards = [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+        logger.info(f"A extrair {page_count} páginas em {len(shards)} fragmentos com {workers} processos.")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_shard_worker,
+            initargs=(self._document_source(pdf_document),),
+        ) as executor:
+            # executor.map preserva a ordem de submissão, logo a ordem das páginas.
+            return BlockFeatures.concatenate(list(executor.map(_extract_shard, shards)))
+
+    def _extract_all_blocks(self, pdf_document: fitz.Document) -> BlockFeatures:
+        """Escolhe entre a extração serial e a paralela conforme o tamanho do documento."""
+        page_count = pdf_document.page_count
+        workers = min(self.max_workers, page_count)
+        if workers > 1 and page_count >= self.min_pages_for_parallel:
+            try:
+                return self._extract_parallel(pdf_document, workers)
+            except Exception as e:
+                logger.warning(f"Falha na extração paralela, a continuar em modo serial: {e}")
+        return self._extract_page_range(pdf_document, 0, page_count)
+
+    def extract_features(self, pdf_document: fitz.Document) -> BlockFeatures:
+        """
+        Processa o documento, extrai características, valida-as e retorna-as em formato colunar.
+        """
+        features = self._extract_all_blocks(pdf_document)
 
-        df = pd.DataFrame(all_blocks_features)
+        if features.empty:
+            return features
 
         # Engenharia de Características Contextuais
-        df['vertical_spacing_after'] = df['bbox'].apply(lambda b: b[1]).shift(-1) - df['bbox'].apply(lambda b: b[3])
-        df['vertical_spacing_after'] = df['vertical_spacing_after'].fillna(0)
-        
+        top = features.bbox[:, 1]
+        bottom = features.bbox[:, 3]
+        spacing = np.zeros(len(features), dtype=np.float64)
+        spacing[:-1] = top[1:] - bottom[:-1]
+        features.vertical_spacing_after = spacing
+
         # Tamanho de fonte relativo
-        paragraph_blocks = df[df['word_count'] > 5]
-        if not paragraph_blocks.empty:
-            median_font_size = paragraph_blocks['avg_font_size'].median()
+        avg_font_size = features.avg_font_size
+        paragraph_mask = features.word_count > 5
+        if paragraph_mask.any():
+            median_font_size = float(np.median(avg_font_size[paragraph_mask]))
         else:
-            median_font_size = df['avg_font_size'].median() if not df.empty else 10
+            median_font_size = float(np.median(avg_font_size))
 
-        if pd.notna(median_font_size) and median_font_size > 0:
-            df['relative_font_size'] = df['max_font_size'] / median_font_size
+        if not np.isnan(median_font_size) and median_font_size > 0:
+            features.relative_font_size = features.max_font_size / median_font_size
         else:
-            df['relative_font_size'] = 1.0
-            
-        return df
+            features.relative_font_size = np.ones(len(features), dtype=np.float64)
 
+        return features
+
+    def extract_features_as_dataframe(self, pdf_document: fitz.Document):
+        """
+        Processa o documento, extrai características, valida-as e retorna um DataFrame limpo.
+        Mantido por compatibilidade; o caminho principal usa extract_features().
+        """
+        return self.extract_features(pdf_document).to_dataframe()
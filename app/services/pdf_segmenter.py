@@ -1,119 +1,182 @@
 import fitz
-import pandas as pd
+import numpy as np
 import logging
-from typing import List, Dict, Any
-from app.services.feature_extractor import FeatureExtractor
+from typing import List, Dict, Any, Iterator
+from app.services.feature_extractor import ALIGN_CENTER, BlockFeatures, FeatureExtractor
 from app.services.chapter_validator import ChapterValidator
+from app.services.extraction_cache import ExtractionCache, PDFSource, extraction_cache
 
 logger = logging.getLogger(__name__)
 
 class PDFSegmenterService:
-    def __init__(self):
-        self.feature_extractor = FeatureExtractor()
+    def __init__(self, cache: ExtractionCache = None, feature_extractor: FeatureExtractor = None):
+        self.feature_extractor = feature_extractor or FeatureExtractor()
         self.chapter_validator = ChapterValidator()
+        self.cache = cache or extraction_cache
 
-    def _is_title_candidate(self, row: pd.Series, median_font_size: float) -> bool:
+    def _title_candidate_mask(self, features: BlockFeatures, median_font_size: float) -> np.ndarray:
         """
         --- NOVA LÓGICA DE DECISÃO INTELIGENTE ---
-        Analisa as características de um bloco de texto para determinar se é um título.
-        Combina várias pistas visuais para uma decisão mais robusta.
+        Analisa as características de todos os blocos de uma só vez e devolve uma máscara
+        booleana que indica quais são títulos. Combina várias pistas visuais para uma
+        decisão mais robusta.
         """
         # Condição 1: Fonte significativamente maior que o texto normal.
-        cond_large_font = row['relative_font_size'] > 1.2 and row['word_count'] < 15
+        cond_large_font = (features.relative_font_size > 1.2) & (features.word_count < 15)
 
         # Condição 2: Texto em negrito e ligeiramente maior.
-        cond_bold_and_larger = row['is_bold'] and row['relative_font_size'] > 1.1
+        cond_bold_and_larger = features.is_bold & (features.relative_font_size > 1.1)
 
         # Condição 3: Texto em maiúsculas, com poucos caracteres e alinhado ao centro.
-        cond_all_caps = (row['is_all_caps'] and 
-                         row['word_count'] < 10 and 
-                         row['char_count'] > 2 and # Evita capturar apenas "I", "V", etc. isoladamente aqui
-                         row['alignment'] == 'center')
+        cond_all_caps = (features.is_all_caps &
+                         (features.word_count < 10) &
+                         (features.char_count > 2) & # Evita capturar apenas "I", "V", etc. isoladamente aqui
+                         (features.alignment == ALIGN_CENTER))
 
         # Condição 4: Espaçamento vertical significativo após o bloco.
         # Um espaço maior que 1.5x o tamanho da fonte do parágrafo é um bom indicador.
-        cond_spacing = row['vertical_spacing_after'] > (median_font_size * 1.5)
+        cond_spacing = features.vertical_spacing_after > (median_font_size * 1.5)
 
         # Um bloco é um forte candidato a título se tiver uma formatação de destaque
         # E for seguido por um espaço em branco significativo.
-        return (cond_large_font or cond_bold_and_larger or cond_all_caps) and cond_spacing
+        return (cond_large_font | cond_bold_and_larger | cond_all_caps) & cond_spacing
 
-    def _identify_chapters_from_features(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _iter_chapters_from_features(self, features: BlockFeatures) -> Iterator[Dict[str, Any]]:
         """
-        Identifica e extrai capítulos com base no DataFrame de características.
+        Identifica os capítulos com base nas características dos blocos e gera-os um a um,
+        à medida que cada capítulo é fechado pelo título seguinte.
         """
-        if df.empty:
-            return []
+        if features.empty:
+            return
+
+        # Calcula o tamanho de fonte mediano para usar como referência
+        paragraph_mask = features.word_count > 5
+        median_font_size = (
+            float(np.median(features.avg_font_size[paragraph_mask]))
+            if paragraph_mask.any() else 10.0
+        )
+
+        texts = features.text
+        page_nums = features.page_num.tolist()
+        # Posições dos blocos identificados como títulos
+        title_positions = np.flatnonzero(self._title_candidate_mask(features, median_font_size)).tolist()
 
-        chapters = []
-        current_content = ""
         current_title = "Início do Documento"
         start_page = 1
+        content_start = 0
+
+        # O conteúdo de cada capítulo é o grupo de blocos entre dois títulos consecutivos,
+        # materializado uma única vez com join.
+        for position in title_positions + [len(texts)]:
+            current_content = "\n".join(texts[content_start:position]).strip()
+            # Se encontramos um novo título, fechamos o capítulo anterior
+            if current_content:
+                yield {
+                    "title": current_title,
+                    "content": current_content,
+                    "start_page": start_page
+                }
+
+            # Inicia o novo capítulo
+            if position < len(texts):
+                current_title = texts[position]
+                start_page = page_nums[position]
+                content_start = position + 1
+
+    def _identify_chapters_from_features(self, features: BlockFeatures) -> List[Dict[str, Any]]:
+        """
+        Identifica e extrai capítulos com base nas características dos blocos.
+        """
+        return list(self._iter_chapters_from_features(features))
 
-        # Calcula o tamanho de fonte mediano para usar como referência
-        paragraph_blocks = df[df['word_count'] > 5]
-        median_font_size = paragraph_blocks['avg_font_size'].median() if not paragraph_blocks.empty else 10.0
-        
-        for index, row in df.iterrows():
-            if self._is_title_candidate(row, median_font_size):
-                # Se encontramos um novo título, guardamos o capítulo anterior
-                if current_content.strip():
-                    chapters.append({
-                        "title": current_title,
-                        "content": current_content.strip(),
-                        "start_page": start_page
-                    })
-                
-                # Inicia o novo capítulo
-                current_title = row['text']
-                start_page = row['page_num']
-                current_content = ""
-            else:
-                # Se não for um título, adiciona o texto ao conteúdo atual
-                current_content += row['text'] + "\n"
-
-        # Adiciona o último capítulo que estava a ser processado
-        if current_content.strip():
-            chapters.append({
-                "title": current_title,
-                "content": current_content.strip(),
-                "start_page": start_page
-            })
-
-        return chapters
-
-    def segment_pdf(self, pdf_bytes: bytes) -> Dict[str, Any]:
+    def _open_document(self, pdf_source: PDFSource) -> fitz.Document:
         """
-        Orquestra o processo completo de segmentação do PDF.
+        Abre o PDF a partir de bytes ou de um caminho. Com um caminho, o MuPDF lê o
+        ficheiro sob demanda (através da cache de páginas do sistema operativo), sem
+        uma cópia do documento inteiro em memória do Python.
         """
         try:
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+                return fitz.open(stream=pdf_source, filetype="pdf")
+            return fitz.open(pdf_source, filetype="pdf")
         except Exception as e:
             logger.error(f"Erro ao abrir o stream do PDF: {e}")
             raise ValueError("Arquivo PDF inválido ou corrompido.")
 
-        # 1. Extrai um DataFrame limpo e rico em características
-        features_df = self.feature_extractor.extract_features_as_dataframe(pdf_document)
+    def _extract_features(self, pdf_source: PDFSource, digest: str = None) -> BlockFeatures:
+        """Abre o PDF e extrai as características dos blocos em formato colunar (com cache)."""
+        def compute() -> BlockFeatures:
+            pdf_document = self._open_document(pdf_source)
+            try:
+                return self.feature_extractor.extract_features(pdf_document)
+            finally:
+                pdf_document.close()
+
+        return self.cache.get_or_compute(digest or self.cache.digest(pdf_source), "features", compute)
+
+    def extract_page_texts(self, pdf_source: PDFSource) -> List[str]:
+        """Devolve o texto bruto de cada página, pela ordem do documento (com cache)."""
+        def compute() -> List[str]:
+            with self._open_document(pdf_source) as pdf_document:
+                return [page.get_text("text") or "" for page in pdf_document]
+
+        return self.cache.get_or_compute(self.cache.digest(pdf_source), "pages", compute)
 
-        # 2. Identifica os capítulos brutos com base nas características
-        raw_chapters = self._identify_chapters_from_features(features_df)
+    def _iter_final_chapters(self, features: BlockFeatures) -> Iterator[Dict[str, Any]]:
+        """Encadeia a identificação e a validação, gerando cada capítulo final assim que fica fechado."""
+        raw_chapters = self._iter_chapters_from_features(features)
+        return self.chapter_validator.iter_validated(raw_chapters)
+
+    def _whole_document_chapter(self, features: BlockFeatures) -> Dict[str, Any]:
+        """Capítulo único usado quando nenhum capítulo é encontrado."""
+        return {
+            "title": "Documento Completo",
+            "content": " ".join(features.text),
+            "start_page": 1
+        }
 
-        # 3. Valida e refina os capítulos (ex: funde subtítulos)
-        final_chapters = self.chapter_validator.validate_and_merge(raw_chapters)
+    def iter_chapters(self, pdf_source: PDFSource) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os capítulos finais um a um, para que as etapas seguintes possam começar
+        pelo primeiro capítulo sem esperar pela montagem dos restantes.
+
+        Nota: a extração de características continua a ser feita para o documento
+        inteiro antes do primeiro capítulo, porque a fonte mediana e o espaçamento
+        de referência dependem de todos os blocos.
+        """
+        features = self._extract_features(pdf_source)
+
+        found = False
+        for chapter in self._iter_final_chapters(features):
+            found = True
+            yield chapter
+
+        if not found:
+            yield self._whole_document_chapter(features)
+
+    def segment_pdf(self, pdf_source: PDFSource) -> Dict[str, Any]:
+        """
+        Orquestra o processo completo de segmentação do PDF.
+        Aceita os bytes do PDF ou o caminho de um ficheiro local.
+        O resultado é guardado no cache de extração, pelo SHA-256 do PDF.
+        """
+        digest = self.cache.digest(pdf_source)
+        return self.cache.get_or_compute(digest, "chapters", lambda: self._segment(pdf_source, digest))
+
+    def _segment(self, pdf_source: PDFSource, digest: str) -> Dict[str, Any]:
+        # 1. Extrai as características dos blocos em formato colunar
+        features = self._extract_features(pdf_source, digest)
+
+        # 2. Identifica os capítulos brutos e 3. valida-os e refina-os (ex: funde subtítulos)
+        final_chapters = list(self._iter_final_chapters(features))
         
         toc = [] # A extração de TOC pode ser adicionada aqui se necessário
 
-        pdf_document.close()
-
         if not final_chapters:
              return {
                 "status": "success",
                 "message": "Nenhum capítulo encontrado. O documento foi processado como um único bloco.",
-                "chapters": [{
-                    "title": "Documento Completo",
-                    "content": " ".join(features_df['text'].tolist()),
-                    "start_page": 1
-                }],
+                "chapters": [self._whole_document_chapter(features)],
                 "table_of_contents": toc
             }
 
@@ -123,4 +186,3 @@ class PDFSegmenterService:
             "chapters": final_chapters,
             "table_of_contents": toc
         }
-
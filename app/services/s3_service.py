@@ -1,15 +1,31 @@
+import os
+import tempfile
 import time
 import boto3
 import logging
+import threading
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from app.core.config import settings
 from app.crud import crud_document
 from app.models.document import ProcessingStatus
 import io
+from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
+# Tamanho mínimo de uma parte de um upload multipart (exceto a última), imposto pelo S3
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Conteúdo aceite por publish_many: bytes, ficheiro ou função que produz o conteúdo
+# (bytes, ficheiro ou iterador de bytes) a cada tentativa.
+PublishSource = Union[bytes, BinaryIO, Callable[[], Union[bytes, BinaryIO, Iterable[bytes]]]]
+
+
 class S3Service:
     """
     Serviço para gerir o upload de ficheiros para um bucket Amazon S3.
@@ -27,8 +43,29 @@ class S3Service:
                 endpoint_url=settings.S3_ENDPOINT_URL,
                 aws_access_key_id=settings.ACCESS_KEY_ID,
                 aws_secret_access_key=settings.SECRET_ACCESS_KEY,
+                # Uma ligação por parte enviada em paralelo (o pool de partes é partilhado)
+                # mais uma por objeto publicado em simultâneo (PUT simples, início e fim
+                # do multipart), no mínimo as 10 por omissão.
+                config=BotoConfig(max_pool_connections=max(
+                    10, settings.S3_MAX_CONCURRENCY + settings.S3_PUBLISH_CONCURRENCY
+                )),
             )
             self.bucket_name = settings.S3_BUCKET_NAME
+            # Multipart com tamanho de parte e concorrência configuráveis
+            self.part_size = max(MIN_PART_SIZE, settings.S3_MULTIPART_CHUNK_BYTES)
+            self.max_concurrency = max(1, settings.S3_MAX_CONCURRENCY)
+            self.transfer_config = TransferConfig(
+                multipart_threshold=settings.S3_MULTIPART_THRESHOLD_BYTES,
+                multipart_chunksize=self.part_size,
+                max_concurrency=self.max_concurrency,
+                use_threads=True,
+            )
+            # Pool único para as partes dos uploads em stream (_upload_iterable): com
+            # publish_many, os objetos enviados em simultâneo partilham as mesmas
+            # max_concurrency ligações em vez de abrir cada um as suas.
+            self._part_executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="s3-upload"
+            )
             logger.info("Cliente S3 inicializado com sucesso.")
         except ValueError as e:
             logger.error(e)
@@ -40,47 +77,35 @@ class S3Service:
             logger.error(f"Erro inesperado ao inicializar o cliente S3: {e}")
             raise RuntimeError("Falha na inicialização do serviço S3.")
 
-    def upload_audio(self, audio_bytes: bytes, filename: str) -> Tuple[str, str]:
+    def upload_audio(self, audio_bytes: Union[bytes, BinaryIO], filename: str) -> Tuple[str, str]:
         """
-        Faz o upload de bytes de um ficheiro de áudio para o S3 e torna-o público.
+        Faz o upload de um ficheiro de áudio para o S3 e torna-o público.
 
         Args:
-            audio_bytes: O conteúdo do áudio em bytes.
+            audio_bytes: O conteúdo do áudio, em bytes ou como objeto de ficheiro
+                (por exemplo, AudioSink.fileobj()), que é enviado sem ser copiado.
             filename: O nome do ficheiro (caminho) a ser guardado no bucket.
 
         Returns:
             Tupla com (audio_file_key, public_url):
                 - audio_file_key: A chave/caminho do arquivo no bucket S3
-                - public_url: A URL pública do ficheiro carregado (gerada pelo boto3)
+                - public_url: A URL pública do ficheiro carregado (ver _public_url)
         """
         try:
-            file_obj = io.BytesIO(audio_bytes)
+            file_obj = io.BytesIO(audio_bytes) if isinstance(audio_bytes, (bytes, bytearray)) else audio_bytes
             
-            # Upload do arquivo para o S3
+            # Upload do arquivo para o S3 (multipart acima do limiar, com partes em paralelo)
             self.s3_client.upload_fileobj(
                 file_obj,
                 self.bucket_name,
                 filename,
-                ExtraArgs={'ContentType': 'audio/mpeg', 'ACL': 'public-read'}
+                ExtraArgs={'ContentType': 'audio/mpeg', 'ACL': 'public-read'},
+                Config=self.transfer_config,
             )
             
             # A chave é o próprio filename (caminho no bucket)
             audio_file_key = filename
-            
-            # Gera a URL pública usando o método do boto3
-            # Isso garante que a URL seja gerada corretamente pelo próprio SDK
-            public_url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': self.bucket_name,
-                    'Key': filename
-                },
-                ExpiresIn=0  # 0 significa URL sem expiração (para objetos públicos)
-            )
-            
-            # Remove os parâmetros de query se existirem (para URLs públicas limpas)
-            if '?' in public_url:
-                public_url = public_url.split('?')[0]
+            public_url = self._public_url(filename)
             
             logger.info(f"Ficheiro '{filename}' carregado para o S3.")
             logger.info(f"URL pública: {public_url}")
@@ -95,6 +120,240 @@ class S3Service:
             logger.error(f"Erro inesperado durante o upload para o S3: {e}")
             raise RuntimeError("Ocorreu uma falha desconhecida durante o upload do ficheiro.")
 
+    def close(self) -> None:
+        """Termina o pool de envio de partes e fecha as ligações do cliente boto3."""
+        self._part_executor.shutdown(wait=True)
+        self.s3_client.close()
+
+    def _public_url(self, key: str) -> str:
+        """
+        URL pública de um objeto do bucket, no estilo de caminho
+        ("<endpoint>/<bucket>/<chave>"), igual à que o boto3 gera sem assinatura.
+
+        É calculada localmente, sem chamar o SDK por objeto; S3_PUBLIC_BASE_URL, se
+        definido, substitui "<endpoint>/<bucket>".
+        """
+        base_url = settings.S3_PUBLIC_BASE_URL or f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{self.bucket_name}"
+        return f"{base_url.rstrip('/')}/{quote(key, safe='/~')}"
+
+    def publish_many(
+        self,
+        items: Iterable[Tuple[str, PublishSource]],
+        content_type: str = 'audio/mpeg',
+        max_workers: Optional[int] = None,
+        retries: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Publica vários objetos (públicos) em simultâneo e devolve um manifesto.
+
+        Os objetos são enviados por um pool de até S3_PUBLISH_CONCURRENCY threads, cada
+        um como em upload_stream (multipart quando é grande); as partes de todos os
+        objetos passam pelo mesmo pool de S3_MAX_CONCURRENCY envios. Uma falha num
+        objeto não interrompe os restantes: o objeto é tentado de novo até
+        S3_PUBLISH_RETRIES vezes, com espera crescente, e só depois é dado como falhado.
+
+        Args:
+            items: Pares (chave, áudio). O áudio pode ser bytes, um objeto de ficheiro
+                ou uma função sem argumentos que devolve um dos anteriores ou um
+                iterador de bytes; a função é chamada de novo a cada tentativa, pelo
+                que é a forma de publicar conteúdo gerado em stream com novas tentativas.
+            content_type: Content-Type dos objetos.
+            max_workers: Objetos enviados em simultâneo (por omissão, S3_PUBLISH_CONCURRENCY).
+            retries: Novas tentativas por objeto (por omissão, S3_PUBLISH_RETRIES).
+
+        Returns:
+            Manifesto com uma entrada por objeto, pela ordem recebida ("key", "url",
+            "status" — "success" ou "failed" —, "size_bytes", "attempts", "seconds" e,
+            se falhou, "error") e os totais "succeeded", "failed", "total_bytes" e "seconds".
+        """
+        items = list(items)
+        max_workers = max(1, settings.S3_PUBLISH_CONCURRENCY if max_workers is None else max_workers)
+        retries = max(0, settings.S3_PUBLISH_RETRIES if retries is None else retries)
+        started = time.perf_counter()
+
+        def publish(key: str, source: PublishSource) -> Dict[str, Any]:
+            item_started = time.perf_counter()
+            entry: Dict[str, Any] = {"key": key, "url": self._public_url(key), "status": None, "size_bytes": None}
+            for attempt in range(1, retries + 2):
+                try:
+                    entry["size_bytes"] = self._publish_one(key, source, content_type)
+                    entry["status"] = "success"
+                    entry.pop("error", None)
+                    break
+                except Exception as e:
+                    entry["status"] = "failed"
+                    entry["error"] = str(e)
+                    # Um iterador já consumido ou um ficheiro sem seek não pode ser reenviado.
+                    if attempt > retries or not self._can_retry(source):
+                        logger.error(f"Falha ao publicar '{key}' após {attempt} tentativa(s): {e}")
+                        break
+                    logger.warning(f"Falha ao publicar '{key}' (tentativa {attempt}), a tentar de novo: {e}")
+                    time.sleep(0.5 * 2 ** (attempt - 1))
+            entry["attempts"] = attempt
+            entry["seconds"] = round(time.perf_counter() - item_started, 3)
+            return entry
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items) or 1), thread_name_prefix="s3-publish") as executor:
+            entries = list(executor.map(lambda item: publish(*item), items))
+
+        succeeded = sum(entry["status"] == "success" for entry in entries)
+        manifest = {
+            "items": entries,
+            "succeeded": succeeded,
+            "failed": len(entries) - succeeded,
+            "total_bytes": sum(entry.get("size_bytes") or 0 for entry in entries),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(
+            f"Publicação em lote concluída: {manifest['succeeded']}/{len(entries)} objetos, "
+            f"{manifest['total_bytes']} bytes em {manifest['seconds']}s."
+        )
+        return manifest
+
+    @staticmethod
+    def _can_retry(source: PublishSource) -> bool:
+        if callable(source) or isinstance(source, (bytes, bytearray)):
+            return True
+        return hasattr(source, 'seek') and getattr(source, 'seekable', lambda: True)()
+
+    def _publish_one(self, key: str, source: PublishSource, content_type: str) -> int:
+        """Envia um objeto público; devolve o tamanho em bytes."""
+        produced = callable(source)
+        if produced:
+            source = source()
+        extra_args = {'ContentType': content_type, 'ACL': 'public-read'}
+
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=bytes(source), **extra_args)
+                return len(source)
+            if hasattr(source, 'read'):
+                if hasattr(source, 'seek'):
+                    source.seek(0)
+                # Lido em partes, pelo mesmo caminho dos iteradores: as partes usam o
+                # pool partilhado em vez de um TransferManager com threads próprias.
+                return self._upload_iterable(iter(lambda: source.read(self.part_size), b""), key, extra_args)
+            return self._upload_iterable(source, key, extra_args)
+        finally:
+            # O que a função produziu só serve esta tentativa: fechar um gerador a
+            # meio (ex.: ElevenLabsService.iter_audio) cancela a síntese em curso em
+            # vez de a deixar a correr até o gerador ser recolhido.
+            close = getattr(source, 'close', None)
+            if produced and close is not None:
+                close()
+
+    def upload_stream(
+        self,
+        source: Union[Iterable[bytes], BinaryIO],
+        key: str,
+        content_type: str = 'audio/mpeg',
+        public: bool = True,
+    ) -> Tuple[str, str]:
+        """
+        Faz o upload de um conteúdo produzido aos poucos, sem o ter inteiro em memória.
+
+        Aceita um objeto de ficheiro (enviado com upload_fileobj e a TransferConfig do
+        serviço) ou um iterador de bytes, como o ElevenLabsService.iter_audio: neste caso
+        as partes do upload multipart são enviadas, em paralelo, à medida que o iterador
+        as produz, pelo que o upload decorre enquanto a síntese ainda está a correr.
+        A memória usada fica limitada a cerca de (S3_MAX_CONCURRENCY + 1) partes.
+
+        Returns:
+            Tupla com (chave, URL pública), como upload_audio.
+        """
+        extra_args = {'ContentType': content_type}
+        if public:
+            extra_args['ACL'] = 'public-read'
+
+        try:
+            if hasattr(source, 'read'):
+                self.s3_client.upload_fileobj(
+                    source, self.bucket_name, key, ExtraArgs=extra_args, Config=self.transfer_config
+                )
+                size = None
+            else:
+                size = self._upload_iterable(source, key, extra_args)
+        except ClientError as e:
+            logger.error(f"Erro do cliente S3 ao fazer o upload em stream de '{key}': {e}")
+            raise RuntimeError(f"Não foi possível carregar o ficheiro para o S3. Verifique as permissões do bucket.")
+
+        logger.info(f"Ficheiro '{key}' carregado para o S3 em stream" + (f" ({size} bytes)." if size is not None else "."))
+        return key, self._public_url(key)
+
+    def _upload_iterable(self, chunks: Iterable[bytes], key: str, extra_args: Dict[str, str]) -> int:
+        """Envia um iterador de bytes em partes multipart; devolve o total de bytes."""
+        buffer = bytearray()
+        iterator = iter(chunks)
+
+        # Conteúdo menor que uma parte: um único PUT, sem multipart.
+        for chunk in iterator:
+            buffer += chunk
+            if len(buffer) >= self.part_size:
+                break
+        else:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=bytes(buffer), **extra_args)
+            return len(buffer)
+
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=key, **extra_args
+        )['UploadId']
+        # Limita as partes em memória: uma a encher e, no máximo, max_concurrency em envio.
+        slots = threading.BoundedSemaphore(self.max_concurrency)
+        parts: List[Dict] = []
+        futures = []
+        total = 0
+
+        def upload_part(part_number: int, body: bytes) -> Dict:
+            try:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                    PartNumber=part_number, Body=body,
+                )
+                return {'PartNumber': part_number, 'ETag': response['ETag']}
+            finally:
+                slots.release()
+
+        def submit(body: bytes) -> None:
+            slots.acquire()
+            futures.append(self._part_executor.submit(upload_part, len(futures) + 1, body))
+
+        try:
+            while True:
+                while len(buffer) >= self.part_size:
+                    body = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    total += len(body)
+                    submit(body)
+                chunk = next(iterator, None)
+                if chunk is None:
+                    break
+                buffer += chunk
+                # Falha antecipada: não continua a consumir o iterador se uma parte falhou.
+                for future in futures:
+                    if future.done() and future.exception() is not None:
+                        raise future.exception()
+            if buffer:
+                total += len(buffer)
+                submit(bytes(buffer))
+                buffer.clear()
+            parts = [future.result() for future in futures]
+
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+            return total
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            # As partes já em envio terminam antes do abort, para não ficarem partes órfãs
+            wait(futures)
+            try:
+                self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+            except ClientError as e:
+                logger.warning(f"Não foi possível abortar o upload multipart de '{key}': {e}")
+            raise
+
     def get_file(self, filename: str, db, document_id: int) -> bytes:
         """
         Obtém o conteúdo de um ficheiro do S3.
@@ -105,29 +364,181 @@ class S3Service:
             document_id: ID do documento
 
         Returns:
-            O conteúdo do ficheiro em bytes.
-        
+            O conteúdo do ficheiro em bytes (um bytearray pré-alocado quando o objeto é
+            descarregado por intervalos, para evitar uma cópia extra).
+
         Raises:
             FileNotFoundError: Se o ficheiro não for encontrado no bucket.
             RuntimeError: Para outros erros de comunicação com o S3.
         """
         try:
             logger.info(f"Buscando arquivo '{filename}' no bucket '{self.bucket_name}'")
-            
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=filename)
-            file_content = response['Body'].read()
-  
+
+            size, etag = self._stat_object(filename)
+            file_content = bytearray(size)
+            view = memoryview(file_content)
+
+            def write_at(offset: int, block: bytes) -> None:
+                view[offset:offset + len(block)] = block
+
+            self._download_object(filename, size, etag, write_at)
+            view.release()
+
             logger.info(f"Ficheiro '{filename}' obtido com sucesso do S3.")
             return file_content
-            
+
         except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchKey':
-                logger.error(f"Ficheiro não encontrado no S3: {filename}")
-                crud_document.update_document_status(db, document_id, ProcessingStatus.FAILED)
-                raise FileNotFoundError(f"O ficheiro '{filename}' não foi encontrado no bucket S3.")
-            else:
-                logger.error(f"Erro do cliente S3 ao obter o ficheiro '{filename}': {e}")
-                raise RuntimeError(f"Não foi possível obter o ficheiro do S3.")
+            raise self._download_error(e, filename, db, document_id)
+        except RuntimeError:
+            raise
         except Exception as e:
             logger.error(f"Erro inesperado ao obter o ficheiro '{filename}' do S3: {e}")
-            raise RuntimeError("Ocorreu uma falha desconhecida ao obter o ficheiro.")
\ No newline at end of file
+            raise RuntimeError("Ocorreu uma falha desconhecida ao obter o ficheiro.")
+
+    def get_object_bytes(self, key: str) -> Optional[bytes]:
+        """Lê um objeto do bucket; devolve None se a chave não existir."""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            return response['Body'].read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+
+    def put_object_bytes(self, key: str, data: bytes, content_type: str = 'application/octet-stream') -> None:
+        """Grava bytes num objeto privado do bucket (sem ACL pública)."""
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=data, ContentType=content_type)
+
+    @contextmanager
+    def download_to_temp_file(self, filename: str, db=None, document_id: Optional[int] = None) -> Iterator[str]:
+        """
+        Descarrega um objeto do S3 para um ficheiro temporário, em blocos, e devolve o
+        seu caminho; o ficheiro é apagado à saída do bloco `with`.
+
+        Ao contrário de get_file, o conteúdo nunca fica inteiro em memória: o PDF pode
+        depois ser aberto pelo caminho (fitz.open(path)), usando a cache de páginas do
+        sistema operativo em vez de bytes do Python. O ficheiro é pré-alocado com o
+        tamanho do objeto e, para objetos grandes, preenchido por intervalos em paralelo.
+
+        Raises:
+            FileNotFoundError: Se o ficheiro não for encontrado no bucket (o documento,
+                se indicado, passa a FAILED, como em get_file).
+            RuntimeError: Para outros erros de comunicação com o S3.
+        """
+        fd, path = tempfile.mkstemp(prefix="s3-", suffix=os.path.splitext(filename)[1], dir=settings.DOWNLOAD_TEMP_DIR)
+        try:
+            try:
+                size = self._download_into(filename, fd, db, document_id)
+            finally:
+                os.close(fd)
+            logger.info(f"Ficheiro '{filename}' descarregado do S3 para '{path}' ({size} bytes).")
+            yield path
+        finally:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _download_into(self, filename: str, fd: int, db=None, document_id: Optional[int] = None) -> int:
+        """Descarrega o objeto para o descritor de ficheiro indicado; devolve o número de bytes."""
+        try:
+            logger.info(f"Buscando arquivo '{filename}' no bucket '{self.bucket_name}'")
+            size, etag = self._stat_object(filename)
+            if hasattr(os, 'posix_fallocate') and size:
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+
+            def write_at(offset: int, block: bytes) -> None:
+                os.pwrite(fd, block, offset)
+
+            return self._download_object(filename, size, etag, write_at)
+
+        except ClientError as e:
+            raise self._download_error(e, filename, db, document_id)
+        except OSError as e:
+            logger.error(f"Erro ao escrever o ficheiro '{filename}' em disco: {e}")
+            raise RuntimeError("Não foi possível guardar o ficheiro obtido do S3.")
+
+    def _stat_object(self, key: str) -> Tuple[int, str]:
+        """Tamanho e ETag de um objeto do bucket (HEAD)."""
+        response = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+        return response['ContentLength'], response['ETag']
+
+    def _download_object(self, key: str, size: int, etag: str, write_at: Callable[[int, bytes], None]) -> int:
+        """
+        Descarrega o objeto, escrevendo cada bloco na sua posição com write_at.
+
+        Objetos abaixo de S3_RANGED_DOWNLOAD_THRESHOLD_BYTES são lidos num único GET.
+        Os maiores são divididos em intervalos de S3_DOWNLOAD_PART_BYTES, pedidos em
+        paralelo (até max_concurrency), cada um numa ligação própria, para que o débito
+        não fique limitado a um único stream TCP. Todos os pedidos levam If-Match com o
+        ETag lido no HEAD, pelo que um objeto substituído a meio da descarga dá erro em
+        vez de misturar versões; no fim, o total de bytes é comparado com o tamanho.
+        """
+        part_size = max(1, settings.S3_DOWNLOAD_PART_BYTES)
+        started = time.perf_counter()
+
+        if size < settings.S3_RANGED_DOWNLOAD_THRESHOLD_BYTES or size <= part_size:
+            written = self._download_range(key, etag, write_at, 0, None)
+            parts = 1
+        else:
+            ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+            parts = len(ranges)
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_concurrency, parts), thread_name_prefix="s3-download"
+            ) as executor:
+                futures = [
+                    executor.submit(self._download_range, key, etag, write_at, start, end)
+                    for start, end in ranges
+                ]
+                try:
+                    written = sum(future.result() for future in futures)
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+        if written != size:
+            raise RuntimeError(f"Descarga incompleta de '{key}': {written} de {size} bytes.")
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"'{key}' descarregado em {parts} parte(s): {size} bytes em {elapsed:.2f}s "
+            f"({size / elapsed / 1024 / 1024 if elapsed else 0:.1f} MiB/s)."
+        )
+        return written
+
+    def _download_range(
+        self, key: str, etag: str, write_at: Callable[[int, bytes], None], start: int, end: Optional[int]
+    ) -> int:
+        """Lê o intervalo [start, end] do objeto (o objeto inteiro se end for None)."""
+        extra_args = {'IfMatch': etag}
+        if end is not None:
+            extra_args['Range'] = f"bytes={start}-{end}"
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key, **extra_args)
+
+        offset = start
+        for block in response['Body'].iter_chunks(chunk_size=settings.S3_DOWNLOAD_CHUNK_BYTES):
+            write_at(offset, block)
+            offset += len(block)
+
+        if end is not None and offset != end + 1:
+            raise RuntimeError(
+                f"Intervalo {start}-{end} de '{key}' incompleto: recebidos {offset - start} bytes."
+            )
+        return offset - start
+
+    def _download_error(self, e: ClientError, filename: str, db=None, document_id: Optional[int] = None) -> Exception:
+        """Converte um erro do S3 numa descarga na exceção devolvida ao chamador."""
+        code = e.response['Error']['Code']
+        if code in ('NoSuchKey', '404'):
+            logger.error(f"Ficheiro não encontrado no S3: {filename}")
+            if db is not None and document_id is not None:
+                crud_document.update_document_status(db, document_id, ProcessingStatus.FAILED)
+            return FileNotFoundError(f"O ficheiro '{filename}' não foi encontrado no bucket S3.")
+        if code in ('PreconditionFailed', '412'):
+            logger.error(f"O ficheiro '{filename}' foi alterado no S3 durante a descarga.")
+            return RuntimeError(f"O ficheiro '{filename}' foi alterado durante a descarga; tente novamente.")
+        logger.error(f"Erro do cliente S3 ao obter o ficheiro '{filename}': {e}")
+        return RuntimeError(f"Não foi possível obter o ficheiro do S3.")
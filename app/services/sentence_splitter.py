@@ -0,0 +1,151 @@
+import re
+from typing import List
+
+# Abreviaturas comuns em pt-BR (em minúsculas, sem o ponto final) depois das quais
+# um ponto não termina a sentença.
+PT_BR_ABBREVIATIONS = frozenset({
+    # Tratamentos e títulos
+    "sr", "sra", "srs", "sras", "srta", "srtas", "d", "dr", "dra", "drs", "dras",
+    "prof", "profa", "profs", "exmo", "exma", "ilmo", "ilma", "rev", "revmo", "pe",
+    "fr", "sto", "sta", "vv", "gen", "cel", "maj", "cap", "ten",
+    "sgt", "mons", "arq", "eng", "adv",
+    # Referências bibliográficas e de texto
+    "cf", "cfr", "p", "pp", "pág", "págs", "pag", "pags", "fl", "fls", "art", "arts",
+    "caps", "vol", "vols", "ed", "eds", "nº", "núm", "fig", "figs",
+    "tab", "obs", "op", "cit", "ib", "ibid", "apud", "trad", "org", "orgs",
+    "coord", "col", "sec", "séc", "tít", "inc", "al", "etc", "ex", "exs", "pg",
+    # Endereços, datas e unidades
+    # (ficam de fora palavras comuns como "mar", "dom" ou "dez", que também fecham sentenças)
+    "av", "pç", "pça", "lgo", "rod", "km", "jan", "fev", "abr", "mai", "jun", "jul",
+    "ago", "nov", "qua", "qui", "sáb", "aprox", "máx", "mín", "ltda", "cia",
+    "dept", "depto",
+})
+
+# Maior "palavra" (com aspas e abreviaturas compostas) analisada antes de um ponto
+_MAX_ABBREVIATION_WINDOW = 32
+
+# Pontuação final (com aspas/parênteses de fecho opcionais), seguida de espaço e do
+# início provável de uma nova sentença: maiúscula, dígito, travessão ou aspas/parênteses.
+_BOUNDARY = re.compile(
+    r'(?P<end>[.!?…]+)["\'»”’)\]]*\s+(?=["\'«“‘(\[—–-]*[A-ZÀ-ÖØ-Þ0-9—–-])'
+)
+
+# Quebra de parágrafo: uma linha em branco (com espaços opcionais) entre dois blocos
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+_PARAGRAPH_SEPARATOR = "\n\n"
+
+
+def _is_abbreviation(text: str, end: int) -> bool:
+    """Indica se o ponto em text[end] fecha uma abreviatura ou uma inicial ("J. R.")."""
+    # Procura o início da palavra só numa janela curta antes do ponto: nenhuma
+    # abreviatura é tão longa, e assim o texto não é percorrido de novo a cada ponto.
+    window_start = max(0, end - _MAX_ABBREVIATION_WINDOW)
+    word_start = max(text.rfind(ws, window_start, end) for ws in ' \n\t') + 1
+    if word_start == 0 and window_start > 0:
+        return False
+    word = text[word_start:end].lstrip('"\'«“‘([—–-')
+    if not word:
+        return False
+    # Abreviaturas compostas, como "a.C.", "i.e." ou "E.U.A.": segmentos curtos de letras
+    # separados por pontos.
+    segments = word.split('.')
+    if len(segments) > 1 and all(0 < len(seg) <= 3 and seg.isalpha() for seg in segments):
+        return True
+    if segments[-1].lower() in PT_BR_ABBREVIATIONS:
+        return True
+    # Iniciais de nomes próprios ("J.", "M."): só uma letra maiúscula. Uma palavra de
+    # uma letra minúscula ("é", "o", "a") fecha sentenças com frequência.
+    last = segments[-1]
+    return len(last) == 1 and last.isalpha() and last.isupper()
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Divide o texto em sentenças com regras para o português do Brasil.
+
+    Uma sentença termina em '.', '!', '?' ou '…' seguido de espaço e de uma maiúscula,
+    dígito, travessão ou aspas. Um ponto que fecha uma abreviatura conhecida ou uma
+    inicial não é considerado fim de sentença.
+
+    Args:
+        text: Texto já normalizado (sem quebras de linha do PDF).
+
+    Returns:
+        As sentenças, sem espaços nas extremidades e pela ordem do texto.
+    """
+    sentences: List[str] = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.start('end')
+        if match.group('end') == '.' and _is_abbreviation(text, end):
+            continue
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """Parte uma sentença maior que o limite pelos espaços entre palavras."""
+    pieces: List[str] = []
+    current = ""
+    for word in sentence.split():
+        # Uma única "palavra" acima do limite só pode ser cortada à força.
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if not word:
+            continue
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def pack_sentences(text: str, max_chars: int) -> List[str]:
+    """
+    Agrupa sentenças inteiras em pedaços de até max_chars caracteres.
+
+    As sentenças nunca são cortadas, exceto quando uma só excede o limite; nesse caso
+    é partida entre palavras. Dentro de um parágrafo as sentenças são unidas por um
+    espaço; as quebras de parágrafo (linhas em branco) do texto são mantidas como
+    "\n\n", para que a síntese continue a fazer a pausa entre parágrafos.
+
+    Args:
+        text: Texto a dividir.
+        max_chars: Tamanho máximo de cada pedaço (por exemplo, o limite da API de TTS).
+
+    Returns:
+        Os pedaços, pela ordem do texto.
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars deve ser positivo.")
+
+    chunks: List[str] = []
+    current = ""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        separator = _PARAGRAPH_SEPARATOR
+        for sentence in split_sentences(paragraph):
+            parts = [sentence] if len(sentence) <= max_chars else _split_long_sentence(sentence, max_chars)
+            for part in parts:
+                if current and len(current) + len(separator) + len(part) > max_chars:
+                    chunks.append(current)
+                    current = part
+                else:
+                    current = f"{current}{separator}{part}" if current else part
+                separator = " "
+    if current:
+        chunks.append(current)
+    return chunks
@@ -1,10 +1,11 @@
 # app/services/text_extraction_service.py
 
 import logging
-import fitz  # PyMuPDF
+import threading
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Callable
+from typing import List, Dict, Any, Callable, Optional
 
+from app.services.extraction_cache import PDFSource
 from app.services.pdf_segmenter import PDFSegmenterService
 from app.services.s3_service import S3Service
 from app.services.text_preprocessor_service import TextPreprocessorService
@@ -16,6 +17,11 @@ from app.api.v1.schemas.document import SegmentationMode
 logger = logging.getLogger(__name__)
 
 
+def _raise_if_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise RuntimeError("Extração cancelada: o trabalho deixou de pertencer a este worker.")
+
+
 class TextExtractionService:
     """
     Serviço responsável pela extração de texto de PDFs.
@@ -26,10 +32,12 @@ class TextExtractionService:
         self,
         pdf_segmenter: PDFSegmenterService,
         preprocessor: TextPreprocessorService,
+        s3_service: Optional[S3Service] = None,
     ):
         # Injeção de Dependência: recebemos as instâncias em vez de criá-las.
         self.pdf_segmenter = pdf_segmenter
         self.preprocessor = preprocessor
+        self.s3_service = s3_service
 
         # Padrão Strategy: mapeia modo de segmentação à função correspondente.
         self._segmentation_strategies: Dict[SegmentationMode, Callable] = {
@@ -37,31 +45,28 @@ class TextExtractionService:
             SegmentationMode.CHAPTER: self._segment_by_chapter,
         }
 
-    def _segment_by_page(self, pdf_bytes: bytes) -> List[Dict[str, Any]]:
-        """Usa o PyMuPDF para dividir o texto por página."""
+    def _segment_by_page(self, pdf_source: PDFSource) -> List[Dict[str, Any]]:
+        """Usa o PyMuPDF (através do cache de extração) para dividir o texto por página."""
         logger.info("Segmentando por páginas...")
         units: List[Dict[str, Any]] = []
         try:
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            with doc as pdf_document:
-                for page_num, page in enumerate(pdf_document):
-                    raw_text = page.get_text("text")
-                    text = raw_text.strip() if raw_text else ""
-                    if text:
-                        units.append({
-                            "index": page_num + 1,
-                            "title": f"Página {page_num + 1}",
-                            "content": text,
-                        })
+            for page_num, raw_text in enumerate(self.pdf_segmenter.extract_page_texts(pdf_source)):
+                text = raw_text.strip() if raw_text else ""
+                if text:
+                    units.append({
+                        "index": page_num + 1,
+                        "title": f"Página {page_num + 1}",
+                        "content": text,
+                    })
         except Exception as e:
             logger.error(f"Falha ao extrair texto por página: {e}")
             raise
         return units
 
-    def _segment_by_chapter(self, pdf_bytes: bytes) -> List[Dict[str, Any]]:
+    def _segment_by_chapter(self, pdf_source: PDFSource) -> List[Dict[str, Any]]:
         """Usa o PDFSegmenterService para dividir o texto em capítulos."""
         logger.info("Segmentando por capítulos...")
-        result = self.pdf_segmenter.segment_pdf(pdf_bytes)
+        result = self.pdf_segmenter.segment_pdf(pdf_source)
         chapters = result.get("chapters", [])
         return [
             {
@@ -79,10 +84,16 @@ class TextExtractionService:
         pdf_file_key: str,
         document_id: int,
         segmentation_mode: SegmentationMode,
+        sentence_splitter: Optional[str] = None,
+        cancel_event: Optional[threading.Event] = None,
     ):
         """
         Orquestra o processo de extração e armazenamento de texto.
         Atualiza o status do documento em cada etapa.
+        O divisor de sentenças ("spacy" ou "rule") pode ser escolhido por pedido;
+        por omissão usa Settings.SENTENCE_SPLITTER.
+        Se cancel_event for ativado entretanto (o worker perdeu a reserva do trabalho),
+        a extração pára antes de gravar segmentos ou estados.
         """
         try:
             logger.info(
@@ -90,27 +101,29 @@ class TextExtractionService:
             )
             crud_document.update_document_status(db, document_id, ProcessingStatus.PROCESSING)
 
-            # Busca o PDF no S3
-            s3 = S3Service()
-            print(pdf_file_key)
-            pdf_bytes = s3.get_file(filename=pdf_file_key, db=db, document_id=document_id)
-
             # Seleciona a estratégia de segmentação
             segment_strategy = self._segmentation_strategies.get(segmentation_mode)
             if not segment_strategy:
                 raise ValueError(f"Modo de segmentação desconhecido: {segmentation_mode}")
 
-            text_units = segment_strategy(pdf_bytes)
+            # Busca o PDF no S3 (com o serviço partilhado, quando injetado) para um ficheiro
+            # temporário, aberto pelo caminho, em vez de o manter inteiro em memória.
+            s3 = self.s3_service or S3Service()
+            with s3.download_to_temp_file(pdf_file_key, db=db, document_id=document_id) as pdf_path:
+                text_units = segment_strategy(pdf_path)
+            _raise_if_cancelled(cancel_event)
 
             if not text_units:
                 logger.warning(f"Nenhum texto extraído para documento ID {document_id}.")
                 crud_document.update_document_status(db, document_id, ProcessingStatus.FAILED)
                 return
 
-            # Limpa o texto e prepara AudioSegmentCreate para cada unidade
+            # Limpa todos os textos num só lote e prepara AudioSegmentCreate para cada unidade
+            cleaned_texts = self.preprocessor.clean_texts_for_tts(
+                [unit["content"] for unit in text_units], sentence_splitter=sentence_splitter
+            )
             segments_to_create: List[AudioSegmentCreate] = []
-            for unit in text_units:
-                cleaned = self.preprocessor.clean_text_for_tts(unit["content"])
+            for unit, cleaned in zip(text_units, cleaned_texts):
                 segments_to_create.append(
                     AudioSegmentCreate(
                         segment_index=unit["index"],
@@ -118,6 +131,7 @@ class TextExtractionService:
                         text_content=cleaned,
                     )
                 )
+            _raise_if_cancelled(cancel_event)
             crud_audio_segment.delete_audio_segments_by_document(db, document_id)
             # Cria registros de segmentos de áudio em batch
             crud_audio_segment.bulk_create_audio_segments(
@@ -131,6 +145,9 @@ class TextExtractionService:
             logger.info(f"Extração de texto concluída para documento ID {document_id}.")
 
         except Exception as e:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.warning(f"Extração de texto para documento ID {document_id} interrompida: {e}")
+                return
             logger.error(
                 f"Erro na extração de texto para documento ID {document_id}: {e}",
                 exc_info=True
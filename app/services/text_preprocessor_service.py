@@ -1,10 +1,153 @@
+import logging
 import re
+import resource
+import threading
+import time
 import unicodedata
-from typing import List
-import spacy
+from typing import Any, Dict, Iterable, List, Optional
 
-# Carrega modelo de NLP para segmentação de sentenças (opcional)
-nlp = spacy.load('pt_core_news_sm')
+from app.core.config import settings
+from app.services.sentence_splitter import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Componentes do pipeline necessários para obter doc.sents em cada modo.
+# "parser" depende do tok2vec partilhado; "senter" tem o seu próprio tok2vec.
+SENTENCE_COMPONENTS = {
+    "parser": ("tok2vec", "parser"),
+    "senter": ("senter",),
+}
+
+# Divisores de sentenças disponíveis (ver Settings.SENTENCE_SPLITTER)
+SENTENCE_SPLITTERS = ("spacy", "rule")
+
+# Modelo de NLP para segmentação de sentenças, carregado apenas no primeiro uso
+_nlp = None
+_nlp_lock = threading.Lock()
+# Tempo de carregamento e memória residente do modelo (preenchido ao carregar)
+nlp_load_stats: Dict[str, Any] = {}
+
+
+def _current_rss_kb() -> int:
+    """
+    Memória residente atual do processo, em KiB, lida de /proc/self/statm. Sem /proc
+    (fora do Linux) devolve o pico (ru_maxrss), que é o melhor valor disponível.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * resource.getpagesize() // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _load_nlp():
+    """Carrega o modelo spaCy só com os componentes necessários para as sentenças."""
+    import spacy  # Importação tardia: o spaCy não deve pesar no import da aplicação.
+
+    component = settings.SPACY_SENTENCE_COMPONENT
+    if component not in SENTENCE_COMPONENTS:
+        raise ValueError(
+            f"SPACY_SENTENCE_COMPONENT inválido: '{component}'. Use um de {list(SENTENCE_COMPONENTS)}."
+        )
+    keep = SENTENCE_COMPONENTS[component]
+
+    # O pacote instalado é carregado pelo nome: a raiz do pacote (get_package_path)
+    # não tem config.cfg, que só existe no subdiretório versionado. O caminho do
+    # pacote serve apenas para ler o meta.json e saber que componentes excluir.
+    model_path = spacy.util.get_package_path(settings.SPACY_MODEL) \
+        if spacy.util.is_package(settings.SPACY_MODEL) else settings.SPACY_MODEL
+    meta = spacy.util.get_model_meta(model_path)
+    all_components = meta.get("components") or meta.get("pipeline", [])
+    exclude = [name for name in all_components if name not in keep]
+
+    rss_before_kb = _current_rss_kb()
+    started = time.perf_counter()
+    nlp = spacy.load(settings.SPACY_MODEL, exclude=exclude)
+    for name in keep:
+        # O senter vem desativado por omissão nos modelos treinados.
+        if name in nlp.disabled:
+            nlp.enable_pipe(name)
+    elapsed = time.perf_counter() - started
+    rss_after_kb = _current_rss_kb()
+
+    nlp_load_stats.update({
+        "model": settings.SPACY_MODEL,
+        "components": list(nlp.pipe_names),
+        "load_seconds": round(elapsed, 3),
+        "excluded": exclude,
+        # Memória residente atual do processo antes e depois do carregamento
+        "rss_before_mb": round(rss_before_kb / 1024, 1),
+        "rss_after_mb": round(rss_after_kb / 1024, 1),
+        "rss_increase_mb": round((rss_after_kb - rss_before_kb) / 1024, 1),
+        # Pico de memória residente do processo (ru_maxrss), não a memória atual
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+    logger.info(f"Modelo spaCy carregado: {nlp_load_stats}")
+    return nlp
+
+
+def get_nlp():
+    """Devolve o modelo spaCy, carregando-o (uma única vez) no primeiro uso."""
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                _nlp = _load_nlp()
+    return _nlp
+
+
+def warm_up_nlp() -> Dict[str, Any]:
+    """
+    Gancho de aquecimento: força o carregamento do modelo (por exemplo, no arranque
+    da aplicação quando SPACY_EAGER_LOAD está ativo) e devolve as estatísticas.
+    """
+    get_nlp()
+    return dict(nlp_load_stats)
+
+# --- Padrões pré-compilados da limpeza, pela ordem em que são aplicados ---
+# Linhas compostas apenas por números (páginas)
+_PAGE_NUMBER_LINE = re.compile(r'(?m)^\s*\d+\s*$')
+# Marcas como "Página 10", "page 10" (case-insensitive)
+_PAGE_MARKER = re.compile(r'(?i)(^|\s)(página|page)\s+\d+(\s|$)')
+_PAGE_WORD = re.compile(r'(?i)página|page')
+# Textos fixos de rodapé/cabeçalho. Ficam em passagens separadas: remover um deles
+# pode juntar texto que forma uma ocorrência do seguinte.
+_FOOTER_PATTERNS = [
+    re.compile(r'(?i)copyright.*'),
+    re.compile(r'(?i)versão\s*\d+(\.\d+)?'),
+    re.compile(r'(?i)todos os direitos reservados'),
+]
+# Referências entre colchetes [1], [23]
+_BRACKET_REFERENCE = re.compile(r'\[\d+\]')
+# Marcadores numerados no início de parágrafo "1. Texto"
+_NUMBERED_MARKER = re.compile(r'(?m)^\s*\d+\.\s+')
+# Palavras hifenizadas no fim da linha
+_HYPHENATED_BREAK = re.compile(r'(?<!\w-)(\w+)-\s*\n\s*(\w+)')
+_HYPHEN_BEFORE_BREAK = re.compile(r'-\s*\n')
+# URLs http(s):// e www.
+_URL = re.compile(r'https?://\S+|www\.\S+')
+# Endereços de e-mail
+_EMAIL = re.compile(r'\S+@\S+')
+_NON_ASCII = re.compile(r'[^\x00-\x7F]+')
+_NON_SPACE = re.compile(r'\S')
+# Passagem fundida de normalização da pontuação:
+#   dup: pontuação duplicada como ",." ou ".." (mantém a primeira)
+#   dot: ponto final sem espaço a seguir (acrescenta o espaço)
+_PUNCTUATION = re.compile(r'(?P<dup>[,\.])\s*[,\.]+|(?P<dot>\.)(?=\S)')
+# Qualquer sequência de espaços/quebras de linha
+_WHITESPACE_RUN = re.compile(r'\s+')
+
+
+def _normalize_punctuation(match: re.Match) -> str:
+    """Callback da passagem fundida; reproduz as antigas substituições sequenciais."""
+    dup = match.group('dup')
+    if dup is not None:
+        # Depois de removida a duplicação, um ponto seguido de texto ganha o espaço em falta.
+        if dup == '.' and _NON_SPACE.match(match.string, match.end()):
+            return '. '
+        return dup
+    return '. '
 
 
 class TextPreprocessorService:
@@ -14,91 +157,153 @@ class TextPreprocessorService:
     para uma narração mais natural.
     """
 
-    def clean_text_for_tts(self, text: str) -> str:
+    # Estatísticas da última limpeza em lote (ver clean_texts_for_tts)
+    last_batch_stats: Dict[str, Any] = {}
+
+    def clean_text_for_tts(self, text: str, sentence_splitter: Optional[str] = None) -> str:
         """
         Orquestra a limpeza completa do texto.
 
         Args:
             text: O texto bruto extraído de um capítulo.
+            sentence_splitter: "spacy" ou "rule" (por omissão, SENTENCE_SPLITTER).
 
         Returns:
             O texto limpo e pronto para ser enviado para a ElevenLabs.
         """
+        text = self._clean_before_sentences(text)
+        # Opcional: reconstrução de sentenças para coerência
+        text = self._reconstruct_sentences(text, sentence_splitter)
+        return text.strip()
+
+    def clean_texts_for_tts(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        n_process: Optional[int] = None,
+        sentence_splitter: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Limpa uma lista de textos de uma só vez, com o mesmo resultado que chamar
+        clean_text_for_tts para cada um.
+
+        Com o divisor "spacy", a reconstrução de sentenças passa todos os textos pelo
+        nlp.pipe em lotes, em vez de invocar o modelo uma vez por texto; com "rule", o
+        modelo não é usado. A ordem dos resultados é a da entrada.
+        O débito (caracteres/s) fica registado em last_batch_stats.
+
+        Args:
+            texts: Textos brutos (páginas ou capítulos).
+            batch_size: Textos por lote do nlp.pipe (por omissão, SPACY_BATCH_SIZE).
+            n_process: Processos usados pelo spaCy (por omissão, SPACY_N_PROCESS).
+            sentence_splitter: "spacy" ou "rule" (por omissão, SENTENCE_SPLITTER).
+
+        Returns:
+            Os textos limpos, pela mesma ordem.
+        """
+        batch_size = batch_size or settings.SPACY_BATCH_SIZE
+        n_process = n_process or settings.SPACY_N_PROCESS
+        splitter = self._resolve_splitter(sentence_splitter)
+        if not texts:
+            return []
+
+        started = time.perf_counter()
+        total_chars = sum(len(text) for text in texts)
+        pre_cleaned = [self._clean_before_sentences(text) for text in texts]
+        if splitter == "rule":
+            cleaned = [self._join_sentences(split_sentences(text)).strip() for text in pre_cleaned]
+        else:
+            docs = get_nlp().pipe(pre_cleaned, batch_size=batch_size, n_process=n_process)
+            cleaned = [self._join_sentences(sent.text for sent in doc.sents).strip() for doc in docs]
+        elapsed = time.perf_counter() - started
+
+        self.last_batch_stats = {
+            "sentence_splitter": splitter,
+            "units": len(texts),
+            "characters": total_chars,
+            "seconds": round(elapsed, 3),
+            "chars_per_second": round(total_chars / elapsed, 1) if elapsed > 0 else None,
+            "batch_size": batch_size,
+            "n_process": n_process,
+        }
+        logger.info(f"Limpeza em lote concluída: {self.last_batch_stats}")
+        return cleaned
+
+    def _clean_before_sentences(self, text: str) -> str:
+        """Etapas de limpeza por expressões regulares, anteriores à reconstrução de sentenças."""
         text = self._remove_headers_footers(text)
         text = self._remove_references_and_footnotes(text)
         text = self._dehyphenate_and_join(text)
         text = self._remove_urls_emails(text)
         # text = self._normalize_unicode(text)
-        text = self._normalize_whitespace_and_punctuation(text)
-        # Opcional: reconstrução de sentenças para coerência
-        text = self._reconstruct_sentences(text)
-        return text.strip()
+        return self._normalize_whitespace_and_punctuation(text)
 
     def _remove_headers_footers(self, text: str) -> str:
         """Remove cabeçalhos, rodapés e números de página."""
-        # Remove linhas compostas apenas por números (páginas)
-        text = re.sub(r'(?m)^\s*\d+\s*$', '', text)
-        # Remove marcas como "Página 10", "page 10" (case-insensitive)
-        text = re.sub(r'(?i)(^|\s)(página|page)\s+\d+(\s|$)', ' ', text)
-        # Remove textos fixos de rodapé/head
-        patterns = [
-            r'(?i)copyright.*',
-            r'(?i)versão\s*\d+(\.\d+)?',
-            r'(?i)todos os direitos reservados'
-        ]
-        for pat in patterns:
-            text = re.sub(pat, '', text)
+        text = _PAGE_NUMBER_LINE.sub('', text)
+        # Os pré-filtros abaixo são mais baratos que o padrão completo e só descartam
+        # textos onde este nunca poderia encontrar uma ocorrência.
+        if _PAGE_WORD.search(text):
+            text = _PAGE_MARKER.sub(' ', text)
+        for pattern in _FOOTER_PATTERNS:
+            text = pattern.sub('', text)
         return text
 
     def _remove_references_and_footnotes(self, text: str) -> str:
         """Remove referências numéricas e marcadores de notas de rodapé."""
-        # Remove referências entre colchetes [1], [23]
-        text = re.sub(r'\[\d+\]', '', text)
-        # Remove marcadores numerados no início de parágrafo "1. Texto"
-        text = re.sub(r'(?m)^\s*\d+\.\s+', '', text)
-        return text
+        text = _BRACKET_REFERENCE.sub('', text)
+        return _NUMBERED_MARKER.sub('', text)
 
     def _dehyphenate_and_join(self, text: str) -> str:
         """
-        Junta palavras hifenizadas no fim da linha e normaliza quebras de linha.
+        Junta palavras hifenizadas no fim da linha.
+        As restantes quebras de linha são tratadas como espaço na passagem final de
+        normalização, que reduz qualquer sequência de espaços a um único espaço.
         """
-        # Junta palavras hifenizadas no fim da linha
-        text = re.sub(r'(?<!\w-)(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
-        # Une quebras de linha que não indicam parágrafo
-        text = re.sub(r'(?<!\n)\n(?!\n)', ' ', text)
-        # Mantém duplas quebras para delimitar parágrafo
-        text = re.sub(r'\n{2,}', '\n\n', text)
-        return text
+        if not _HYPHEN_BEFORE_BREAK.search(text):
+            return text
+        return _HYPHENATED_BREAK.sub(r'\1\2', text)
 
     def _remove_urls_emails(self, text: str) -> str:
         """Remove URLs e endereços de e-mail."""
-        # URLs http(s):// e www.
-        text = re.sub(r'https?://\S+|www\.\S+', '', text)
-        # Endereços de e-mail
-        text = re.sub(r'\S+@\S+', '', text)
-        return text
+        text = _URL.sub('', text)
+        if '@' not in text:
+            return text
+        return _EMAIL.sub('', text)
 
     def _normalize_unicode(self, text: str) -> str:
         """Normaliza caracteres Unicode e remove não-ASCII."""
         text = unicodedata.normalize('NFKC', text)
-        return re.sub(r'[^\x00-\x7F]+', ' ', text)
+        return _NON_ASCII.sub(' ', text)
 
     def _normalize_whitespace_and_punctuation(self, text: str) -> str:
         """
         Normaliza espaços e pontuação para fluidez de leitura.
-        Remove pontuação duplicada e garante espaço após ponto final.
+        Remove pontuação duplicada e garante espaço após ponto final numa só passagem
+        e, depois, reduz múltiplos espaços (incluindo quebras de linha) a um único.
         """
-        # Pontuação duplicada como ",." ou ".."
-        text = re.sub(r'([,\.])\s*[,\.]+', r'\1', text)
-        # Espaço faltante após ponto final
-        text = re.sub(r'(?<=[\.])(?=[^\s])', ' ', text)
-        # Reduz múltiplos espaços a um único
-        return re.sub(r'\s+', ' ', text).strip()
-
-    def _reconstruct_sentences(self, text: str) -> str:
+        text = _PUNCTUATION.sub(_normalize_punctuation, text)
+        return _WHITESPACE_RUN.sub(' ', text).strip()
+
+    def _resolve_splitter(self, sentence_splitter: Optional[str]) -> str:
+        """Valida o divisor pedido, recorrendo a SENTENCE_SPLITTER quando não é indicado."""
+        splitter = sentence_splitter or settings.SENTENCE_SPLITTER
+        if splitter not in SENTENCE_SPLITTERS:
+            raise ValueError(
+                f"Divisor de sentenças inválido: '{splitter}'. Use um de {list(SENTENCE_SPLITTERS)}."
+            )
+        return splitter
+
+    def _reconstruct_sentences(self, text: str, sentence_splitter: Optional[str] = None) -> str:
         """
-        Reconstrói sentenças usando spaCy para coerência textual.
+        Reconstrói sentenças para coerência textual, com o spaCy ou com o divisor
+        baseado em regras (app.services.sentence_splitter).
         (Etapa opcional; habilitar se desejado.)
         """
-        doc = nlp(text)
-        return ' '.join(sent.text.strip() for sent in doc.sents)
+        if self._resolve_splitter(sentence_splitter) == "rule":
+            return self._join_sentences(split_sentences(text))
+        return self._join_sentences(sent.text for sent in get_nlp()(text).sents)
+
+    def _join_sentences(self, sentences: Iterable[str]) -> str:
+        """Junta as sentenças, separadas por um espaço."""
+        return ' '.join(sentence.strip() for sentence in sentences)
@@ -0,0 +1,170 @@
+# app/teste/fake_s3.py
+"""
+Cliente S3 em memória para os scripts de teste do S3Service (teste_s3_upload,
+teste_s3_download), sem rede nem credenciais.
+
+Implementa as chamadas que o S3Service usa — put_object, get_object (com Range e
+IfMatch), head_object e o ciclo multipart — com as regras do S3 que importam aqui:
+partes de pelo menos 5 MiB exceto a última, ETag por conteúdo, 412 quando o
+If-Match não corresponde. Cada chamada pode demorar `latency` segundos e cada
+corpo lido pode ficar limitado a `bandwidth` bytes/s por stream (como uma ligação
+TCP); o cliente regista as chamadas feitas e os pedidos em simultâneo.
+"""
+import hashlib
+import io
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from app.services.s3_service import MIN_PART_SIZE, S3Service
+
+
+def client_error(code: str, operation: str, status: int) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+
+class FakeBody:
+    """Corpo de uma resposta get_object (como o StreamingBody do botocore)."""
+
+    def __init__(self, data: bytes, bandwidth: Optional[float] = None):
+        self._stream = io.BytesIO(data)
+        self._bandwidth = bandwidth
+
+    def read(self, size: int = -1) -> bytes:
+        return self._throttle(self._stream.read(size))
+
+    def iter_chunks(self, chunk_size: int = 1024):
+        while block := self.read(chunk_size):
+            yield block
+
+    def _throttle(self, block: bytes) -> bytes:
+        if self._bandwidth:
+            time.sleep(len(block) / self._bandwidth)
+        return block
+
+
+class FakeS3Client:
+    def __init__(self, latency: float = 0.0, bandwidth: Optional[float] = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.objects: Dict[str, bytes] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+        self.part_sizes: Dict[str, List[int]] = {}  # chave -> tamanhos das partes do último multipart
+        self.calls: Counter = Counter()
+        self.ranges: List[Optional[str]] = []
+        self.active = 0
+        self.peak = 0
+        self.fail_on: Dict[str, int] = {}  # operação -> número da chamada que falha
+        self._lock = threading.Lock()
+        self._next_upload = 0
+        self._etags: Dict[str, tuple] = {}
+
+    def _call(self, operation: str) -> None:
+        with self._lock:
+            self.calls[operation] += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            failing = self.fail_on.get(operation) == self.calls[operation]
+        try:
+            time.sleep(self.latency)
+            if failing:
+                raise client_error("InternalError", operation, 500)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    @staticmethod
+    def etag(data: bytes) -> str:
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def object_etag(self, key: str) -> str:
+        """ETag do objeto atual, calculado uma vez por versão (objects pode ser alterado diretamente)."""
+        data = self.objects[key]
+        with self._lock:
+            cached = self._etags.get(key)
+            if cached is not None and cached[0] is data:
+                return cached[1]
+        etag = self.etag(data)
+        with self._lock:
+            self._etags[key] = (data, etag)
+        return etag
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        self._call("put_object")
+        self.objects[Key] = bytes(Body)
+        return {"ETag": self.etag(Body)}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        self._call("head_object")
+        if Key not in self.objects:
+            raise client_error("404", "HeadObject", 404)
+        return {"ContentLength": len(self.objects[Key]), "ETag": self.object_etag(Key)}
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None, IfMatch: str = None) -> dict:
+        self._call("get_object")
+        with self._lock:
+            self.ranges.append(Range)
+        if Key not in self.objects:
+            raise client_error("NoSuchKey", "GetObject", 404)
+        data = self.objects[Key]
+        if IfMatch is not None and IfMatch != self.object_etag(Key):
+            raise client_error("PreconditionFailed", "GetObject", 412)
+        if Range is not None:
+            start, end = (int(value) for value in Range.removeprefix("bytes=").split("-"))
+            data = data[start:end + 1]
+        return {"Body": FakeBody(data, self.bandwidth), "ContentLength": len(data)}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs) -> dict:
+        self._call("create_multipart_upload")
+        with self._lock:
+            self._next_upload += 1
+            upload_id = f"upload-{self._next_upload}"
+            self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes) -> dict:
+        self._call("upload_part")
+        if UploadId not in self.uploads:
+            raise client_error("NoSuchUpload", "UploadPart", 404)
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": self.etag(Body)}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict) -> dict:
+        self._call("complete_multipart_upload")
+        stored = self.uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        if numbers != sorted(numbers) or set(numbers) != set(stored):
+            raise client_error("InvalidPartOrder", "CompleteMultipartUpload", 400)
+        parts = [stored[number] for number in numbers]
+        if any(len(part) < MIN_PART_SIZE for part in parts[:-1]):
+            raise client_error("EntityTooSmall", "CompleteMultipartUpload", 400)
+        self.objects[Key] = b"".join(parts)
+        self.part_sizes[Key] = [len(part) for part in parts]
+        return {"ETag": self.etag(self.objects[Key])}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> dict:
+        self._call("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+def make_s3_service(client: FakeS3Client) -> S3Service:
+    """
+    S3Service com as configurações atuais (partes, concorrência, limiares) e o cliente
+    falso no lugar do boto3. Credenciais fictícias preenchem as que faltarem.
+    """
+    settings.ACCESS_KEY_ID = settings.ACCESS_KEY_ID or "teste"
+    settings.SECRET_ACCESS_KEY = settings.SECRET_ACCESS_KEY or "teste"
+    settings.S3_BUCKET_NAME = settings.S3_BUCKET_NAME or "livros-teste"
+    settings.S3_ENDPOINT_URL = settings.S3_ENDPOINT_URL or "http://s3.teste.invalid"
+    service = S3Service()
+    service.s3_client.close()
+    service.s3_client = client
+    return service
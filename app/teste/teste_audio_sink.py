@@ -0,0 +1,116 @@
+# app/teste/teste_audio_sink.py
+"""
+Mede, com tracemalloc, a memória usada por ElevenLabsService.generate_audio_to_sink
+ao sintetizar textos cada vez maiores.
+
+A API da ElevenLabs é substituída por um cliente falso que devolve AUDIO_KB de
+áudio por pedaço de texto, em blocos, como o SDK. Com o AudioSink, o pico de
+memória deve ficar limitado pelo spool (AUDIO_SINK_SPOOL_BYTES) mais a janela de
+pedaços em curso (lookahead_chunks), qualquer que seja o tamanho do capítulo; com
+generate_audio (bytes concatenados), para comparação, cresce com o áudio gerado.
+
+Uso:
+    python -m app.teste.teste_audio_sink [--chunks 50 400] [--audio-kb 400] [--spool-mb 8] [--bytes]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+# O serviço exige uma chave; os pedidos nunca chegam à API.
+os.environ.setdefault("ELEVENLABS_API_KEY", "teste-audio-sink")
+
+from app.core.config import settings
+from app.services.audio_cache import AudioCache
+from app.services.elevenlabs_service import ElevenLabsService
+
+MB = 1024 * 1024
+SDK_BLOCK_BYTES = 64 * 1024
+
+
+class FakeTextToSpeech:
+    """Substitui client.text_to_speech: cada pedido devolve audio_bytes em blocos."""
+
+    def __init__(self, audio_bytes: int):
+        self.audio_bytes = audio_bytes
+
+    def convert(self, **kwargs):
+        remaining = self.audio_bytes
+        while remaining > 0:
+            size = min(SDK_BLOCK_BYTES, remaining)
+            yield b"\x00" * size
+            remaining -= size
+
+
+class FakeClient:
+    def __init__(self, audio_bytes: int):
+        self.text_to_speech = FakeTextToSpeech(audio_bytes)
+
+
+def make_text(chunks: int, chunk_chars: int) -> str:
+    """Texto que o pack_sentences divide em `chunks` pedaços."""
+    sentence = "Esta é uma frase de teste para a síntese de voz. "
+    per_chunk = max(1, chunk_chars // len(sentence))
+    return sentence * (per_chunk * chunks)
+
+
+def measure(service: ElevenLabsService, text: str, to_sink: bool) -> tuple:
+    """Devolve (bytes de áudio gerados, pico de memória em bytes)."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        if to_sink:
+            with service.generate_audio_to_sink(text) as sink:
+                size = sink.size
+        else:
+            size = len(service.generate_audio(text))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória do AudioSink durante a síntese de textos longos.")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[50, 400], help="Número de pedaços de texto por medição.")
+    parser.add_argument("--audio-kb", type=int, default=400, help="Áudio devolvido por pedaço, em KiB.")
+    parser.add_argument("--spool-mb", type=int, default=8, help="AUDIO_SINK_SPOOL_BYTES, em MiB.")
+    parser.add_argument("--bytes", action="store_true", help="Mede também generate_audio (bytes concatenados).")
+    args = parser.parse_args()
+
+    settings.AUDIO_SINK_SPOOL_BYTES = args.spool_mb * MB
+    audio_bytes = args.audio_kb * 1024
+    service = ElevenLabsService(cache=AudioCache(enabled=False))
+    service.client = FakeClient(audio_bytes)
+
+    # Spool em memória + pedaços em curso ou prontos + o pedaço a ser escrito, com folga
+    bound = settings.AUDIO_SINK_SPOOL_BYTES + (service.lookahead_chunks + 2) * audio_bytes + 2 * MB
+
+    print("🚀 Memória do AudioSink durante a síntese")
+    print("=" * 60)
+    print(f"   Spool: {args.spool_mb} MiB, {args.audio_kb} KiB por pedaço, "
+          f"{service.lookahead_chunks} pedaços em curso no máximo")
+    print(f"   Limite esperado para o pico: {bound / MB:.1f} MiB")
+
+    ok = True
+    for chunks in args.chunks:
+        text = make_text(chunks, service.max_chunk_chars)
+        size, peak = measure(service, text, to_sink=True)
+        within = peak <= bound
+        ok = ok and within
+        print(f"\n{'✅' if within else '❌'} AudioSink, {chunks} pedaços: "
+              f"{size / MB:.1f} MiB de áudio, pico de {peak / MB:.1f} MiB")
+        if args.bytes:
+            size, peak = measure(service, text, to_sink=False)
+            print(f"   generate_audio (bytes), {chunks} pedaços: "
+                  f"{size / MB:.1f} MiB de áudio, pico de {peak / MB:.1f} MiB")
+
+    service._executor.shutdown(wait=True)
+    if not ok:
+        print("\n❌ O pico de memória do AudioSink excedeu o limite esperado.")
+        sys.exit(1)
+    print("\n✅ A memória do AudioSink ficou limitada em todas as medições.")
+
+
+if __name__ == "__main__":
+    main()
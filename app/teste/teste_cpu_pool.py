@@ -0,0 +1,108 @@
+# app/teste/teste_cpu_pool.py
+"""
+Verifica que o CPUPool só liberta o lugar de um trabalho quando o processo termina.
+
+Cenário (1 processo, fila de 1):
+1. Um trabalho lento começa a correr e o pedido que o aguardava é cancelado (como
+   quando o cliente se desliga): in_flight tem de continuar a 1 até o processo
+   terminar, e o limite de admissão (503) tem de continuar a valer.
+2. Um trabalho à espera é cancelado. O ProcessPoolExecutor entrega de imediato aos
+   processos um trabalho além dos que estão a correr, pelo que este já não pode ser
+   retirado: vai correr, e o lugar continua ocupado até terminar.
+3. Depois de os trabalhos terminarem, in_flight volta a 0.
+4. Com --pdf (um livro com vários capítulos): write_chapters, o trabalho de
+   /segment/stream, pára quando o evento de cancelamento é ativado depois do
+   primeiro capítulo (como quando o cliente se desliga) e liberta o lugar.
+
+Uso:
+    python -m app.teste.teste_cpu_pool [--seconds S] [--pdf PDF]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from app.core import cpu_pool
+from app.core.cpu_pool import CPUPool, CPUPoolSaturated
+
+
+def slow_job(seconds: float, marker: str) -> str:
+    """Trabalho de teste: espera e deixa um ficheiro a provar que chegou ao fim."""
+    time.sleep(seconds)
+    with open(marker, "w") as f:
+        f.write("fim")
+    return marker
+
+
+async def _scenario(seconds: float, pdf_path: Optional[str]) -> bool:
+    pool = CPUPool(max_workers=1, queue_size=1)
+    marker = os.path.join(tempfile.mkdtemp(prefix="teste-cpu-pool-"), "slow.done")
+    ok = True
+
+    def check(label: str, condition: bool) -> None:
+        nonlocal ok
+        ok = ok and condition
+        print(f"{'✅' if condition else '❌'} {label} (stats: {pool.stats()})")
+
+    try:
+        # Arranque dos processos (spawn) fora da medição
+        await pool.run(time.sleep, 0)
+
+        running = asyncio.ensure_future(pool.run(slow_job, seconds, marker))
+        await asyncio.sleep(min(1.0, seconds / 3))
+        running.cancel()
+        await asyncio.sleep(0.1)
+        check("Pedido cancelado, processo ainda a correr: lugar ocupado", pool.stats()["in_flight"] == 1)
+
+        queued = pool.submit(time.sleep, seconds)
+        check("Trabalho em fila aceite até à capacidade", pool.stats()["in_flight"] == 2)
+        try:
+            pool.submit(time.sleep, 0)
+            check("Pool cheio recusa novos trabalhos (503)", False)
+        except CPUPoolSaturated:
+            check("Pool cheio recusa novos trabalhos (503)", True)
+
+        queued.cancel()
+        await asyncio.sleep(0.1)
+        check("Trabalho à espera já entregue ao processo continua a ocupar o lugar", pool.stats()["in_flight"] == 2)
+
+        deadline = time.monotonic() + 2 * seconds + 10
+        while pool.stats()["in_flight"] and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        check("Lugar libertado só quando o processo terminou", os.path.exists(marker) and pool.stats()["in_flight"] == 0)
+
+        if pdf_path:
+            loop = asyncio.get_running_loop()
+            manager = pool.manager()
+            chapters, cancelled = manager.Queue(1), manager.Event()
+            stream = pool.submit(cpu_pool.write_chapters, pdf_path, chapters, cancelled)
+            first = await loop.run_in_executor(None, chapters.get)
+            cancelled.set()
+            result = await asyncio.wait_for(stream, timeout=30)
+            print(f"   Primeiro capítulo: {first['title']!r}; resultado: {result}")
+            check("Stream cancelado: write_chapters pára antes do fim do livro",
+                  result["cancelled"] and result["chapters"] <= 2 and pool.stats()["in_flight"] == 0)
+    finally:
+        pool.shutdown()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Libertação dos lugares do CPUPool em pedidos cancelados.")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duração do trabalho lento.")
+    parser.add_argument("--pdf", help="Livro com vários capítulos para o cenário de cancelamento do stream.")
+    args = parser.parse_args()
+
+    print("🚀 Lugares do CPUPool com pedidos cancelados")
+    print("=" * 60)
+    if not asyncio.run(_scenario(args.seconds, args.pdf)):
+        print("\n❌ O CPUPool libertou lugares antes de os processos terminarem.")
+        sys.exit(1)
+    print("\n✅ Verificação concluída!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# app/teste/teste_elevenlabs_pool.py
+"""
+Benchmark do pool de ligações do ElevenLabsService contra um servidor local que
+imita a API de Text-to-Speech da ElevenLabs (sem rede nem chave verdadeira).
+
+O servidor (HTTP/1.1 com keep-alive) conta as ligações que aceita, simula o custo
+de as estabelecer (--handshake-ms, o equivalente ao TLS) e a latência da síntese
+(--latency-ms), e devolve --audio-kb de áudio por pedido. São medidos, para o
+mesmo número de pedidos e a mesma concorrência:
+
+1. Cliente novo por pedido: um ElevenLabs(...) por pedaço, como fazia o
+   AudioGenerationService (referência, sem reutilização de ligações);
+2. generate_audio: o cliente síncrono do serviço, sobre o pool do processo;
+3. agenerate_audio: o cliente assíncrono do serviço, sobre o pool do processo.
+
+Para cada um: pedidos/s, ligações abertas e pedidos por ligação. Com o pool, as
+ligações abertas não podem passar de ELEVENLABS_MAX_CONNECTIONS.
+
+Uso:
+    python -m app.teste.teste_elevenlabs_pool [--requests N] [--handshake-ms MS] [--latency-ms MS] [--audio-kb KB]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# O serviço exige uma chave; os pedidos só chegam ao servidor local.
+os.environ.setdefault("ELEVENLABS_API_KEY", "teste-elevenlabs-pool")
+
+import httpx
+from elevenlabs.client import ElevenLabs
+
+from app.core.config import settings
+from app.services import elevenlabs_service
+from app.services.audio_cache import AudioCache
+from app.services.elevenlabs_service import MODEL_ID, OUTPUT_FORMAT, VOICE_SETTINGS, ElevenLabsService
+
+
+class StubTTSServer(ThreadingHTTPServer):
+    """Servidor que imita POST /v1/text-to-speech/{voice_id} e conta ligações e pedidos."""
+
+    daemon_threads = True
+
+    def __init__(self, handshake_seconds: float, latency_seconds: float, audio_bytes: int):
+        self.handshake_seconds = handshake_seconds
+        self.latency_seconds = latency_seconds
+        self.audio = b"\xff" * audio_bytes
+        self.counter_lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        super().__init__(("127.0.0.1", 0), StubTTSHandler)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self) -> None:
+        with self.counter_lock:
+            self.connections = self.requests = 0
+
+
+class StubTTSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.counter_lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake_seconds)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.counter_lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency_seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(self.server.audio)))
+        self.end_headers()
+        self.wfile.write(self.server.audio)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_text(chunks: int, chunk_chars: int) -> str:
+    """Texto que o pack_sentences divide em `chunks` pedaços."""
+    sentence = "Esta é uma frase de teste para a síntese de voz. "
+    per_chunk = max(1, chunk_chars // len(sentence))
+    return sentence * (per_chunk * chunks)
+
+
+def new_client_per_request(server: StubTTSServer, requests: int, concurrency: int) -> None:
+    """Referência: um cliente (e um pool de ligações) novo para cada pedaço."""
+    def synthesize(index: int) -> bytes:
+        with httpx.Client(timeout=settings.ELEVENLABS_TIMEOUT_SECONDS) as http_client:
+            client = ElevenLabs(api_key=settings.ELEVENLABS_API_KEY, base_url=server.base_url, httpx_client=http_client)
+            return b"".join(client.text_to_speech.convert(
+                voice_id=settings.ELEVENLABS_VOICE_ID, text=f"Pedaço {index}.", model_id=MODEL_ID,
+                output_format=OUTPUT_FORMAT, voice_settings=VOICE_SETTINGS,
+            ))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(synthesize, range(requests)))
+
+
+async def agenerate_and_close(service: ElevenLabsService, text: str) -> None:
+    """agenerate_audio e, no mesmo event loop, o fecho dos pools de ligações."""
+    try:
+        await service.agenerate_audio(text)
+    finally:
+        await elevenlabs_service.close_http_clients()
+
+
+def measure(server: StubTTSServer, label: str, run) -> dict:
+    server.reset()
+    started = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - started
+    result = {
+        "requests": server.requests,
+        "connections": server.connections,
+        "rps": server.requests / seconds,
+        "seconds": seconds,
+    }
+    print(f"\n⏱️ {label}: {result['requests']} pedidos em {seconds:.2f}s ({result['rps']:.1f} pedidos/s)")
+    print(f"   🔌 {result['connections']} ligações abertas "
+          f"({result['requests'] / max(1, result['connections']):.1f} pedidos por ligação)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pedidos/s e reutilização de ligações do ElevenLabsService.")
+    parser.add_argument("--requests", type=int, default=120, help="Pedaços (pedidos à API) por medição.")
+    parser.add_argument("--handshake-ms", type=float, default=30.0, help="Custo simulado de abrir uma ligação.")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latência simulada de cada síntese.")
+    parser.add_argument("--audio-kb", type=int, default=64, help="Áudio devolvido por pedido, em KiB.")
+    args = parser.parse_args()
+
+    server = StubTTSServer(args.handshake_ms / 1e3, args.latency_ms / 1e3, args.audio_kb * 1024)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.ELEVENLABS_BASE_URL = server.base_url
+
+    service = ElevenLabsService(cache=AudioCache(enabled=False))
+    text = make_text(args.requests, service.max_chunk_chars)
+
+    print("🚀 Pool de ligações do ElevenLabsService (servidor local)")
+    print("=" * 60)
+    print(f"   {args.requests} pedidos, {service.max_concurrency} em simultâneo; ligação: {args.handshake_ms:.0f} ms, "
+          f"síntese: {args.latency_ms:.0f} ms, {args.audio_kb} KiB por pedido")
+    print(f"   Pool: até {settings.ELEVENLABS_MAX_CONNECTIONS} ligações, "
+          f"{settings.ELEVENLABS_MAX_KEEPALIVE_CONNECTIONS} mantidas abertas")
+
+    ok = True
+    try:
+        baseline = measure(server, "Cliente novo por pedido",
+                           lambda: new_client_per_request(server, args.requests, service.max_concurrency))
+        sync = measure(server, "generate_audio (pool síncrono)", lambda: service.generate_audio(text))
+        async_ = measure(server, "agenerate_audio (pool assíncrono)", lambda: asyncio.run(agenerate_and_close(service, text)))
+
+        print()
+        for label, result in (("generate_audio", sync), ("agenerate_audio", async_)):
+            reused = (result["requests"] == args.requests
+                      and result["connections"] <= min(settings.ELEVENLABS_MAX_CONNECTIONS, service.max_concurrency))
+            ok = ok and reused
+            print(f"{'✅' if reused else '❌'} {label}: ligações reutilizadas "
+                  f"({result['connections']} para {result['requests']} pedidos), "
+                  f"{result['rps'] / baseline['rps']:.1f}x os pedidos/s da referência")
+    finally:
+        service.close()
+        server.shutdown()
+
+    if not ok:
+        print("\n❌ O pool não reutilizou as ligações como esperado.")
+        sys.exit(1)
+    print("\n✅ Benchmark concluído!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# app/teste/teste_elevenlabs_service.py
+"""
+Verifica a síntese em paralelo do ElevenLabsService (iter_audio / generate_audio e
+a variante assíncrona) com um cliente falso no lugar da API da ElevenLabs.
+
+O cliente falso demora um tempo aleatório por pedaço (os pedaços terminam fora de
+ordem), devolve um áudio que identifica o texto pedido e regista quantos pedidos
+estão em curso. Verifica-se que:
+
+1. o áudio sai pela ordem do texto (igual à síntese pedaço a pedaço);
+2. nunca há mais de max_concurrency pedidos em simultâneo;
+3. com um consumidor lento, os pedidos iniciados nunca se adiantam mais de
+   lookahead_chunks pedaços ao que já foi entregue;
+4. quando um pedaço falha, generate_audio falha e os pedaços ainda não iniciados
+   são cancelados (não há pedidos depois do erro).
+
+Uso:
+    python -m app.teste.teste_elevenlabs_service [--chunks N] [--max-delay-ms MS] [--seed N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+# O serviço exige uma chave; os pedidos nunca chegam à API.
+os.environ.setdefault("ELEVENLABS_API_KEY", "teste-elevenlabs-service")
+
+from app.services.audio_cache import AudioCache
+from app.services.elevenlabs_service import ElevenLabsService
+from app.services.sentence_splitter import pack_sentences
+
+ok = True
+
+
+def check(label: str, condition: bool) -> None:
+    global ok
+    ok = ok and bool(condition)
+    print(f"{'✅' if condition else '❌'} {label}")
+
+
+def fake_audio(text: str) -> bytes:
+    return f"<{text}>".encode("utf-8")
+
+
+class FakeTextToSpeech:
+    """Substitui client.text_to_speech (síncrono e assíncrono) e regista os pedidos."""
+
+    def __init__(self, max_delay: float, seed: int):
+        self.max_delay = max_delay
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, fail_text: str = None) -> None:
+        with self.lock:
+            self.active = 0
+            self.peak = 0
+            self.started = 0
+            self.fail_text = fail_text
+
+    def _start(self, text: str) -> float:
+        with self.lock:
+            self.active += 1
+            self.started += 1
+            self.peak = max(self.peak, self.active)
+            return self.rng.uniform(0, self.max_delay)
+
+    def _finish(self) -> None:
+        with self.lock:
+            self.active -= 1
+
+    def convert(self, text: str, **kwargs):
+        delay = self._start(text)
+        try:
+            time.sleep(delay)
+            if text == self.fail_text:
+                raise RuntimeError("erro simulado da API")
+        finally:
+            self._finish()
+        # Em blocos, como o SDK
+        audio = fake_audio(text)
+        yield audio[:10]
+        yield audio[10:]
+
+
+class FakeAsyncTextToSpeech:
+    def __init__(self, sync: FakeTextToSpeech):
+        self.sync = sync
+
+    async def convert(self, text: str, **kwargs):
+        delay = self.sync._start(text)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.sync._finish()
+        yield fake_audio(text)
+
+
+class FakeClient:
+    def __init__(self, text_to_speech):
+        self.text_to_speech = text_to_speech
+
+
+def make_text(chunks: int, chunk_chars: int) -> str:
+    """Texto com frases numeradas, que o pack_sentences divide em cerca de `chunks` pedaços."""
+    sentences = []
+    size = 0
+    i = 0
+    while size < chunks * chunk_chars:
+        sentence = f"Frase número {i} do texto de teste para a síntese de voz."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+        i += 1
+    return " ".join(sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concorrência, ordem e cancelamento da síntese do ElevenLabsService.")
+    parser.add_argument("--chunks", type=int, default=40, help="Pedaços de texto aproximados.")
+    parser.add_argument("--max-delay-ms", type=float, default=30.0, help="Demora máxima simulada por pedaço.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # O erro simulado seria registado com o traceback completo
+    logging.getLogger("app.services.elevenlabs_service").setLevel(logging.CRITICAL)
+
+    fake = FakeTextToSpeech(args.max_delay_ms / 1e3, args.seed)
+    service = ElevenLabsService(cache=AudioCache(enabled=False))
+    service.client = FakeClient(fake)
+    service.async_client = FakeClient(FakeAsyncTextToSpeech(fake))
+    # Pedaços pequenos: muitos pedidos com pouco texto
+    service.max_chunk_chars = 300
+    text = make_text(args.chunks, service.max_chunk_chars)
+    chunks = pack_sentences(text, service.max_chunk_chars)
+    expected = b"".join(fake_audio(chunk) for chunk in chunks)
+
+    print("🚀 Síntese em paralelo do ElevenLabsService (cliente falso)")
+    print("=" * 60)
+    print(f"   {len(chunks)} pedaços, até {service.max_concurrency} em simultâneo, "
+          f"janela de {service.lookahead_chunks} pedaços")
+
+    try:
+        print("\n🔍 Ordem e concorrência")
+        fake.reset()
+        audio = service.generate_audio(text)
+        check("generate_audio: áudio pela ordem do texto", audio == expected)
+        check(f"generate_audio: no máximo {service.max_concurrency} pedidos em simultâneo (pico {fake.peak})",
+              1 < fake.peak <= service.max_concurrency)
+
+        fake.reset()
+        audio = asyncio.run(service.agenerate_audio(text))
+        check("agenerate_audio: áudio pela ordem do texto", audio == expected)
+        check(f"agenerate_audio: no máximo {service.max_concurrency} pedidos em simultâneo (pico {fake.peak})",
+              1 < fake.peak <= service.max_concurrency)
+
+        print("\n🔍 Janela de pedaços com um consumidor lento")
+        fake.reset()
+        ahead = 0
+        delivered = 0
+        for part in service.iter_audio(text):
+            delivered += 1
+            time.sleep(args.max_delay_ms / 1e3)  # dá tempo às threads para se adiantarem
+            ahead = max(ahead, fake.started - delivered)
+        check(f"Pedidos adiantados ao consumidor limitados à janela (máximo {ahead}, "
+              f"janela {service.lookahead_chunks})", 0 < ahead <= service.lookahead_chunks)
+
+        print("\n🔍 Erro num pedaço")
+        failing = len(chunks) // 4
+        fake.reset(fail_text=chunks[failing])
+        try:
+            service.generate_audio(text)
+            check("generate_audio falha quando um pedaço falha", False)
+        except Exception as e:
+            check(f"generate_audio falha quando um pedaço falha ({e})", f"pedaço {failing + 1}" in str(e))
+        started_at_error = fake.started
+        time.sleep(5 * args.max_delay_ms / 1e3)
+        check(f"Pedaços seguintes cancelados ({fake.started} de {len(chunks)} iniciados)",
+              fake.started == started_at_error <= failing + 1 + service.lookahead_chunks)
+        check("Nenhum pedido ficou em curso", fake.active == 0)
+    finally:
+        service.close()
+
+    if not ok:
+        print("\n❌ A síntese em paralelo não se comportou como esperado.")
+        sys.exit(1)
+    print("\n✅ Verificação concluída!")
+
+
+if __name__ == "__main__":
+    main()
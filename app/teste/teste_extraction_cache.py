@@ -0,0 +1,196 @@
+# app/teste/teste_extraction_cache.py
+"""
+Verifica o cache de extração (ExtractionCache) e o cache em disco por baixo dele
+(DiskLRUCache), num diretório temporário.
+
+1. Ida e volta: "pages", "chapters" e "features" (BlockFeatures) voltam iguais do
+   disco, sem chamar de novo a função de cálculo.
+2. Expulsão por tamanho: acima de max_bytes saem as entradas menos usadas (uma
+   entrada lida recentemente sobrevive), e os puts abaixo do limite não percorrem o
+   diretório.
+3. Expulsão por idade: uma entrada expirada não é servida e é apagada, na leitura
+   ou no varrimento seguinte.
+4. Mudança de EXTRACTION_HEURISTICS_VERSION: as entradas antigas deixam de ser usadas.
+5. Contadores partilhados: acertos de outro processo aparecem em stats().
+
+Uso:
+    python -m app.teste.teste_extraction_cache
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.services import extraction_cache as extraction_cache_mod
+from app.services.disk_cache import DiskLRUCache
+from app.services.extraction_cache import ExtractionCache
+from app.services.feature_extractor import BlockFeatures
+
+ok = True
+
+
+def check(label: str, condition: bool) -> None:
+    global ok
+    ok = ok and bool(condition)
+    print(f"{'✅' if condition else '❌'} {label}")
+
+
+def make_features(blocks: int = 50) -> BlockFeatures:
+    rng = np.random.default_rng(0)
+    return BlockFeatures(
+        text=[f"Bloco {i} — ção" for i in range(blocks)],
+        word_count=rng.integers(1, 50, blocks).astype(np.int32),
+        char_count=rng.integers(1, 300, blocks).astype(np.int32),
+        avg_font_size=rng.uniform(8, 24, blocks),
+        max_font_size=rng.uniform(8, 24, blocks),
+        is_bold=rng.random(blocks) < 0.2,
+        is_all_caps=rng.random(blocks) < 0.1,
+        bbox=rng.uniform(0, 600, (blocks, 4)),
+        normalized_y0=rng.random(blocks),
+        alignment=rng.integers(0, 3, blocks).astype(np.int8),
+        page_num=(np.arange(blocks) // 10 + 1).astype(np.int32),
+        vertical_spacing_after=rng.uniform(0, 30, blocks),
+        relative_font_size=rng.uniform(0.5, 2, blocks),
+    )
+
+
+def same_features(a: BlockFeatures, b: BlockFeatures) -> bool:
+    return a.text == b.text and all(
+        getattr(a, name).dtype == getattr(b, name).dtype and np.array_equal(getattr(a, name), getattr(b, name))
+        for name in BlockFeatures.NUMERIC_COLUMNS
+    )
+
+
+class Computations:
+    """Função de cálculo que conta as chamadas (cada chamada é uma falha no cache)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, value):
+        def compute():
+            self.calls += 1
+            return value
+        return compute
+
+
+def scenario_round_trip(directory: str) -> None:
+    print("\n🔍 Ida e volta")
+    cache = ExtractionCache(cache=DiskLRUCache(directory, max_bytes=10 * 1024 * 1024), enabled=True)
+    digest = ExtractionCache.digest(b"%PDF-1.4 livro de teste")
+    pages = ["Página um, com acentuação.", "", "Página três"]
+    chapters = {"status": "success", "chapters": [{"title": "Capítulo 1", "content": "Texto", "start_page": 1}]}
+    features = make_features()
+    compute = Computations()
+
+    for kind, value in (("pages", pages), ("chapters", chapters), ("features", features)):
+        cache.get_or_compute(digest, kind, compute(value))
+    # Um objeto novo sobre o mesmo diretório: só o disco pode responder
+    cache = ExtractionCache(cache=DiskLRUCache(directory, max_bytes=10 * 1024 * 1024), enabled=True)
+    loaded = {kind: cache.get_or_compute(digest, kind, compute(None)) for kind in ("pages", "chapters", "features")}
+    check("'pages' igual depois do disco", loaded["pages"] == pages)
+    check("'chapters' igual depois do disco", loaded["chapters"] == chapters)
+    check("'features' com as mesmas colunas e tipos", same_features(loaded["features"], features))
+    check(f"Função de cálculo só chamada na primeira vez ({compute.calls} chamadas)", compute.calls == 3)
+
+
+def scenario_size_eviction(directory: str) -> None:
+    print("\n🔍 Expulsão por tamanho")
+    entry = b"x" * 1000
+    cache = DiskLRUCache(directory, max_bytes=10 * len(entry))
+    walks = [0]
+    entries = cache._entries
+
+    def counting_entries():
+        walks[0] += 1
+        return entries()
+
+    cache._entries = counting_entries
+    now = time.time()
+    for i in range(10):
+        cache.put(f"k{i:02d}", entry)
+        os.utime(cache.path(f"k{i:02d}"), (now - 100 + i, now - 100 + i))
+    check(f"10 puts dentro do limite sem percorrer o diretório ({walks[0]} varrimentos)", walks[0] == 0)
+
+    cache.get("k00")  # passa a ser a mais recente
+    for i in range(10, 13):
+        cache.put(f"k{i:02d}", entry)
+    present = sorted(os.path.basename(path) for _, _, path in entries())
+    check(f"Limite respeitado ({len(present)} entradas)", len(present) == 10 and cache._total_bytes <= cache.max_bytes)
+    check("Saíram as menos usadas (k01, k02, k03)", not {"k01", "k02", "k03"} & set(present))
+    check("A entrada lida recentemente ficou (k00)", "k00" in present)
+    check(f"Um varrimento por put acima do limite ({walks[0]})", walks[0] == 3)
+
+
+def scenario_age_eviction(directory: str) -> None:
+    print("\n🔍 Expulsão por idade")
+    cache = DiskLRUCache(directory, max_bytes=1024 * 1024, max_age_seconds=0.5)
+    cache.put("velha", b"a" * 100)
+    cache.put("lida", b"b" * 100)
+    time.sleep(0.7)
+    check("Entrada expirada não é servida", cache.get("lida") is None)
+    check("Entrada expirada é apagada na leitura", not os.path.exists(cache.path("lida")))
+    cache.put("nova", b"c" * 100)
+    check("Entrada expirada é apagada no varrimento do put seguinte", not os.path.exists(cache.path("velha")))
+    check(f"Total acertado com o disco ({cache._total_bytes} bytes)", cache._total_bytes == 100)
+    check("Entrada nova é servida", cache.get("nova") == b"c" * 100)
+
+
+def scenario_version_bump(directory: str) -> None:
+    print("\n🔍 Mudança da versão das heurísticas")
+    cache = ExtractionCache(cache=DiskLRUCache(directory, max_bytes=1024 * 1024), enabled=True)
+    digest = ExtractionCache.digest(b"%PDF-1.4 outro livro")
+    compute = Computations()
+    cache.get_or_compute(digest, "pages", compute(["versão antiga"]))
+    original = extraction_cache_mod.EXTRACTION_HEURISTICS_VERSION
+    extraction_cache_mod.EXTRACTION_HEURISTICS_VERSION = original + 1
+    try:
+        result = cache.get_or_compute(digest, "pages", compute(["versão nova"]))
+    finally:
+        extraction_cache_mod.EXTRACTION_HEURISTICS_VERSION = original
+    check("Entrada da versão anterior ignorada", result == ["versão nova"] and compute.calls == 2)
+    check("Entrada da versão atual continua válida",
+          cache.get_or_compute(digest, "pages", compute(None)) == ["versão antiga"])
+
+
+def _lookup_in_other_process(directory: str) -> None:
+    cache = DiskLRUCache(directory, max_bytes=1024 * 1024)
+    cache.get("partilhada", label="pages")
+    cache.get("inexistente", label="pages")
+
+
+def scenario_shared_counters(directory: str) -> None:
+    print("\n🔍 Contadores partilhados entre processos")
+    cache = DiskLRUCache(directory, max_bytes=1024 * 1024)
+    cache.put("partilhada", b"z" * 10)
+    cache.get("partilhada", label="pages")
+    process = multiprocessing.get_context("spawn").Process(target=_lookup_in_other_process, args=(directory,))
+    process.start()
+    process.join()
+    stats = cache.stats()
+    print(f"   stats: {stats}")
+    check("Acertos e falhas do outro processo somados",
+          stats["hits_by_kind"] == {"pages": 2} and stats["misses_by_kind"] == {"pages": 1})
+    check("Ficheiro dos contadores fora das entradas", stats["entries"] == 1 and stats["size_bytes"] == 10)
+
+
+def main():
+    print("🚀 Cache de extração")
+    print("=" * 60)
+    scenario_round_trip(tempfile.mkdtemp(prefix="teste-cache-"))
+    scenario_size_eviction(tempfile.mkdtemp(prefix="teste-cache-"))
+    scenario_age_eviction(tempfile.mkdtemp(prefix="teste-cache-"))
+    scenario_version_bump(tempfile.mkdtemp(prefix="teste-cache-"))
+    scenario_shared_counters(tempfile.mkdtemp(prefix="teste-cache-"))
+
+    if not ok:
+        print("\n❌ Há verificações do cache que falharam.")
+        sys.exit(1)
+    print("\n✅ Todas as verificações passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# app/teste/teste_health_latency.py
+"""
+Benchmark da latência de /health enquanto /api/v1/pdf/segment segmenta PDFs
+pesados, pela aplicação ASGI (httpx.ASGITransport, sem rede nem servidor).
+
+Durante --seconds segundos, --clients clientes enviam PDFs do corpus
+(app/services/Documento de Thiago Germano, os --pdfs maiores) para /segment sem
+parar, e um outro cliente pede /health a cada --interval-ms. A latência de cada
+pedido a /health conta desde a hora a que devia ter sido enviado, para incluir o
+tempo em que o event loop nem o deixou sair. São comparados:
+
+1. Segmentação no event loop: o get_cpu_pool é substituído por um pool que corre a
+   mesma função no próprio loop (como o endpoint fazia antes do CPUPool);
+2. CPUPool: a segmentação corre no pool de processos da aplicação.
+
+Para cada um: p50, p99 e máximo da latência de /health, e segmentações
+concluídas / recusadas com 503. O cache de extração é desligado para que cada
+pedido segmente o PDF de novo.
+
+Uso:
+    python -m app.teste.teste_health_latency [--seconds S] [--clients N] [--interval-ms MS] [--pdfs N]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+# Cada pedido tem de segmentar o PDF (também nos processos do pool, que herdam o ambiente)
+os.environ["EXTRACTION_CACHE_ENABLED"] = "false"
+
+import httpx
+
+from app.api.v1.endpoints.pdf import get_cpu_pool
+from app.core import cpu_pool
+from app.core.cpu_pool import CPUPool
+from app.main import app
+
+CORPUS = os.path.join(os.path.dirname(__file__), "..", "services", "Documento de Thiago Germano")
+
+
+class InlinePool:
+    """Referência: corre a segmentação diretamente no event loop, como antes do CPUPool."""
+
+    def __init__(self):
+        cpu_pool._init_cpu_worker()
+
+    async def run(self, fn, *args):
+        return fn(*args)
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_load(pdfs: list, seconds: float, clients: int, interval: float) -> dict:
+    health = []
+    segmented = rejected = 0
+    deadline = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste",
+                                 timeout=None) as client:
+        async def segment_forever(offset: int):
+            nonlocal segmented, rejected
+            i = offset
+            while time.perf_counter() < deadline:
+                name, data = pdfs[i % len(pdfs)]
+                i += 1
+                response = await client.post("/api/v1/pdf/segment", files={"file": (name, data, "application/pdf")})
+                if response.status_code == 503:
+                    rejected += 1
+                    await asyncio.sleep(interval)
+                else:
+                    response.raise_for_status()
+                    segmented += 1
+
+        async def probe_health():
+            # Latência medida desde a hora marcada do pedido, não desde o envio: com o loop
+            # bloqueado o próprio envio atrasa, e esse atraso também conta
+            scheduled = time.perf_counter()
+            while scheduled < deadline:
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                response = await client.get("/health")
+                health.append(time.perf_counter() - scheduled)
+                response.raise_for_status()
+                scheduled += interval
+
+        await asyncio.gather(probe_health(), *(segment_forever(i) for i in range(clients)))
+
+    return {
+        "p50": statistics.median(health),
+        "p99": percentile(health, 0.99),
+        "max": max(health),
+        "probes": len(health),
+        "segmented": segmented,
+        "rejected": rejected,
+    }
+
+
+def report(label: str, result: dict) -> None:
+    print(f"\n⏱️ {label}: /health p50 {result['p50'] * 1e3:.1f} ms, p99 {result['p99'] * 1e3:.1f} ms, "
+          f"máximo {result['max'] * 1e3:.1f} ms ({result['probes']} pedidos)")
+    print(f"   📄 {result['segmented']} segmentações concluídas, {result['rejected']} recusadas com 503")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência de /health com segmentações de PDF em curso.")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Duração de cada medição.")
+    parser.add_argument("--clients", type=int, default=4, help="Clientes a enviar PDFs para /segment.")
+    parser.add_argument("--interval-ms", type=float, default=20.0, help="Intervalo entre pedidos a /health.")
+    parser.add_argument("--pdfs", type=int, default=8, help="Número de PDFs do corpus (os maiores).")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(CORPUS, "**", "*.pdf"), recursive=True), key=os.path.getsize)[-args.pdfs:]
+    if not paths:
+        print(f"❌ Nenhum PDF encontrado em {CORPUS}")
+        sys.exit(1)
+    pdfs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pdfs.append((os.path.basename(path), f.read()))
+    interval = args.interval_ms / 1e3
+
+    print("🚀 Latência de /health com segmentações de PDF em curso")
+    print("=" * 60)
+    print(f"   {len(pdfs)} PDFs do corpus ({sum(len(d) for _, d in pdfs) / 1024 / 1024:.0f} MiB), "
+          f"{args.clients} clientes em /segment, /health a cada {args.interval_ms:.0f} ms, {args.seconds:.0f}s por medição")
+
+    pool = CPUPool()
+    app.state.services = SimpleNamespace(cpu_pool=pool)
+    try:
+        app.dependency_overrides[get_cpu_pool] = InlinePool
+        try:
+            inline = asyncio.run(run_load(pdfs, args.seconds, args.clients, interval))
+        finally:
+            app.dependency_overrides.clear()
+        report("Segmentação no event loop", inline)
+
+        # Arranque dos processos fora da medição
+        asyncio.run(pool.run(cpu_pool.segment_pdf, pdfs[0][1]))
+        pooled = asyncio.run(run_load(pdfs, args.seconds, args.clients, interval))
+        report(f"CPUPool ({pool.max_workers} processo(s), fila de {pool.queue_size})", pooled)
+    finally:
+        pool.shutdown()
+
+    print()
+    ok = pooled["p99"] < inline["p99"] and pooled["segmented"] > 0
+    print(f"{'✅' if ok else '❌'} p99 de /health com o CPUPool: {pooled['p99'] * 1e3:.1f} ms "
+          f"(no event loop: {inline['p99'] * 1e3:.1f} ms, {inline['p99'] / pooled['p99']:.0f}x)")
+
+    if not ok:
+        print("\n❌ A segmentação ainda atrasa o /health.")
+        sys.exit(1)
+    print("\n✅ Benchmark concluído!")
+
+
+if __name__ == "__main__":
+    main()
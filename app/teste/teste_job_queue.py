@@ -0,0 +1,279 @@
+# app/teste/teste_job_queue.py
+"""
+Cenários da fila de trabalhos (app/crud/crud_job_queue.py e app/worker.py) sobre
+uma base de dados SQLite temporária, com handlers de teste no lugar dos serviços.
+
+1. Deduplicação: o mesmo (kind, dedupe_key) devolve o trabalho ativo, também com
+   inserções simultâneas (índice único parcial); um payload diferente é recusado.
+2. Execução: concorrência limitada, repetição com espera crescente até ao sucesso,
+   FAILED depois de max_attempts, e um trabalho cuja reserva expirou (worker morto)
+   é retomado.
+3. Reserva expirada na última tentativa: o trabalho e o documento ficam FAILED.
+4. Reserva perdida durante a execução: o handler é avisado (lease_lost) e nem
+   complete() nem fail() alteram o trabalho, que fica com o novo dono.
+
+O SQLite não tem FOR UPDATE SKIP LOCKED: a reserva exclusiva entre threads só é
+garantida no Postgres, e aqui um trabalho pode ser reservado duas vezes; o worker
+deteta-o (a segunda conclusão é recusada) e o cenário 2 não depende disso.
+
+Uso:
+    python -m app.teste.teste_job_queue
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+import app.worker as worker_mod
+from app.core.config import settings
+from app.crud import crud_job_queue
+from app.models.base import Base
+from app.models.document import Document, ProcessingStatus
+from app.models.job_queue import QueuedJob, QueuedJobStatus
+
+ok = True
+
+
+def check(label: str, condition: bool) -> None:
+    global ok
+    ok = ok and bool(condition)
+    print(f"{'✅' if condition else '❌'} {label}")
+
+
+def make_session_factory():
+    path = os.path.join(tempfile.mkdtemp(prefix="teste-job-queue-"), "fila.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine, tables=[QueuedJob.__table__, Document.__table__])
+    return sessionmaker(bind=engine)
+
+
+def add_document(Session, status=ProcessingStatus.PROCESSING) -> int:
+    db = Session()
+    # A chave BigInteger não é autoincrementada no SQLite
+    document = Document(id=(db.query(func.max(Document.id)).scalar() or 0) + 1,
+                        title="Livro de teste", language="pt", status=status, owner_id=uuid.uuid4())
+    db.add(document)
+    db.commit()
+    document_id = document.id
+    db.close()
+    return document_id
+
+
+def wait_until_idle(Session, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db = Session()
+        active = db.query(QueuedJob).filter(QueuedJob.status.in_([QueuedJobStatus.QUEUED, QueuedJobStatus.RUNNING])).count()
+        db.close()
+        if not active:
+            return
+        time.sleep(0.05)
+
+
+def run_worker(Session, seconds: float = None, **kwargs) -> None:
+    worker = worker_mod.Worker(services=object(), poll_interval=0.05, **kwargs)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    if seconds is None:
+        wait_until_idle(Session, 20)
+    else:
+        time.sleep(seconds)
+    worker.stop()
+    thread.join()
+
+
+def scenario_dedupe(Session) -> None:
+    print("\n🔍 Deduplicação")
+    db = Session()
+    first = crud_job_queue.enqueue(db, "sleepy", {"n": 1}, dedupe_key="doc-1")
+    second = crud_job_queue.enqueue(db, "sleepy", {"n": 1}, dedupe_key="doc-1")
+    check("Mesmo pedido devolve o trabalho ativo", first.id == second.id)
+    try:
+        crud_job_queue.enqueue(db, "sleepy", {"n": 2}, dedupe_key="doc-1")
+        check("Payload diferente é recusado (ActiveJobConflict)", False)
+    except crud_job_queue.ActiveJobConflict as e:
+        check("Payload diferente é recusado (ActiveJobConflict)", e.job.id == first.id)
+    db.query(QueuedJob).delete()
+    db.commit()
+    db.close()
+
+    # Pedidos simultâneos: a consulta inicial falha em todos, só a inserção decide.
+    barrier = threading.Barrier(8)
+    ids = []
+    original = crud_job_queue._get_active
+
+    def racing_get_active(db, kind, dedupe_key, _first=threading.local()):
+        if not getattr(_first, "done", False):
+            _first.done = True
+            barrier.wait()
+            return None
+        return original(db, kind, dedupe_key)
+
+    def post():
+        db = Session()
+        try:
+            ids.append(crud_job_queue.enqueue(db, "sleepy", {"n": 3}, dedupe_key="doc-2").id)
+        finally:
+            db.close()
+
+    crud_job_queue._get_active = racing_get_active
+    try:
+        threads = [threading.Thread(target=post) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        crud_job_queue._get_active = original
+    db = Session()
+    rows = db.query(QueuedJob).filter(QueuedJob.dedupe_key == "doc-2").count()
+    db.query(QueuedJob).delete()
+    db.commit()
+    db.close()
+    check(f"8 pedidos simultâneos criam 1 trabalho ({rows} linha(s), IDs {sorted(set(ids))})",
+          rows == 1 and len(ids) == 8 and len(set(ids)) == 1)
+
+
+def scenario_execution(Session) -> None:
+    print("\n🔍 Execução, repetições e reserva expirada")
+    lock = threading.Lock()
+    active, peak, runs = [0], [0], []
+    flaky_calls = [0]
+
+    def sleepy(services, db, payload, lease_lost):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.3)
+        with lock:
+            active[0] -= 1
+            runs.append(payload["n"])
+
+    def flaky(services, db, payload, lease_lost):
+        flaky_calls[0] += 1
+        if flaky_calls[0] < 3:
+            raise RuntimeError("falha transitória")
+
+    def broken(services, db, payload, lease_lost):
+        raise ZeroDivisionError("sempre falha")
+
+    worker_mod.HANDLERS.update(sleepy=sleepy, flaky=flaky, broken=broken)
+    db = Session()
+    dead_id = crud_job_queue.enqueue(db, "sleepy", {"n": 50}).id
+    crud_job_queue.claim(db, "worker-morto", visibility_timeout=0.5)
+    for i in range(6):
+        crud_job_queue.enqueue(db, "sleepy", {"n": i})
+    flaky_id = crud_job_queue.enqueue(db, "flaky", {}, max_attempts=3).id
+    broken_id = crud_job_queue.enqueue(db, "broken", {}, max_attempts=2).id
+    db.close()
+
+    run_worker(Session, concurrency=3, visibility_timeout=2)
+
+    db = Session()
+    jobs = {job.id: job for job in db.query(QueuedJob)}
+    check(f"Concorrência limitada a 3 (pico {peak[0]})", peak[0] <= 3)
+    check("Todos os trabalhos 'sleepy' concluídos",
+          all(job.status == QueuedJobStatus.DONE for job in jobs.values() if job.kind == "sleepy")
+          and set(runs) >= {50, *range(6)})
+    check("Trabalho do worker morto retomado noutra tentativa", jobs[dead_id].attempts == 2)
+    check("Trabalho instável concluído à 3.ª tentativa",
+          jobs[flaky_id].status == QueuedJobStatus.DONE and jobs[flaky_id].attempts == 3)
+    check("Trabalho sempre a falhar fica FAILED ao fim de max_attempts",
+          jobs[broken_id].status == QueuedJobStatus.FAILED and jobs[broken_id].attempts == 2)
+    db.query(QueuedJob).delete()
+    db.commit()
+    db.close()
+
+
+def scenario_expired_last_attempt(Session) -> None:
+    print("\n🔍 Reserva expirada na última tentativa")
+    document_id = add_document(Session)
+    db = Session()
+    job = crud_job_queue.enqueue(db, "sleepy", {"document_id": document_id}, max_attempts=1)
+    crud_job_queue.claim(db, "worker-morto", visibility_timeout=0.1)
+    time.sleep(0.3)
+    claimed = crud_job_queue.claim(db, "outro-worker", visibility_timeout=1)
+    db.expire_all()
+    job = db.get(QueuedJob, job.id)
+    document = db.get(Document, document_id)
+    check("Não é reservado de novo", claimed is None)
+    check("Trabalho fica FAILED", job.status == QueuedJobStatus.FAILED)
+    check(f"Documento fica FAILED (estado: {document.status.value})", document.status == ProcessingStatus.FAILED)
+    db.query(QueuedJob).delete()
+    db.commit()
+    db.close()
+
+
+def scenario_lease_lost(Session) -> None:
+    print("\n🔍 Reserva perdida durante a execução")
+    seen = {}
+
+    def steal(job_id):
+        db = Session()
+        job = db.get(QueuedJob, job_id)
+        job.locked_by = "outro-worker"
+        job.locked_until = job.locked_until + timedelta(hours=1)
+        db.commit()
+        db.close()
+
+    def stolen_ok(services, db, payload, lease_lost):
+        steal(payload["id"])
+        seen["ok"] = lease_lost.wait(5)
+
+    def stolen_fail(services, db, payload, lease_lost):
+        steal(payload["id"])
+        seen["fail"] = lease_lost.wait(5)
+        raise RuntimeError("falha depois de perder a reserva")
+
+    def stolen_fast(services, db, payload, lease_lost):
+        steal(payload["id"])  # termina antes de o heartbeat reparar
+
+    worker_mod.HANDLERS.update(stolen_ok=stolen_ok, stolen_fail=stolen_fail, stolen_fast=stolen_fast)
+    db = Session()
+    ids = []
+    for kind in ("stolen_ok", "stolen_fail", "stolen_fast"):
+        job = crud_job_queue.enqueue(db, kind, {})
+        job.payload = {"id": job.id}
+        db.commit()
+        ids.append(job.id)
+    db.close()
+
+    run_worker(Session, seconds=2.5, concurrency=3, visibility_timeout=0.6)
+
+    db = Session()
+    for job_id in ids:
+        job = db.get(QueuedJob, job_id)
+        check(f"'{job.kind}': fica RUNNING com o novo dono ({job.status.value}, {job.locked_by})",
+              job.status == QueuedJobStatus.RUNNING and job.locked_by == "outro-worker" and job.last_error is None)
+    check(f"Handlers avisados por lease_lost ({seen})", seen == {"ok": True, "fail": True})
+    db.close()
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    settings.JOB_RETRY_BACKOFF_SECONDS = 0.05
+    Session = make_session_factory()
+    worker_mod.SessionLocal = Session
+
+    print("🚀 Cenários da fila de trabalhos (SQLite)")
+    print("=" * 60)
+    scenario_dedupe(Session)
+    scenario_execution(Session)
+    scenario_expired_last_attempt(Session)
+    scenario_lease_lost(Session)
+
+    if not ok:
+        print("\n❌ Há cenários da fila que falharam.")
+        sys.exit(1)
+    print("\n✅ Todos os cenários passaram!")
+
+
+if __name__ == "__main__":
+    main()
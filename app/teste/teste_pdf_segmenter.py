@@ -0,0 +1,204 @@
+# app/teste/teste_pdf_segmenter.py
+"""
+Micro-benchmark da deteção de títulos do PDFSegmenterService.
+
+Gera um documento sintético com N blocos (50 000 por omissão: parágrafos, títulos
+grandes, títulos a negrito e títulos centrados em maiúsculas) e compara:
+
+1. _title_candidate_mask (máscaras sobre as colunas do BlockFeatures) com a
+   decisão original bloco a bloco (_reference_is_title_candidate sobre
+   df.iterrows()), que tem de marcar exatamente os mesmos blocos;
+2. _identify_chapters_from_features com o ciclo original de montagem dos
+   capítulos, que tem de produzir os mesmos capítulos;
+3. a extração de características de um PDF real em paralelo
+   (FeatureExtractor._extract_parallel, por caminho e por bytes) com a extração
+   serial, que têm de dar o mesmo texto e as mesmas colunas do BlockFeatures.
+
+Uso:
+    python -m app.teste.teste_pdf_segmenter [--blocks N] [--repeat N] [--seed N] [--pdf CAMINHO] [--workers N]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import fitz
+import numpy as np
+
+from app.services.feature_extractor import ALIGN_CENTER, ALIGN_LEFT, BlockFeatures, FeatureExtractor
+from app.services.pdf_segmenter import PDFSegmenterService
+
+DEFAULT_PDF = os.path.join(
+    os.path.dirname(__file__), "..", "services", "Documento de Thiago Germano", "OBRAS DE DOMÍNIO PÚBLICO",
+    "MACHADO DE ASSIS", "1 - ROMANCE", "8 - DOM CASMURRO (1899).pdf",
+)
+
+
+def make_features(blocks: int, seed: int) -> BlockFeatures:
+    """Documento sintético: ~3% de títulos, com as pistas visuais misturadas ao acaso."""
+    rng = np.random.default_rng(seed)
+    kind = rng.choice(4, size=blocks, p=[0.97, 0.01, 0.01, 0.01])
+    paragraph = kind == 0
+
+    word_count = np.where(paragraph, rng.integers(1, 120, blocks), rng.integers(1, 14, blocks)).astype(np.int32)
+    avg_font_size = np.where(paragraph, rng.choice([10.0, 11.0, 12.0], blocks), rng.uniform(11, 24, blocks))
+    max_font_size = avg_font_size + rng.choice([0.0, 0.5], blocks)
+    is_bold = (kind == 2) | (rng.random(blocks) < 0.05)
+    is_all_caps = (kind == 3) | (rng.random(blocks) < 0.01)
+    alignment = np.where((kind == 3) | (rng.random(blocks) < 0.1), ALIGN_CENTER, ALIGN_LEFT).astype(np.int8)
+    spacing = np.where(paragraph, rng.uniform(0, 20, blocks), rng.uniform(10, 40, blocks))
+    text = [f"{'TÍTULO' if k == 3 else 'Bloco'} {i}" for i, k in enumerate(kind.tolist())]
+
+    features = BlockFeatures(
+        text=text,
+        word_count=word_count,
+        char_count=np.fromiter((len(t) for t in text), dtype=np.int32, count=blocks),
+        avg_font_size=avg_font_size,
+        max_font_size=max_font_size,
+        is_bold=is_bold,
+        is_all_caps=is_all_caps,
+        bbox=np.zeros((blocks, 4)),
+        normalized_y0=np.zeros(blocks),
+        alignment=alignment,
+        page_num=(np.arange(blocks) // 20 + 1).astype(np.int32),
+        vertical_spacing_after=spacing,
+    )
+    median_font_size = float(np.median(avg_font_size[word_count > 5]))
+    features.relative_font_size = max_font_size / median_font_size
+    return features
+
+
+def _reference_is_title_candidate(row, median_font_size: float) -> bool:
+    """Decisão original, bloco a bloco, sobre uma linha do DataFrame."""
+    cond_large_font = row['relative_font_size'] > 1.2 and row['word_count'] < 15
+    cond_bold_and_larger = row['is_bold'] and row['relative_font_size'] > 1.1
+    cond_all_caps = (row['is_all_caps'] and
+                     row['word_count'] < 10 and
+                     row['char_count'] > 2 and
+                     row['alignment'] == 'center')
+    cond_spacing = row['vertical_spacing_after'] > (median_font_size * 1.5)
+    return (cond_large_font or cond_bold_and_larger or cond_all_caps) and cond_spacing
+
+
+def _reference_chapters(df, median_font_size: float) -> List[Dict[str, Any]]:
+    """Montagem original dos capítulos, com concatenação de texto bloco a bloco."""
+    chapters = []
+    current_content = ""
+    current_title = "Início do Documento"
+    start_page = 1
+    for _, row in df.iterrows():
+        if _reference_is_title_candidate(row, median_font_size):
+            if current_content.strip():
+                chapters.append({"title": current_title, "content": current_content.strip(), "start_page": start_page})
+            current_title = row['text']
+            start_page = row['page_num']
+            current_content = ""
+        else:
+            current_content += row['text'] + "\n"
+    if current_content.strip():
+        chapters.append({"title": current_title, "content": current_content.strip(), "start_page": start_page})
+    return chapters
+
+
+def _best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def different_columns(features: BlockFeatures, reference: BlockFeatures) -> List[str]:
+    """Colunas (texto incluído) em que dois BlockFeatures diferem."""
+    if len(features) != len(reference):
+        return ["len"]
+    different = [] if features.text == reference.text else ["text"]
+    for name in BlockFeatures.NUMERIC_COLUMNS:
+        column, expected = getattr(features, name), getattr(reference, name)
+        if column.dtype != expected.dtype or not np.array_equal(column, expected):
+            different.append(name)
+    return different
+
+
+def check_parallel_extraction(pdf_path: str, workers: int) -> bool:
+    """A extração em paralelo dá as mesmas colunas que a serial, com o PDF por caminho ou em bytes."""
+    serial = FeatureExtractor(max_workers=1)
+    parallel = FeatureExtractor(max_workers=workers, min_pages_for_parallel=1)
+    ok = True
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    for label, document in (("caminho", fitz.open(pdf_path)), ("bytes", fitz.open(stream=data, filetype="pdf"))):
+        with document:
+            page_count = document.page_count
+            started = time.perf_counter()
+            reference = serial._extract_page_range(document, 0, page_count)
+            serial_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            # Chamada direta: sem a recuperação em modo serial de _extract_all_blocks
+            blocks = parallel._extract_parallel(document, workers)
+            parallel_seconds = time.perf_counter() - started
+            different = different_columns(blocks, reference)
+            final = different_columns(parallel.extract_features(document), serial.extract_features(document))
+        same = not different and not final
+        ok = ok and same
+        print(f"{'✅' if same else '❌'} {label}: {len(blocks)} blocos de {page_count} páginas, "
+              f"{'colunas iguais às da extração serial' if same else f'diferem: {sorted(set(different + final))}'}")
+        print(f"⏱️ Serial: {serial_seconds:.2f}s; {workers} processos: {parallel_seconds:.2f}s")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da deteção de títulos do PDFSegmenterService.")
+    parser.add_argument("--blocks", type=int, default=50000, help="Número de blocos do documento sintético.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições da versão vetorizada (conta a melhor).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pdf", default=DEFAULT_PDF, help="PDF usado na comparação serial/paralela.")
+    parser.add_argument("--workers", type=int, default=4, help="Processos da extração paralela.")
+    args = parser.parse_args()
+
+    segmenter = PDFSegmenterService()
+    features = make_features(args.blocks, args.seed)
+    median_font_size = float(np.median(features.avg_font_size[features.word_count > 5]))
+    df = features.to_dataframe()
+
+    print("🚀 Deteção de títulos do PDFSegmenterService")
+    print("=" * 60)
+    print(f"   {len(features)} blocos, fonte mediana {median_font_size:.2f}")
+    ok = True
+
+    mask = segmenter._title_candidate_mask(features, median_font_size)
+    started = time.perf_counter()
+    reference_mask = np.array([_reference_is_title_candidate(row, median_font_size) for _, row in df.iterrows()])
+    reference_seconds = time.perf_counter() - started
+    vector_seconds = _best_time(lambda: segmenter._title_candidate_mask(features, median_font_size), args.repeat)
+    same_mask = np.array_equal(mask, reference_mask)
+    ok = ok and same_mask
+    print(f"\n{'✅' if same_mask else '❌'} Máscara: {int(mask.sum())} títulos "
+          f"(referência: {int(reference_mask.sum())})")
+    print(f"⏱️ Vetorizada: {vector_seconds * 1e3:.2f} ms; bloco a bloco: {reference_seconds * 1e3:.0f} ms "
+          f"({reference_seconds / vector_seconds:.0f}x)")
+
+    chapters = segmenter._identify_chapters_from_features(features)
+    started = time.perf_counter()
+    reference = _reference_chapters(df, median_font_size)
+    reference_seconds = time.perf_counter() - started
+    vector_seconds = _best_time(lambda: segmenter._identify_chapters_from_features(features), args.repeat)
+    same_chapters = chapters == reference
+    ok = ok and same_chapters
+    print(f"\n{'✅' if same_chapters else '❌'} Capítulos: {len(chapters)} (referência: {len(reference)})")
+    print(f"⏱️ Atual: {vector_seconds * 1e3:.2f} ms; original: {reference_seconds * 1e3:.0f} ms "
+          f"({reference_seconds / vector_seconds:.0f}x)")
+
+    print(f"\n🔍 Extração serial e paralela: {os.path.basename(args.pdf)}")
+    ok = check_parallel_extraction(args.pdf, args.workers) and ok
+
+    if not ok:
+        print("\n❌ A deteção de títulos difere da original.")
+        sys.exit(1)
+    print("\n✅ Benchmark concluído!")
+
+
+if __name__ == "__main__":
+    main()
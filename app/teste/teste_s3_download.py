@@ -0,0 +1,137 @@
+# app/teste/teste_s3_download.py
+"""
+Verifica as descargas por intervalos do S3Service (_download_object, usado por
+get_file e download_to_temp_file) contra o cliente S3 em memória de
+app/teste/fake_s3.py, com latência simulada por pedido e débito limitado por
+stream.
+
+1. Divisão: abaixo de S3_RANGED_DOWNLOAD_THRESHOLD_BYTES há um único GET sem
+   Range; a partir do limiar, intervalos contíguos de S3_DOWNLOAD_PART_BYTES que
+   cobrem o objeto inteiro.
+2. Conteúdo: get_file e download_to_temp_file por intervalos dão o mesmo SHA-256
+   que a descarga num único stream (e que o objeto).
+3. Objeto substituído entre o HEAD e os GETs: o If-Match falha e a descarga dá
+   RuntimeError em vez de misturar versões.
+
+Uso:
+    python -m app.teste.teste_s3_download [--mb N] [--latency-ms MS] [--stream-mbps N] [--seed N]
+"""
+import argparse
+import hashlib
+import logging
+import random
+import sys
+import time
+
+from app.core.config import settings
+from app.teste.fake_s3 import FakeS3Client, make_s3_service
+
+MB = 1024 * 1024
+ok = True
+
+
+def check(label: str, condition: bool) -> None:
+    global ok
+    ok = ok and bool(condition)
+    print(f"{'✅' if condition else '❌'} {label}")
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def expected_ranges(size: int, part_size: int) -> list:
+    return [f"bytes={start}-{min(start + part_size, size) - 1}" for start in range(0, size, part_size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Descargas por intervalos do S3Service contra um S3 em memória.")
+    parser.add_argument("--mb", type=int, default=40, help="Tamanho do objeto grande, em MiB.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência simulada de cada pedido ao S3.")
+    parser.add_argument("--stream-mbps", type=float, default=100.0, help="Débito simulado de cada stream, em MiB/s.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # A falha simulada do If-Match seria registada como erro
+    logging.getLogger("app.services.s3_service").setLevel(logging.CRITICAL)
+
+    threshold = settings.S3_RANGED_DOWNLOAD_THRESHOLD_BYTES
+    part_size = settings.S3_DOWNLOAD_PART_BYTES
+    rng = random.Random(args.seed)
+    client = FakeS3Client(args.latency_ms / 1e3, bandwidth=args.stream_mbps * MB)
+    client.objects["limiar-menos-1.pdf"] = rng.randbytes(threshold - 1)
+    client.objects["limiar.pdf"] = rng.randbytes(threshold)
+    client.objects["grande.pdf"] = rng.randbytes(args.mb * MB + 12345)
+    service = make_s3_service(client)
+
+    print("🚀 Descargas por intervalos do S3Service (S3 em memória)")
+    print("=" * 60)
+    print(f"   Limiar: {threshold / MB:.0f} MiB, intervalos de {part_size / MB:.0f} MiB, "
+          f"até {service.max_concurrency} em simultâneo, {args.latency_ms:.0f} ms por pedido, "
+          f"{args.stream_mbps:.0f} MiB/s por stream")
+
+    try:
+        print("\n🔍 Divisão em intervalos")
+        for key in ("limiar-menos-1.pdf", "limiar.pdf", "grande.pdf"):
+            size = len(client.objects[key])
+            client.ranges.clear()
+            data = service.get_file(key, None, None)
+            ranged = size >= threshold and size > part_size
+            expected = expected_ranges(size, part_size) if ranged else [None]
+            check(f"{key} ({size} bytes): {len(client.ranges)} GET(s)"
+                  f"{' por intervalos' if ranged else ' sem Range'}",
+                  sorted(client.ranges, key=str) == sorted(expected, key=str) and data == client.objects[key])
+
+        print("\n🔍 Conteúdo igual ao de um único stream")
+        key = "grande.pdf"
+        started = time.perf_counter()
+        ranged = service.get_file(key, None, None)
+        ranged_seconds = time.perf_counter() - started
+        with service.download_to_temp_file(key) as path:
+            with open(path, "rb") as f:
+                on_disk = sha256(f.read())
+
+        settings.S3_RANGED_DOWNLOAD_THRESHOLD_BYTES = 2 ** 62
+        try:
+            client.ranges.clear()
+            started = time.perf_counter()
+            single = service.get_file(key, None, None)
+            single_seconds = time.perf_counter() - started
+            check("Referência num único stream (um GET sem Range)", client.ranges == [None])
+        finally:
+            settings.S3_RANGED_DOWNLOAD_THRESHOLD_BYTES = threshold
+        check("get_file por intervalos: SHA-256 igual ao do único stream",
+              sha256(ranged) == sha256(single) == sha256(client.objects[key]))
+        check("download_to_temp_file por intervalos: SHA-256 igual", on_disk == sha256(single))
+        print(f"⏱️ Por intervalos: {ranged_seconds:.2f}s; único stream: {single_seconds:.2f}s "
+              f"({single_seconds / ranged_seconds:.1f}x)")
+
+        print("\n🔍 Objeto substituído durante a descarga")
+        head_object = client.head_object
+
+        def head_then_replace(Bucket, Key):
+            response = head_object(Bucket=Bucket, Key=Key)
+            client.objects[Key] = client.objects[Key][::-1]  # nova versão, mesmo tamanho
+            return response
+
+        client.head_object = head_then_replace
+        for label, download in (
+            ("get_file", lambda: service.get_file(key, None, None)),
+            ("download_to_temp_file", lambda: service.download_to_temp_file(key).__enter__()),
+        ):
+            try:
+                download()
+                check(f"{label}: If-Match falha com RuntimeError", False)
+            except RuntimeError as e:
+                check(f"{label}: If-Match falha com RuntimeError ({e})", "alterado" in str(e))
+        client.head_object = head_object
+    finally:
+        service.close()
+
+    if not ok:
+        print("\n❌ Há verificações da descarga por intervalos que falharam.")
+        sys.exit(1)
+    print("\n✅ Todas as verificações passaram!")
+
+
+if __name__ == "__main__":
+    main()
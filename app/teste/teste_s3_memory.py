@@ -0,0 +1,155 @@
+# app/teste/teste_s3_memory.py
+"""
+Benchmark do pico de memória (RSS) de um trabalho de extração com o PDF vindo do
+S3, nas duas formas de o abrir:
+
+1. bytes: S3Service.get_file + fitz.open(stream=...) (o PDF inteiro em memória,
+   como fazia o TextExtractionService);
+2. ficheiro: S3Service.download_to_temp_file + fitz.open(caminho) (o PDF é
+   escrito em blocos num ficheiro temporário e lido pelo MuPDF a partir do disco).
+
+O trabalho é o do TextExtractionService: texto das páginas e segmentação em
+capítulos, com o cache de extração desligado. O PDF é montado a partir do corpus
+(app/services/Documento de Thiago Germano) até --mb MiB e servido pelo cliente S3
+em memória de app/teste/fake_s3.py. Cada modo corre num processo novo e o valor
+reportado é o aumento do pico de RSS (ru_maxrss) durante o trabalho, descontada a
+memória do processo com o objeto já guardado no S3 falso.
+
+Uso:
+    python -m app.teste.teste_s3_memory [--mb N] [--pdf CAMINHO]
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz
+
+MB = 1024 * 1024
+CORPUS = os.path.join(os.path.dirname(__file__), "..", "services", "Documento de Thiago Germano")
+MODES = {
+    "bytes": "get_file + fitz.open(stream=...)",
+    "ficheiro": "download_to_temp_file + fitz.open(caminho)",
+}
+
+
+def build_pdf(path: str, target_bytes: int) -> int:
+    """Junta PDFs do corpus num só até passar target_bytes; devolve o número de páginas."""
+    sources = sorted(glob.glob(os.path.join(CORPUS, "**", "*.pdf"), recursive=True))
+    if not sources:
+        raise FileNotFoundError(f"Nenhum PDF encontrado em {CORPUS}")
+    merged = fitz.open()
+    size = 0
+    while size < target_bytes:
+        for source in sources:
+            with fitz.open(source) as document:
+                merged.insert_pdf(document)
+            size += os.path.getsize(source)
+            if size >= target_bytes:
+                break
+    merged.save(path)
+    pages = len(merged)
+    merged.close()
+    return pages
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss vem em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_worker(mode: str, pdf_path: str) -> None:
+    """Corre um trabalho num processo novo e escreve o resultado em JSON no stdout."""
+    from app.services.extraction_cache import ExtractionCache
+    from app.services.pdf_segmenter import PDFSegmenterService
+    from app.teste.fake_s3 import FakeS3Client, make_s3_service
+
+    client = FakeS3Client()
+    with open(pdf_path, "rb") as f:
+        client.objects["livro.pdf"] = f.read()
+    service = make_s3_service(client)
+    segmenter = PDFSegmenterService(cache=ExtractionCache(enabled=False))
+    gc.collect()
+    baseline = peak_rss_bytes()
+
+    started = time.perf_counter()
+    try:
+        if mode == "bytes":
+            data = service.get_file("livro.pdf", None, None)
+            pages = segmenter.extract_page_texts(data)
+            chapters = segmenter.segment_pdf(data)
+        else:
+            with service.download_to_temp_file("livro.pdf") as path:
+                pages = segmenter.extract_page_texts(path)
+                chapters = segmenter.segment_pdf(path)
+    finally:
+        service.close()
+    print(json.dumps({
+        "peak_delta": peak_rss_bytes() - baseline,
+        "seconds": time.perf_counter() - started,
+        "pages": len(pages),
+        "chapters": len(chapters.get("chapters", [])),
+    }))
+
+
+def measure(mode: str, pdf_path: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "app.teste.teste_s3_memory", "--worker", mode, "--pdf", pdf_path],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"O modo {mode} falhou:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de RSS de uma extração com o PDF em bytes ou em ficheiro temporário.")
+    parser.add_argument("--mb", type=int, default=40, help="Tamanho do PDF montado a partir do corpus, em MiB.")
+    parser.add_argument("--pdf", help="PDF a usar em vez do montado a partir do corpus.")
+    parser.add_argument("--worker", choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.pdf)
+        return
+
+    print("🚀 Pico de memória de uma extração com o PDF vindo do S3")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(directory, "corpus.pdf")
+            pages = build_pdf(pdf_path, args.mb * MB)
+            print(f"   PDF montado a partir do corpus: {pages} páginas")
+        print(f"   {os.path.getsize(pdf_path) / MB:.0f} MiB, cache de extração desligado, um processo por modo")
+
+        results = {}
+        for mode, label in MODES.items():
+            result = measure(mode, pdf_path)
+            results[mode] = result
+            print(f"\n⏱️ {label}: +{result['peak_delta'] / MB:.0f} MiB de pico de RSS "
+                  f"({result['seconds']:.1f}s, {result['pages']} páginas, {result['chapters']} capítulos)")
+
+    print()
+    same = (results["bytes"]["pages"], results["bytes"]["chapters"]) == \
+           (results["ficheiro"]["pages"], results["ficheiro"]["chapters"])
+    print(f"{'✅' if same else '❌'} Mesmo resultado nos dois modos")
+    saved = results["bytes"]["peak_delta"] - results["ficheiro"]["peak_delta"]
+    lower = saved > 0
+    print(f"{'✅' if lower else '❌'} Ficheiro temporário: menos {saved / MB:.0f} MiB de pico do que com bytes")
+
+    if not (same and lower):
+        print("\n❌ O ficheiro temporário não reduziu o pico de memória.")
+        sys.exit(1)
+    print("\n✅ Benchmark concluído!")
+
+
+if __name__ == "__main__":
+    main()
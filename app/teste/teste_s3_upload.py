@@ -0,0 +1,143 @@
+# app/teste/teste_s3_upload.py
+"""
+Verifica S3Service.upload_stream com um iterador de bytes (o caminho usado com o
+ElevenLabsService.iter_audio), contra o cliente S3 em memória de app/teste/fake_s3.py.
+
+1. Conteúdo menor que uma parte: um único PUT, lido de volta byte a byte igual.
+2. Conteúdo grande, em pedaços de tamanhos irregulares: multipart com todas as
+   partes (exceto a última) do tamanho configurado, lido de volta igual (SHA-256),
+   e nunca mais de S3_MAX_CONCURRENCY partes em envio ao mesmo tempo.
+3. O produtor falha a meio: o upload multipart é abortado e o objeto não é criado.
+4. O envio de uma parte falha: o upload é abortado sem consumir o resto do iterador.
+5. Limite mínimo das partes: com S3_MULTIPART_CHUNK_BYTES abaixo dos 5 MiB do S3,
+   as partes ficam com 5 MiB e o S3 aceita o upload.
+
+Uso:
+    python -m app.teste.teste_s3_upload [--mb N] [--latency-ms MS] [--seed N]
+"""
+import argparse
+import hashlib
+import logging
+import random
+import sys
+
+from app.core.config import settings
+from app.services.s3_service import MIN_PART_SIZE
+from app.teste.fake_s3 import FakeS3Client, make_s3_service
+
+MB = 1024 * 1024
+ok = True
+
+
+def check(label: str, condition: bool) -> None:
+    global ok
+    ok = ok and bool(condition)
+    print(f"{'✅' if condition else '❌'} {label}")
+
+
+def random_chunks(total: int, rng: random.Random, fail_after: int = None):
+    """Produz `total` bytes em pedaços de 1 KiB a 700 KiB; falha depois de fail_after bytes."""
+    sent = 0
+    while sent < total:
+        if fail_after is not None and sent >= fail_after:
+            raise IOError("falha simulada do produtor")
+        size = min(total - sent, rng.randint(1024, 700 * 1024))
+        yield rng.randbytes(size)
+        sent += size
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uploads em stream do S3Service contra um S3 em memória.")
+    parser.add_argument("--mb", type=int, default=40, help="Tamanho do conteúdo grande, em MiB.")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência simulada de cada chamada ao S3.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # As falhas simuladas seriam registadas como erros
+    logging.getLogger("app.services.s3_service").setLevel(logging.CRITICAL)
+    latency = args.latency_ms / 1e3
+
+    print("🚀 Uploads em stream do S3Service (S3 em memória)")
+    print("=" * 60)
+
+    client = FakeS3Client(latency)
+    service = make_s3_service(client)
+    print(f"   Partes de {service.part_size / MB:.0f} MiB, até {service.max_concurrency} em envio")
+    try:
+        print("\n🔍 Conteúdo menor que uma parte")
+        data = random.Random(args.seed).randbytes(service.part_size // 2)
+        service.upload_stream(iter([data[:1000], data[1000:]]), "pequeno.mp3")
+        check("Um único PUT, sem multipart",
+              client.calls["put_object"] == 1 and not client.calls["create_multipart_upload"])
+        check("Lido de volta igual", client.objects["pequeno.mp3"] == data)
+
+        print("\n🔍 Conteúdo grande em pedaços irregulares")
+        rng = random.Random(args.seed)
+        sent = []
+        key, url = service.upload_stream(
+            (sent.append(chunk) or chunk for chunk in random_chunks(args.mb * MB, rng)), "grande.mp3"
+        )
+        expected = b"".join(sent)
+        sizes = client.part_sizes[key]
+        check(f"SHA-256 igual ao enviado ({len(expected) / MB:.0f} MiB)", sha256(client.objects[key]) == sha256(expected))
+        check(f"{len(sizes)} partes, todas menos a última com {service.part_size / MB:.0f} MiB",
+              all(size == service.part_size for size in sizes[:-1]) and 0 < sizes[-1] <= service.part_size)
+        check(f"No máximo {service.max_concurrency} partes em envio (pico {client.peak})",
+              client.peak <= service.max_concurrency)
+        check(f"URL pública devolvida ({url})", url.endswith("/grande.mp3"))
+
+        print("\n🔍 O produtor falha a meio")
+        client.calls.clear()
+        try:
+            service.upload_stream(random_chunks(args.mb * MB, rng, fail_after=3 * service.part_size), "falha.mp3")
+            check("A falha do produtor chega ao chamador", False)
+        except IOError as e:
+            check(f"A falha do produtor chega ao chamador ({e})", True)
+        check("Upload multipart abortado", client.calls["abort_multipart_upload"] == 1 and not client.uploads)
+        check("Objeto não criado", "falha.mp3" not in client.objects and not client.calls["complete_multipart_upload"])
+
+        print("\n🔍 O envio de uma parte falha")
+        client.calls.clear()
+        client.fail_on = {"upload_part": 2}
+        produced = []
+        try:
+            service.upload_stream(
+                (produced.append(len(chunk)) or chunk for chunk in random_chunks(args.mb * MB, rng)), "parte.mp3"
+            )
+            check("A falha da parte chega ao chamador", False)
+        except RuntimeError as e:
+            check(f"A falha da parte chega ao chamador ({e})", True)
+        client.fail_on = {}
+        check("Upload multipart abortado", client.calls["abort_multipart_upload"] == 1 and not client.uploads)
+        check(f"Produtor não consumido até ao fim ({sum(produced) / MB:.0f} de {args.mb} MiB)",
+              sum(produced) < args.mb * MB)
+    finally:
+        service.close()
+
+    print("\n🔍 Limite mínimo das partes")
+    chunk_bytes = settings.S3_MULTIPART_CHUNK_BYTES
+    settings.S3_MULTIPART_CHUNK_BYTES = 1 * MB
+    client = FakeS3Client(latency)
+    service = make_s3_service(client)
+    try:
+        data = random.Random(args.seed).randbytes(12 * MB)
+        service.upload_stream(iter([data[i:i + 256 * 1024] for i in range(0, len(data), 256 * 1024)]), "minimo.mp3")
+        check(f"S3_MULTIPART_CHUNK_BYTES de 1 MiB sobe para {service.part_size / MB:.0f} MiB",
+              service.part_size == MIN_PART_SIZE)
+        check(f"Upload aceite pelo S3 (partes: {[size // MB for size in client.part_sizes['minimo.mp3']]} MiB)",
+              client.objects.get("minimo.mp3") == data)
+    finally:
+        settings.S3_MULTIPART_CHUNK_BYTES = chunk_bytes
+        service.close()
+
+    if not ok:
+        print("\n❌ Há verificações do upload em stream que falharam.")
+        sys.exit(1)
+    print("\n✅ Todas as verificações passaram!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# app/teste/teste_sentence_splitter.py
+"""
+Compara os divisores de sentenças do pré-processador (SENTENCE_SPLITTER):
+"rule" (app/services/sentence_splitter.py) e "spacy" (modelo SPACY_MODEL).
+
+Para cada divisor mede a velocidade (caracteres por segundo) e a concordância com
+uma amostra anotada à mão (precisão/recall/F1 das fronteiras), e no fim a
+concordância entre os dois. Sem o modelo spaCy instalado, só o divisor "rule" é
+avaliado.
+
+Uso:
+    python -m app.teste.teste_sentence_splitter [--repeat N]
+"""
+import argparse
+import sys
+import time
+from typing import Callable, List, Set
+
+from app.services.sentence_splitter import pack_sentences, split_sentences
+
+# Amostra anotada: cada parágrafo é a lista das suas sentenças de referência.
+GOLD: List[List[str]] = [
+    ["O Dr. Silva chegou cedo ao consultório.", "A Sra. Almeida já o esperava na sala."],
+    ["Assim é.", "Ninguém discordou da decisão do conselho."],
+    ["Ele deu o livro para a.", "Depois disso, não voltou a falar no assunto."],
+    ["J. R. R. Tolkien escreveu O Senhor dos Anéis.", "A obra foi publicada em três volumes."],
+    ["Veja a p. 42 do relatório.", "Os números do séc. XIX são menos fiáveis."],
+    ["A reunião ficou para dez.", "Às onze começou a votação."],
+    ["A empresa Ferreira & Cia. Ltda. fechou o ano com lucro.", "O balanço sai em fev. de 2025."],
+    ["Quem viria?", "Ninguém sabia!", "Mesmo assim, a porta ficou aberta…", "E ele entrou."],
+    ["— Você vem? — perguntou ela.", "— Vou, sim."],
+    ["O prof. Mendes citou Freire et al. na aula.", "Todos anotaram a referência."],
+    ["Os dados (cf. tab. 3) mostram a tendência.", "Ela confirma a hipótese inicial."],
+    ["O evento ocorreu no ano 300 a.C. e ficou registado.", "Poucos documentos sobreviveram."],
+    ["Comprou 3 kg de arroz.", "Pagou R$ 20,00 no total."],
+    ["A Av. Paulista estava fechada.", "O trânsito desviou pela R. Augusta."],
+    ["Ele disse: \"Acabou.\"", "Ela respondeu: \"Ainda não.\""],
+    ["Era uma vez um rei.", "O rei tinha três filhas.", "A mais nova chamava-se Ana."],
+]
+
+
+def _boundaries(sentences: List[str]) -> Set[int]:
+    """Posições (em caracteres sem espaços) onde termina cada sentença, exceto a última."""
+    positions, total = set(), 0
+    for sentence in sentences[:-1]:
+        total += len("".join(sentence.split()))
+        positions.add(total)
+    return positions
+
+
+def _score(splitter: Callable[[str], List[str]]) -> dict:
+    tp = fp = fn = 0
+    for paragraph in GOLD:
+        expected = _boundaries(paragraph)
+        found = _boundaries(splitter(" ".join(paragraph)))
+        tp += len(expected & found)
+        fp += len(found - expected)
+        fn += len(expected - found)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def _speed(splitter: Callable[[str], List[str]], repeat: int) -> float:
+    texts = [" ".join(paragraph) for paragraph in GOLD] * repeat
+    chars = sum(len(text) for text in texts)
+    started = time.perf_counter()
+    for text in texts:
+        splitter(text)
+    return chars / (time.perf_counter() - started)
+
+
+def _spacy_splitter():
+    """Divisor spaCy com o modelo configurado, ou None se o modelo não estiver instalado."""
+    try:
+        from app.services.text_preprocessor_service import get_nlp
+        nlp = get_nlp()
+    except Exception as e:
+        print(f"⚠️ Modelo spaCy indisponível ({e}); só o divisor 'rule' é avaliado.")
+        return None
+    return lambda text: [sent.text.strip() for sent in nlp(text).sents if sent.text.strip()]
+
+
+def _check_pack_sentences() -> bool:
+    """pack_sentences mantém as quebras de parágrafo e o limite de cada pedaço."""
+    text = "\n\n".join(" ".join(paragraph) for paragraph in GOLD)
+    whole = pack_sentences(text, len(text))
+    kept = whole == [text]
+    print(f"   {'✅' if kept else '❌'} Um só pedaço: igual ao texto, com as {len(GOLD) - 1} quebras de parágrafo")
+
+    limit = 120
+    chunks = pack_sentences(text, limit)
+    within = all(len(chunk) <= limit for chunk in chunks)
+    same_text = "\n\n".join(chunks).split() == text.split()
+    breaks = sum(chunk.count("\n\n") for chunk in chunks) + len(chunks) - 1 >= len(GOLD) - 1
+    print(f"   {'✅' if within and same_text and breaks else '❌'} {len(chunks)} pedaços de até {limit} "
+          f"caracteres, sem perder texto nem quebras de parágrafo")
+    return kept and within and same_text and breaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os divisores de sentenças 'rule' e 'spacy'.")
+    parser.add_argument("--repeat", type=int, default=200, help="Repetições da amostra na medição de velocidade.")
+    args = parser.parse_args()
+
+    print("🚀 Comparação dos divisores de sentenças")
+    print("=" * 60)
+    splitters = {"rule": split_sentences}
+    spacy_splitter = _spacy_splitter()
+    if spacy_splitter is not None:
+        splitters["spacy"] = spacy_splitter
+
+    for name, splitter in splitters.items():
+        score = _score(splitter)
+        speed = _speed(splitter, args.repeat)
+        print(f"\n🔍 {name}:")
+        print(f"   Precisão: {score['precision']:.3f}  Recall: {score['recall']:.3f}  F1: {score['f1']:.3f}")
+        print(f"   Velocidade: {speed / 1e6:.2f} M caracteres/s")
+        for paragraph in GOLD:
+            found = splitter(" ".join(paragraph))
+            if _boundaries(found) != _boundaries(paragraph):
+                print(f"   ❌ {found}")
+
+    if spacy_splitter is not None:
+        same = sum(
+            _boundaries(split_sentences(text)) == _boundaries(spacy_splitter(text))
+            for text in (" ".join(paragraph) for paragraph in GOLD)
+        )
+        print(f"\n🔁 Parágrafos com as mesmas fronteiras nos dois divisores: {same}/{len(GOLD)}")
+
+    print("\n🔍 pack_sentences:")
+    if not _check_pack_sentences():
+        print("\n❌ pack_sentences não manteve os parágrafos.")
+        sys.exit(1)
+
+    print("\n✅ Comparação concluída!")
+
+
+if __name__ == "__main__":
+    main()
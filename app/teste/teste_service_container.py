@@ -0,0 +1,160 @@
+# app/teste/teste_service_container.py
+"""
+Benchmark do custo de preparação por pedido: os serviços criados a cada pedido
+(como faziam as dependências get_audiobook_service, get_audio_generation_service e
+get_text_extraction_service antes do ServiceContainer) contra os serviços criados
+uma vez no lifespan e obtidos do contentor.
+
+1. Dependências: tempo para obter os três serviços de um pedido — grafo novo
+   (PDFSegmenterService, ElevenLabsService, S3Service, TextPreprocessorService...)
+   contra get_services + as dependências dos endpoints sobre um único contentor.
+2. Pedido completo: latência de GET /api/v1/tts/metrics pela aplicação (ASGI, sem
+   rede), com os serviços criados a cada pedido (get_services substituído, via
+   dependency_overrides, por um ServiceContainer novo) ou obtidos do contentor.
+
+A referência usa os construtores atuais, que já partilham os pools de ligações
+HTTP do processo; o custo antigo (um pool novo por serviço) era maior.
+Não há pedidos ao S3 nem à ElevenLabs: credenciais fictícias chegam para criar os
+clientes.
+
+Uso:
+    python -m app.teste.teste_service_container [--requests N] [--repeats N]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+# Os serviços exigem configuração; os clientes são criados mas nunca usados.
+os.environ.setdefault("ELEVENLABS_API_KEY", "teste-service-container")
+os.environ.setdefault("S3_ACCESS_KEY", "teste")
+os.environ.setdefault("S3_SECRET_KEY", "teste")
+os.environ.setdefault("S3_BUCKET_NAME", "livros-teste")
+os.environ.setdefault("S3_ENDPOINT_URL", "http://s3.teste.invalid")
+
+import httpx
+
+from app.api.v1.endpoints.audiobook import get_audiobook_service
+from app.api.v1.endpoints.extractText import get_text_extraction_service
+from app.core.container import ServiceContainer, get_services
+from app.main import app
+from app.services.audio_generation_service import AudioGenerationService
+from app.services.audiobook_generator_service import AudiobookGeneratorService
+from app.services.elevenlabs_service import ElevenLabsService
+from app.services.pdf_segmenter import PDFSegmenterService
+from app.services.s3_service import S3Service
+from app.services.text_extraction_service import TextExtractionService
+from app.services.text_preprocessor_service import TextPreprocessorService
+
+
+def services_per_request(created: list) -> tuple:
+    """Referência: o grafo que as dependências criavam a cada pedido."""
+    audiobook = AudiobookGeneratorService(
+        pdf_segmenter=PDFSegmenterService(), elevenlabs_service=ElevenLabsService(), s3_service=S3Service()
+    )
+    audio_generation = AudioGenerationService(elevenlabs_service=ElevenLabsService(), s3_service=S3Service())
+    text_extraction = TextExtractionService(pdf_segmenter=PDFSegmenterService(), preprocessor=TextPreprocessorService())
+    created += [audiobook.elevenlabs_service, audiobook.s3_service,
+                audio_generation.elevenlabs_service, audio_generation.s3_service]
+    return audiobook, audio_generation, text_extraction
+
+
+def services_from_container(request) -> tuple:
+    """As dependências atuais: o contentor do lifespan, obtido a partir do pedido."""
+    services = get_services(request)
+    return get_audiobook_service(services), services.audio_generation_service, get_text_extraction_service(services)
+
+
+def time_per_call(run, requests: int, repeats: int) -> float:
+    """Mediana, entre `repeats` medições, do tempo por chamada (em segundos)."""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(requests):
+            run()
+        samples.append((time.perf_counter() - started) / requests)
+    return statistics.median(samples)
+
+
+async def request_latency(requests: int) -> float:
+    """Mediana da latência de GET /api/v1/tts/metrics pela aplicação ASGI."""
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste") as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get("/api/v1/tts/metrics")
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+    return statistics.median(latencies)
+
+
+def close_all(services: list) -> None:
+    for service in services:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de preparação dos serviços por pedido, antes e depois do contentor.")
+    parser.add_argument("--requests", type=int, default=50, help="Pedidos por medição.")
+    parser.add_argument("--repeats", type=int, default=5, help="Medições (é reportada a mediana).")
+    args = parser.parse_args()
+
+    print("🚀 Custo de preparação dos serviços por pedido")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    container = ServiceContainer()
+    startup = time.perf_counter() - started
+    print(f"   ServiceContainer criado uma vez no arranque em {startup * 1e3:.1f} ms")
+    app.state.services = container
+    request = SimpleNamespace(app=app)
+    created = []
+    ok = True
+    try:
+        print("\n🔍 Dependências dos endpoints")
+        before = time_per_call(lambda: services_per_request(created), args.requests, args.repeats)
+        after = time_per_call(lambda: services_from_container(request), args.requests, args.repeats)
+        resolved = all(service is not None for service in services_from_container(request))
+        print(f"⏱️ Serviços criados a cada pedido: {before * 1e3:.2f} ms por pedido")
+        print(f"⏱️ Serviços do contentor: {after * 1e6:.2f} µs por pedido ({before / after:.0f}x)")
+        close_all(created)
+        created.clear()
+        dependencies_ok = resolved and after < before
+        ok = ok and dependencies_ok
+        print(f"{'✅' if dependencies_ok else '❌'} Contentor resolve os serviços mais depressa do que criá-los")
+
+        print("\n🔍 Pedido completo (GET /api/v1/tts/metrics)")
+
+        def new_services():
+            services = ServiceContainer()
+            created.extend((services.elevenlabs_service, services.s3_service))
+            return services
+
+        app.dependency_overrides[get_services] = new_services
+        try:
+            asyncio.run(request_latency(5))  # aquecimento (importações, rotas)
+            before_request = asyncio.run(request_latency(args.requests))
+        finally:
+            app.dependency_overrides.clear()
+        after_request = asyncio.run(request_latency(args.requests))
+        print(f"⏱️ Serviços criados a cada pedido: {before_request * 1e3:.2f} ms (mediana)")
+        print(f"⏱️ Serviços do contentor: {after_request * 1e3:.2f} ms (mediana), "
+              f"menos {(before_request - after_request) * 1e3:.2f} ms por pedido")
+        request_ok = after_request < before_request
+        ok = ok and request_ok
+        print(f"{'✅' if request_ok else '❌'} Pedido mais rápido com o contentor")
+    finally:
+        close_all(created)
+        asyncio.run(container.aclose())
+
+    if not ok:
+        print("\n❌ O contentor não reduziu o custo por pedido.")
+        sys.exit(1)
+    print("\n✅ Benchmark concluído!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# app/teste/teste_text_preprocessor.py
+"""
+Verifica e mede a limpeza por expressões regulares do TextPreprocessorService
+(tudo o que vem antes da reconstrução de sentenças).
+
+1. Ficheiro golden (app/teste/golden/text_preprocessor.json): cada entrada tem de
+   produzir exatamente a saída guardada.
+2. Comparação aleatória com a implementação de referência (as passagens
+   sequenciais originais, reproduzidas em _reference_clean): a passagem fundida
+   da pontuação e os pré-filtros não podem alterar nenhuma saída.
+3. Micro-benchmark: débito (M caracteres/s) da limpeza atual e da de referência,
+   sobre uma página de exemplo repetida ou sobre as páginas dos PDFs indicados em
+   --pdf (que são também comparadas com a referência). As duas são medidas
+   alternadamente --runs vezes e é reportada a mediana (com o mínimo e o máximo),
+   para que uma medição isolada não decida a comparação.
+
+Uso:
+    python -m app.teste.teste_text_preprocessor [--fuzz N] [--repeat N] [--runs N] [--pdf PDF ...] [--write-golden]
+
+--write-golden regenera as saídas do ficheiro golden com a implementação de
+referência (só quando se acrescentam entradas).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+from app.services.text_preprocessor_service import TextPreprocessorService
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "text_preprocessor.json")
+
+
+def _reference_clean(text: str) -> str:
+    """Limpeza original, passagem a passagem, usada como referência."""
+    # _remove_headers_footers
+    text = re.sub(r'(?m)^\s*\d+\s*$', '', text)
+    text = re.sub(r'(?i)(^|\s)(página|page)\s+\d+(\s|$)', ' ', text)
+    for pat in [r'(?i)copyright.*', r'(?i)versão\s*\d+(\.\d+)?', r'(?i)todos os direitos reservados']:
+        text = re.sub(pat, '', text)
+    # _remove_references_and_footnotes
+    text = re.sub(r'\[\d+\]', '', text)
+    text = re.sub(r'(?m)^\s*\d+\.\s+', '', text)
+    # _dehyphenate_and_join
+    text = re.sub(r'(?<!\w-)(\w+)-\s*\n\s*(\w+)', r'\1\2', text)
+    text = re.sub(r'(?<!\n)\n(?!\n)', ' ', text)
+    text = re.sub(r'\n{2,}', '\n\n', text)
+    # _remove_urls_emails
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'\S+@\S+', '', text)
+    # _normalize_whitespace_and_punctuation
+    text = re.sub(r'([,\.])\s*[,\.]+', r'\1', text)
+    text = re.sub(r'(?<=[\.])(?=[^\s])', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+# Fragmentos que exercitam cada padrão e as suas interações
+_FUZZ_TOKENS = [
+    "a", "Texto", "palavra", "12", "3", " ", "  ", "\n", "\n\n", "\t", ".", "..", ",", ",.", ". .", ".,",
+    "-", "-\n", "- \n ", "[1]", "[23]", "Página 4", "page 10", "PÁGINA", "copyright 2020", "Versão 2.1",
+    "versão3", "todos os direitos reservados", "1. ", "http://x.pt/a", "www.site.com", "nome@mail.pt",
+    "@", "fim.Início", "3.14", "é", "ção", "—",
+]
+
+
+def _fuzz_text(rng: random.Random) -> str:
+    return "".join(rng.choice(_FUZZ_TOKENS) for _ in range(rng.randint(1, 40)))
+
+
+def _sample_page() -> str:
+    """Página típica extraída de um PDF, com cabeçalho, rodapé e hifenização."""
+    return (
+        "Capítulo 3\nA descoberta\n\n"
+        "O Dr. Silva abriu a porta devagar. Lá dentro, o labora-\ntório estava escu-\nro e silencioso.\n"
+        "Ninguém respondeu ao seu chamado..Ele avançou,. passo a passo[12], até à mesa.\n"
+        "Mais informações em https://exemplo.pt/livro ou pelo e-mail autor@exemplo.pt.\n\n"
+        "1. A primeira pista estava escondida sob os papéis.\n"
+        "2. A segunda,nunca chegou a ser encontrada.\n\n"
+        "Página 42\nCopyright 2021 Editora Exemplo. Todos os direitos reservados\n42\n"
+    ) * 4
+
+
+def _pdf_pages(paths: List[str]) -> List[str]:
+    import fitz
+    pages = []
+    for path in paths:
+        with fitz.open(path) as document:
+            pages.extend(page.get_text() for page in document)
+    return pages
+
+
+def _throughput(clean: Callable[[str], str], texts: List[str]) -> float:
+    chars = sum(len(text) for text in texts)
+    started = time.perf_counter()
+    for text in texts:
+        clean(text)
+    return chars / (time.perf_counter() - started)
+
+
+def _throughput_runs(cleaners: List[Callable[[str], str]], texts: List[str], runs: int) -> List[List[float]]:
+    """Débitos de `runs` medições de cada limpeza, alternadas para partilharem as mesmas condições."""
+    samples: List[List[float]] = [[] for _ in cleaners]
+    for _ in range(runs):
+        for clean, values in zip(cleaners, samples):
+            values.append(_throughput(clean, texts))
+    return samples
+
+
+def _describe(values: List[float]) -> str:
+    return (f"{statistics.median(values) / 1e6:.2f} M caracteres/s "
+            f"(mín. {min(values) / 1e6:.2f}, máx. {max(values) / 1e6:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden, equivalência e benchmark da limpeza de texto para TTS.")
+    parser.add_argument("--fuzz", type=int, default=20000, help="Textos aleatórios comparados com a referência.")
+    parser.add_argument("--repeat", type=int, default=500, help="Páginas de exemplo no benchmark.")
+    parser.add_argument("--runs", type=int, default=7, help="Medições de cada limpeza (é reportada a mediana).")
+    parser.add_argument("--pdf", nargs="+", default=[], help="PDFs cujas páginas são usadas no benchmark.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write-golden", action="store_true", help="Regenera as saídas do ficheiro golden.")
+    args = parser.parse_args()
+
+    clean = TextPreprocessorService()._clean_before_sentences
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = json.load(f)
+    if args.write_golden:
+        for case in golden:
+            case["expected"] = _reference_clean(case["input"])
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump(golden, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"📝 {len(golden)} saídas golden regeneradas em {GOLDEN_PATH}")
+
+    print("🚀 Limpeza de texto para TTS")
+    print("=" * 60)
+    ok = True
+
+    failures = [case for case in golden if clean(case["input"]) != case["expected"]]
+    print(f"\n{'✅' if not failures else '❌'} Golden: {len(golden) - len(failures)}/{len(golden)} entradas iguais")
+    for case in failures:
+        print(f"   ❌ {case['name']}: esperado {case['expected']!r}, obtido {clean(case['input'])!r}")
+    ok = ok and not failures
+
+    rng = random.Random(args.seed)
+    mismatches = 0
+    for _ in range(args.fuzz):
+        text = _fuzz_text(rng)
+        if clean(text) != _reference_clean(text):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"   ❌ {text!r}: {clean(text)!r} != {_reference_clean(text)!r}")
+    print(f"{'✅' if not mismatches else '❌'} Aleatórios: {mismatches} diferenças em {args.fuzz} textos")
+    ok = ok and not mismatches
+
+    if args.pdf:
+        texts = _pdf_pages(args.pdf)
+        different = sum(clean(text) != _reference_clean(text) for text in texts)
+        print(f"{'✅' if not different else '❌'} Páginas dos PDFs: {different} diferenças em {len(texts)} páginas")
+        ok = ok and not different
+    else:
+        texts = [_sample_page()] * args.repeat
+    current, reference = _throughput_runs([clean, _reference_clean], texts, max(1, args.runs))
+    print(f"\n⏱️ Atual: {_describe(current)}")
+    print(f"⏱️ Referência: {_describe(reference)} "
+          f"({statistics.median(current) / statistics.median(reference):.2f}x, mediana de {len(current)} medições)")
+
+    if not ok:
+        print("\n❌ A limpeza atual difere da esperada.")
+        sys.exit(1)
+    print("\n✅ Verificação concluída!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# app/worker.py
+"""
+Processo worker da fila de trabalhos (tabela 'job_queue').
+
+A API apenas coloca trabalhos na fila; este processo, arrancado à parte com
+
+    python -m app.worker [--concurrency N]
+
+reserva-os com SELECT ... FOR UPDATE SKIP LOCKED e executa até N em simultâneo,
+cada um com a sua própria sessão da base de dados. Vários processos worker, na
+mesma máquina ou noutras, podem servir a mesma fila.
+
+Se a reserva de um trabalho se perder (o heartbeat não a conseguiu prolongar a
+tempo e outro worker reservou o trabalho), o handler é avisado pelo evento
+lease_lost e o resultado não é registado: complete() e fail() só alteram o
+trabalho enquanto este estiver reservado pelo worker que o executa.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+from typing import Callable, Dict
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.container import ServiceContainer, require
+from app.core.database import SessionLocal, create_job_tables
+from app.crud import crud_document, crud_job_queue
+from app.models.document import ProcessingStatus
+from app.models.job_queue import JobKind, QueuedJob
+
+logger = logging.getLogger(__name__)
+
+
+def _check_document_status(db: Session, document_id: int, kind: str) -> None:
+    # Os serviços registam a falha no estado do documento em vez de a propagar;
+    # aqui é convertida numa exceção, para que o trabalho seja tentado de novo.
+    document = crud_document.get_document(db, document_id)
+    if document is None or document.status == ProcessingStatus.FAILED:
+        raise RuntimeError(f"O trabalho '{kind}' terminou com o documento {document_id} em FAILED.")
+
+
+def run_extract_text(services: ServiceContainer, db: Session, payload: dict, lease_lost: threading.Event) -> None:
+    services.text_extraction_service.extract_and_save_text(
+        db,
+        pdf_file_key=payload["pdf_file_key"],
+        document_id=payload["document_id"],
+        segmentation_mode=payload.get("segmentation_mode", "page"),
+        sentence_splitter=payload.get("sentence_splitter"),
+        cancel_event=lease_lost,
+    )
+    if lease_lost.is_set():
+        return
+    _check_document_status(db, payload["document_id"], JobKind.EXTRACT_TEXT.value)
+
+
+def run_generate_audio(services: ServiceContainer, db: Session, payload: dict, lease_lost: threading.Event) -> None:
+    # Um trabalho repetido retoma a partir dos checkpoints (ver AudioGenerationService).
+    service = require(services.audio_generation_service, "de geração de áudio")
+    service.generate_audio_for_document(db=db, document_id=payload["document_id"], cancel_event=lease_lost)
+    if lease_lost.is_set():
+        return
+    _check_document_status(db, payload["document_id"], JobKind.GENERATE_AUDIO.value)
+
+
+# handler(serviços, sessão, payload, lease_lost): lease_lost é ativado se a reserva do
+# trabalho se perder; o handler deve então parar sem gravar mais nada.
+HANDLERS: Dict[str, Callable[[ServiceContainer, Session, dict, threading.Event], None]] = {
+    JobKind.EXTRACT_TEXT.value: run_extract_text,
+    JobKind.GENERATE_AUDIO.value: run_generate_audio,
+}
+
+
+class Worker:
+    """Executa trabalhos da fila em até `concurrency` threads, até receber SIGTERM/SIGINT."""
+
+    def __init__(
+        self,
+        concurrency: int = None,
+        visibility_timeout: float = None,
+        poll_interval: float = None,
+        services: ServiceContainer = None,
+    ):
+        self.concurrency = max(1, concurrency or settings.WORKER_CONCURRENCY)
+        self.visibility_timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+        self.poll_interval = poll_interval or settings.WORKER_POLL_INTERVAL_SECONDS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.services = services
+        self._stop = threading.Event()
+
+    def stop(self, *_args) -> None:
+        """Deixa de reservar trabalhos; os que estão a correr terminam normalmente."""
+        if not self._stop.is_set():
+            logger.info("A parar o worker depois dos trabalhos em curso...")
+        self._stop.set()
+
+    def run(self) -> None:
+        if self.services is None:
+            self.services = ServiceContainer()
+        logger.info(
+            f"Worker {self.worker_id} a servir a fila com {self.concurrency} trabalho(s) em simultâneo "
+            f"(reserva de {self.visibility_timeout}s)."
+        )
+        threads = [
+            threading.Thread(target=self._loop, args=(f"{self.worker_id}/{i}",), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _loop(self, lock_id: str) -> None:
+        # Cada thread reserva com o seu próprio identificador, para que a reserva de um
+        # trabalho expirado e retomado por outra thread do mesmo processo também seja
+        # reconhecida como perdida.
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                job = crud_job_queue.claim(db, lock_id, self.visibility_timeout)
+                if job is not None:
+                    self._run_job(db, job, lock_id)
+                    continue
+            except Exception as e:
+                logger.error(f"Erro no ciclo do worker: {e}", exc_info=True)
+            finally:
+                db.close()
+            # Fila vazia ou erro: espera antes de voltar a procurar trabalho.
+            self._stop.wait(self.poll_interval)
+
+    def _run_job(self, db: Session, job: QueuedJob, lock_id: str) -> None:
+        logger.info(f"Trabalho {job.id} ('{job.kind}', tentativa {job.attempts}/{job.max_attempts}) iniciado.")
+        done = threading.Event()
+        lease_lost = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job.id, lock_id, done, lease_lost), name=f"job-heartbeat-{job.id}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                raise ValueError(f"Tipo de trabalho desconhecido: '{job.kind}'.")
+            handler(self.services, db, dict(job.payload or {}), lease_lost)
+        except Exception as e:
+            logger.error(f"Trabalho {job.id} ('{job.kind}') falhou: {e}", exc_info=True)
+            db.rollback()
+            retry = None if lease_lost.is_set() else crud_job_queue.fail(db, job, str(e), lock_id)
+            if retry is None:
+                self._log_lease_lost(job)
+            else:
+                logger.info(f"Trabalho {job.id} " + ("volta à fila." if retry else "esgotou as tentativas."))
+        else:
+            if not lease_lost.is_set() and crud_job_queue.complete(db, job, lock_id):
+                logger.info(f"Trabalho {job.id} ('{job.kind}') concluído.")
+            else:
+                self._log_lease_lost(job)
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def _log_lease_lost(self, job: QueuedJob) -> None:
+        logger.warning(
+            f"Trabalho {job.id} ('{job.kind}'): a reserva já não pertence a este worker; "
+            f"o resultado desta tentativa não foi registado."
+        )
+
+    def _heartbeat(self, job_id: int, lock_id: str, done: threading.Event, lease_lost: threading.Event) -> None:
+        """
+        Prolonga a reserva do trabalho a cada terço do tempo de visibilidade, com sessão
+        própria. Se a reserva já pertencer a outro worker, ativa lease_lost e termina.
+        """
+        while not done.wait(self.visibility_timeout / 3):
+            db = SessionLocal()
+            try:
+                if not crud_job_queue.extend_lease(db, job_id, lock_id, self.visibility_timeout):
+                    logger.warning(f"A reserva do trabalho {job_id} já não pertence a este worker.")
+                    lease_lost.set()
+                    return
+            except Exception as e:
+                logger.warning(f"Não foi possível prolongar a reserva do trabalho {job_id}: {e}")
+            finally:
+                db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker da fila de trabalhos (extração de texto e geração de áudio).")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY,
+                        help="Trabalhos executados em simultâneo.")
+    parser.add_argument("--visibility-timeout", type=float, default=settings.JOB_VISIBILITY_TIMEOUT_SECONDS,
+                        help="Prazo, em segundos, da reserva de um trabalho.")
+    parser.add_argument("--poll-interval", type=float, default=settings.WORKER_POLL_INTERVAL_SECONDS,
+                        help="Espera, em segundos, quando a fila está vazia.")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    create_job_tables()
+    worker = Worker(args.concurrency, args.visibility_timeout, args.poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    try:
+        worker.run()
+    finally:
+        if worker.services is not None:
+            asyncio.run(worker.services.aclose())
+
+
+if __name__ == "__main__":
+    main()